@@ -0,0 +1,164 @@
+"""
+Benchmark suite for the rebalance pipeline.
+
+    python benchmarks/run_benchmarks.py --size small --save benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --size small --baseline benchmarks/baseline.json --threshold 0.25
+
+Runs fully offline (network sources are stubbed). Exits 1 when any stage's
+median time exceeds its baseline by more than --threshold.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+for p in (SRC, Path(__file__).resolve().parent):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+import synthetic
+from graham.data_models import UserPrefs
+from graham.drift import DriftMonitor, simulated_feed
+from graham.market_signals import fetch_market_inputs_live, fetch_market_inputs_concurrent
+from graham.portfolio import load_holdings, load_holdings_stream, weights_by_class
+from graham.rebalance import rebalance_plan, rebalance_plan_batch
+from graham.reporting import ReportWriter, explain
+from graham.scoring import score_market, score_breakdown, score_market_batch
+from graham.series_cache import SeriesCache
+from graham.target_policy import map_score_to_equity, map_score_to_equity_batch, next_equity_target
+
+SIZES = {
+    "small":  {"signals": [1_000, 10_000], "holdings": [1_000, 10_000], "csv": [1_000, 100_000]},
+    "medium": {"signals": [10_000, 100_000], "holdings": [10_000, 1_000_000], "csv": [1_000, 1_000_000]},
+    "large":  {"signals": [100_000, 1_000_000], "holdings": [1_000_000, 10_000_000], "csv": [1_000, 10_000_000]},
+}
+
+
+def _time(fn, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {"median_s": statistics.median(runs), "min_s": min(runs), "repeat": repeat}
+
+
+def _write_report(plans, path: Path):
+    with ReportWriter(path) as w:
+        w.write_frame(plans, {"score": 0.5, "equity_pct": 60})
+
+
+def stages(size: str, workdir: Path):
+    """Yield (name, callable) pairs; setup happens here, outside the timed call."""
+    cfg = SIZES[size]
+    prefs = UserPrefs()
+
+    for n in cfg["signals"]:
+        ms = synthetic.market_inputs(n)
+        frame = synthetic.market_frame(n)
+        scores = score_market_batch(frame)
+        yield f"score_market[{n}]", lambda ms=ms: [score_market(m) for m in ms]
+        yield f"score_breakdown[{n}]", lambda ms=ms: [score_breakdown(m) for m in ms]
+        yield f"score_market_batch[{n}]", lambda f=frame: score_market_batch(f)
+        yield f"map_score_to_equity[{n}]", lambda s=scores.tolist(): [map_score_to_equity(x, prefs) for x in s]
+        yield f"next_equity_target[{n}]", lambda s=scores.tolist(): [next_equity_target(50, x, prefs) for x in s]
+        yield f"map_score_to_equity_batch[{n}]", lambda s=scores: map_score_to_equity_batch(s, prefs)
+
+    for n in cfg["csv"]:
+        path = synthetic.holdings_csv(n, workdir)
+        yield f"load_holdings[{n}]", lambda p=path: load_holdings(p)
+        yield f"load_holdings_stream[{n}]", lambda p=path: load_holdings_stream(p)
+        yield f"load_holdings_rows+plan[{n}]", lambda p=path: rebalance_plan(load_holdings(p, engine="python"), 60)
+
+    for n in cfg["holdings"]:
+        df = synthetic.holdings_frame(n)
+        multi = synthetic.holdings_frame(n, accounts=max(1, n // 50))
+        plan = rebalance_plan(df, 60)
+        rec = {"score": 0.5, "equity_pct": 60}
+        yield f"weights_by_class[{n}]", lambda d=df: weights_by_class(d)
+        yield f"rebalance_plan[{n}]", lambda d=df: rebalance_plan(d, 60)
+        yield f"rebalance_plan_batch[{n}]", lambda d=multi: rebalance_plan_batch(d, 60)
+        yield f"explain[{n}]", lambda p=plan: [explain(rec, p) for _ in range(1_000)]
+        mon = DriftMonitor.from_holdings(multi, 60)
+        ticks = list(simulated_feed(mon.prices(), 20_000, seed=0))
+        yield f"drift_monitor.run[{n}]", lambda m=mon, f=ticks: m.run(f)
+        plans = rebalance_plan_batch(multi, 60)
+        for ext in ("csv", "jsonl", "parquet"):
+            yield f"report_writer.{ext}[{n}]", lambda ps=plans, e=ext: _write_report(ps, workdir / f"report.{e}")
+
+    sources = synthetic.stub_sources(latency_s=0.01)
+
+    def live(concurrent: bool):
+        with tempfile.TemporaryDirectory() as d:
+            cache = SeriesCache(Path(d) / "cache.sqlite", sources=sources)
+            if concurrent:
+                fetch_market_inputs_concurrent(cache=cache)
+            else:
+                fetch_market_inputs_live(cache=cache)
+
+    yield "fetch_market_inputs_live[stub]", lambda: live(False)
+    yield "fetch_market_inputs_concurrent[stub]", lambda: live(True)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Stages whose median regressed past baseline * (1 + threshold)."""
+    failures = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if b is None:
+            continue
+        limit = b["median_s"] * (1.0 + threshold)
+        if r["median_s"] > limit:
+            failures.append(f"{name}: {r['median_s'] * 1e3:.2f} ms > {limit * 1e3:.2f} ms "
+                            f"(baseline {b['median_s'] * 1e3:.2f} ms)")
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(prog="graham-bench")
+    ap.add_argument("--size", choices=sorted(SIZES), default="small")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", help="Run only stages whose name contains this string")
+    ap.add_argument("--save", help="Write results JSON here (use as a future baseline)")
+    ap.add_argument("--baseline", help="Baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    ap.add_argument("--workdir", help="Where to keep generated CSVs (default: temp dir)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(args.workdir or tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        results = {}
+        for name, fn in stages(args.size, workdir):
+            if args.only and args.only not in name:
+                continue
+            results[name] = _time(fn, args.repeat)
+            print(f"{name:>40}: {results[name]['median_s'] * 1e3:10.2f} ms")
+
+    doc = {
+        "meta": {"size": args.size, "python": platform.python_version(), "platform": platform.platform()},
+        "results": results,
+    }
+    if args.save:
+        Path(args.save).write_text(json.dumps(doc, indent=2))
+        print(f"Saved {args.save}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        failures = compare(results, baseline, args.threshold)
+        if failures:
+            print("\nRegressions:")
+            for f in failures:
+                print(f"  {f}")
+            sys.exit(1)
+        print(f"\nNo stage regressed more than {args.threshold:.0%} vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
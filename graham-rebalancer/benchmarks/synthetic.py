@@ -0,0 +1,81 @@
+"""
+Synthetic data generators for the benchmark suite. Everything is seeded,
+so a given size always produces the same data.
+"""
+import datetime as dt
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from graham.data_models import MarketInputs
+
+SIGNAL_FIELDS = ("cape", "spx_vs_200d_pct", "yc_10y_3m_bps", "vix_level",
+                 "hy_oas_bps", "unemp_6m_change_pp", "earnings_yield_pct")
+
+
+def market_frame(n: int, seed: int = 0, missing: float = 0.1) -> pd.DataFrame:
+    """n rows of plausible MarketInputs values; `missing` share set to NaN."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "cape": rng.normal(24, 6, n),
+        "spx_vs_200d_pct": rng.normal(2, 6, n),
+        "yc_10y_3m_bps": rng.normal(60, 90, n),
+        "vix_level": rng.gamma(9, 2.2, n),
+        "hy_oas_bps": rng.normal(430, 130, n),
+        "unemp_6m_change_pp": rng.normal(0, 0.3, n),
+        "earnings_yield_pct": rng.normal(5, 1.3, n),
+    })
+    return df.mask(rng.random(df.shape) < missing)
+
+
+def market_inputs(n: int, seed: int = 0) -> list[MarketInputs]:
+    df = market_frame(n, seed)
+    return [MarketInputs(**{k: (None if pd.isna(v) else float(v)) for k, v in row.items()})
+            for row in df.to_dict("records")]
+
+
+def holdings_frame(n: int, seed: int = 0, accounts: int = 0) -> pd.DataFrame:
+    """n holdings rows; accounts > 0 adds an account_id column."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "asset_class": rng.choice(["Stock", "Bond", "Cash"], n, p=[0.6, 0.3, 0.1]),
+        "ticker": np.char.add("T", rng.integers(0, max(10, n // 50), n).astype(str)),
+        "quantity": rng.integers(1, 500, n).astype("float64"),
+        "price": rng.uniform(5, 500, n).round(2),
+    })
+    if accounts:
+        df.insert(0, "account_id", rng.integers(0, accounts, n))
+    df["market_value"] = df["quantity"] * df["price"]
+    return df
+
+
+def holdings_csv(n: int, directory, seed: int = 0) -> Path:
+    """Write (once) a holdings CSV in the repo's layout: BOM, padded tickers, no market_value."""
+    path = Path(directory) / f"holdings_{n}.csv"
+    if not path.exists():
+        df = holdings_frame(n, seed).drop(columns="market_value")
+        df["ticker"] = " " + df["ticker"]
+        df.to_csv(path, index=False, encoding="utf-8-sig", chunksize=1_000_000)
+    return path
+
+
+def stub_sources(latency_s: float = 0.0) -> dict:
+    """Offline stand-ins for the FRED/Yahoo fetchers used by market_signals."""
+    import time
+
+    def fred(series_id, start, end):
+        time.sleep(latency_s)
+        idx = pd.date_range(start, end, freq="D" if series_id != "UNRATE" else "MS")
+        return pd.Series(np.linspace(3.0, 4.0, len(idx)), index=idx)
+
+    def yahoo(ticker, start, end):
+        time.sleep(latency_s)
+        idx = pd.bdate_range(start, end - dt.timedelta(days=1))
+        return pd.Series(np.linspace(4000, 4500, len(idx)), index=idx)
+
+    def yahoo_info(key, start, end):
+        time.sleep(latency_s)
+        return pd.Series([21.0], index=pd.DatetimeIndex([pd.Timestamp(end)]))
+
+    return {"fred": fred, "yahoo": yahoo, "yahoo_info": yahoo_info}
@@ -1,7 +1,11 @@
 import sys  
 import json
+import time
+import argparse
 from pathlib import Path
 
+_T_IMPORT = time.perf_counter()
+
 ROOT = Path(__file__).resolve().parent
 SRC = ROOT / "src"
 if str(SRC) not in sys.path:
@@ -12,36 +16,43 @@ from graham.portfolio import load_holdings
 from graham.target_policy import recommend_equity, next_equity_target
 from graham.rebalance import rebalance_plan
 from graham.reporting import explain
-from graham.market_signals import fetch_market_inputs_live
+from graham.state_store import StateStore
 from graham.scoring import score_breakdown
+from graham import instrument
+_IMPORT_S = time.perf_counter() - _T_IMPORT
 
 
+STATE_PATH = Path(__file__).resolve().parent / "data" / "state.json"   # legacy, read once to seed the store
+STATE_DB_PATH = Path(__file__).resolve().parent / "data" / "state.db"
 
-STATE_PATH = Path(__file__).resolve().parent / "data" / "state.json"
-
-def _read_prev_target(path=STATE_PATH):
-    try:
-        if not path.exists():
-            return None
-        data = json.loads(path.read_text())
-        v = data.get("prev_target")
-        return int(v) if v is not None else None
-    except Exception:
-        return None
-
-def _write_prev_target(value: int, path=STATE_PATH):
-    try:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps({"prev_target": int(value)}, indent=2))
-    except Exception:
-        pass
+def _state_store(path=STATE_DB_PATH) -> StateStore:
+    return StateStore(path)
 
 CONFIG = {
     "holdings_path": "data/holdings_sample.csv",
+    "holdings_engine": "auto",   # "python" (stdlib), "pandas", or "auto" by file size
+
+    # Re-price holdings from live quotes before planning (the export's prices go stale)
+    "refresh_prices": False,
+    "quote_url": None,           # batch quote endpoint (see graham.prices.HTTPQuotes); None = Yahoo
 
     # Choose "manual" or "live"
     "market_source": "live",   # <- set to "live" to auto-fetch, "manual" to use values below
 
+    # Local FRED/Yahoo series cache for "live" (None to always download everything)
+    "series_cache_path": "data/series_cache.sqlite",
+    "offline": False,          # <- True serves live inputs from the cache only
+
+    # Fetch all live signals at once; a signal slower than its timeout comes back as None
+    "concurrent_fetch": True,
+    "fetch_timeout_s": 15.0,   # or a dict per signal, e.g. {"default": 15, "forward_pe": 5}
+    "fetch_retries": 1,
+
+    # Extra indices to track vs their SMAs (MarketInputs.trend_signals, e.g. "^NDX_vs_200d_pct");
+    # fetched in the same batched Yahoo download as ^GSPC/^VIX
+    "trend_tickers": [],       # e.g. ["^NDX", "^RUT", "^STOXX50E"]
+    "trend_windows": [50, 200],
+
     # If using manual, fill these:
     "market": {
         "cape": None,
@@ -58,21 +69,54 @@ CONFIG = {
 
     "hysteresis_band": 5,
     "previous_target": None,
+    "portfolio_id": "default",   # key for run history / latest target in data/state.db
+
+    "print_json_also": False,
 
-    "print_json_also": False
+    # Machine-readable report (.csv, .jsonl or .parquet): one row per account_id in the
+    # holdings (or one for the whole file), with the score breakdown; None = off
+    "report_path": None,
+    "report_summary_path": None,   # optional rendered summary (.txt) or .json
+
+    # Per-stage timings / cache counters: .json or .prom (Prometheus textfile); None = off
+    "metrics_path": None,
 }
 
-def main():
+def run():
     # 0) Build inputs & prefs
+    instrument.record("imports", _IMPORT_S)
     if CONFIG["market_source"] == "live":
-        m = fetch_market_inputs_live(include_cape=CONFIG.get("include_cape", False))
+        # network/pandas stack only for live runs; manual runs stay stdlib-only
+        from graham.market_signals import fetch_market_inputs_live, fetch_market_inputs_concurrent, DEFAULT_TTLS
+        from graham.series_cache import SeriesCache
+        cache = None
+        if CONFIG.get("series_cache_path"):
+            cache = SeriesCache(CONFIG["series_cache_path"], ttls=DEFAULT_TTLS,
+                                offline=CONFIG.get("offline", False))
+        if CONFIG.get("concurrent_fetch", False):
+            with instrument.span("market_inputs", mode="concurrent"):
+                m, fetches = fetch_market_inputs_concurrent(
+                    include_cape=CONFIG.get("include_cape", False), cache=cache,
+                    timeout=CONFIG.get("fetch_timeout_s", 15.0), retries=CONFIG.get("fetch_retries", 1),
+                    trend_tickers=CONFIG.get("trend_tickers", ()), trend_windows=CONFIG.get("trend_windows"))
+            print("— Fetch latency —")
+            for f in fetches.values():
+                status = "timeout" if f.timed_out else (f.error or "ok")
+                print(f"{f.name:>20}: {f.latency_s * 1000:7.0f} ms  attempts={f.attempts}  {status}")
+            print()
+        else:
+            with instrument.span("market_inputs", mode="sequential"):
+                m = fetch_market_inputs_live(include_cape=CONFIG.get("include_cape", False), cache=cache,
+                                             trend_tickers=CONFIG.get("trend_tickers", ()),
+                                             trend_windows=CONFIG.get("trend_windows"))
     else:
         m = MarketInputs(**CONFIG["market"])
     prefs = UserPrefs(**CONFIG["prefs"])
 
+    bd = None
     try:
-        from graham.scoring import score_breakdown
-        bd = score_breakdown(m)
+        with instrument.span("score"):
+            bd = score_breakdown(m)
         print("— Score breakdown —")
         for k, v in bd.items():
             if k == "total_score":
@@ -82,10 +126,13 @@ def main():
     except Exception:
         pass
 
-    rec = recommend_equity(m, prefs)     # {'score': s, 'equity_pct': eq}
+    with instrument.span("target"):
+        rec = recommend_equity(m, prefs)     # {'score': s, 'equity_pct': eq}
     print(f"Proposed equity % (no hysteresis): {rec['equity_pct']}")
 
-    prev = CONFIG.get("previous_target") or _read_prev_target()
+    store = _state_store()
+    portfolio_id = CONFIG.get("portfolio_id", "default")
+    prev = CONFIG.get("previous_target") or store.import_legacy_state(STATE_PATH, portfolio_id)
     band = CONFIG.get("hysteresis_band", 5)
     if prev is not None:
         final_eq = next_equity_target(prev, rec["score"], prefs, band=band)
@@ -94,18 +141,60 @@ def main():
         final_eq = rec["equity_pct"]
         print(f"No previous target found; using proposed {final_eq}\n")
 
-    df = load_holdings(CONFIG["holdings_path"])
+    with instrument.span("load_holdings") as sp:
+        df = load_holdings(CONFIG["holdings_path"], engine=CONFIG.get("holdings_engine", "pandas"))
+        sp.set(rows=len(df))
+
+    if CONFIG.get("refresh_prices", False):
+        from graham.prices import HTTPQuotes, refresh_prices, yahoo_quotes
+        providers = {"http": HTTPQuotes(CONFIG["quote_url"])} if CONFIG.get("quote_url") else {"yahoo": yahoo_quotes}
+        df, quotes = refresh_prices(df, providers)
+        print(f"Re-priced {quotes['tickers'] - len(quotes['missing'])}/{quotes['tickers']} tickers"
+              + (f" (no quote: {', '.join(quotes['missing'])})" if quotes["missing"] else "") + "\n")
 
-    plan = rebalance_plan(df, final_eq, include_cash=prefs.include_cash)
+    with instrument.span("plan"):
+        plan = rebalance_plan(df, final_eq, include_cash=prefs.include_cash)
 
-    print(explain({"score": rec["score"], "equity_pct": final_eq}, plan))
+    with instrument.span("report"):
+        print(explain({"score": rec["score"], "equity_pct": final_eq}, plan))
 
-    _write_prev_target(final_eq)
+    if CONFIG.get("report_path"):
+        with instrument.span("write_report"):
+            write_report(df, {"score": rec["score"], "equity_pct": final_eq, "proposed_pct": rec["equity_pct"]},
+                         plan, bd, portfolio_id, include_cash=prefs.include_cash)
+
+    with instrument.span("record_run"):
+        store.record_run(portfolio_id, final_eq, score=rec["score"], proposed_pct=rec["equity_pct"],
+                         inputs=m, breakdown=bd, plan=plan)
 
     if CONFIG.get("print_json_also", False):
         print("\n--- JSON ---")
         print(json.dumps({"inputs": m.__dict__, "recommendation": {"score": rec["score"], "equity_pct": final_eq}, "plan": plan},
                          default=float, indent=2))
 
+def write_report(df, rec: dict, plan: dict, bd: dict | None, portfolio_id: str, include_cash: bool = True):
+    """Per-account plans when the holdings carry account_id, else the run's single plan."""
+    from graham.reporting import ReportWriter
+    from graham.scoring import active_rules
+    fields = [r.field for r in active_rules()]
+    with ReportWriter(CONFIG["report_path"], breakdown_fields=fields,
+                      summary_path=CONFIG.get("report_summary_path")) as w:
+        cols = df[0].keys() if isinstance(df, list) and df else getattr(df, "columns", ())
+        if "account_id" in cols:
+            from graham.rebalance import rebalance_plan_batch
+            w.write_frame(rebalance_plan_batch(df, rec["equity_pct"], include_cash=include_cash), rec, bd)
+        else:
+            w.write(portfolio_id, rec, plan, bd)
+    print(f"Report written to {CONFIG['report_path']}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the rebalancer with the settings in CONFIG.")
+    ap.add_argument("--profile", metavar="PATH", help="Write cProfile stats here (inspect with pstats)")
+    ap.add_argument("--metrics", metavar="PATH", default=CONFIG.get("metrics_path"),
+                    help="Write per-stage timings and cache counters (.json, or .prom for Prometheus)")
+    args = ap.parse_args(argv)
+    with instrument.profiled(metrics_path=args.metrics, profile_path=args.profile):
+        run()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
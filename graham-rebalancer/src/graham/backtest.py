@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from .data_models import UserPrefs
+from .scoring import score_market_batch
+from .target_policy import map_score_to_equity_batch
+
+
+def hysteresis_scan(proposed, band: int = 5, prev_target: int | None = None) -> np.ndarray:
+    """
+    Sequential apply_hysteresis over a series of proposed targets.
+    Each step compares against the previous *final* target, so this is the
+    one part of the replay that cannot be vectorized.
+    If prev_target is None, the first proposed target is accepted as-is.
+    """
+    prop = np.asarray(proposed, dtype="int64").tolist()
+    out = np.empty(len(prop), dtype="int64")
+    if not prop:
+        return out
+    prev = prop[0] if prev_target is None else int(prev_target)
+    for i, new in enumerate(prop):
+        if abs(new - prev) >= band:
+            prev = new
+        out[i] = prev
+    return out
+
+
+def replay(final_pct, stock_ret, bond_ret, initial_value: float = 100_000.0,
+           initial_equity_pct: int | None = None) -> dict:
+    """
+    Vectorized portfolio replay for a stock/bond book rebalanced to
+    `final_pct` at the close of every date.
+
+    Returns on date t accrue to the weights set at t-1; the book is then
+    traded back to the date-t target. `initial_equity_pct` is the mix held
+    before the first date (defaults to the first target, i.e. no opening trade).
+    """
+    w = np.asarray(final_pct, dtype="float64") / 100.0
+    rs = np.asarray(stock_ret, dtype="float64")
+    rb = np.asarray(bond_ret, dtype="float64")
+    if len(w) == 0:
+        empty = np.empty(0)
+        return {"value": empty, "stock_trade": empty, "bond_trade": empty, "turnover": empty}
+
+    w0 = w[0] if initial_equity_pct is None else initial_equity_pct / 100.0
+    w_prev = np.concatenate(([w0], w[:-1]))
+
+    growth = 1.0 + w_prev * rs + (1.0 - w_prev) * rb
+    value = initial_value * np.cumprod(growth)
+    value_prev = np.concatenate(([initial_value], value[:-1]))
+
+    stock_pre = value_prev * w_prev * (1.0 + rs)
+    stock_trade = value * w - stock_pre
+    return {
+        "value": value,
+        "stock_trade": stock_trade,
+        "bond_trade": -stock_trade,
+        "turnover": np.abs(stock_trade) / value,
+    }
+
+
+def run_backtest(data: pd.DataFrame, prefs: UserPrefs | None = None, band: int = 5,
+                 prev_target: int | None = None, initial_value: float = 100_000.0,
+                 returns_cols: tuple[str, str] = ("Stock", "Bond")) -> pd.DataFrame:
+    """
+    Replay the policy over a dated table.
+
+    `data` is indexed by date and holds MarketInputs columns (NaN = missing)
+    plus one simple-return column per asset class (default 'Stock'/'Bond').
+    Per date it returns the score, the proposed target, the post-hysteresis
+    target, the stock/bond trades, one-way turnover and the portfolio value.
+    """
+    prefs = prefs or UserPrefs()
+    data = data.sort_index()
+    stock_col, bond_col = returns_cols
+    missing = [c for c in returns_cols if c not in data.columns]
+    if missing:
+        raise ValueError(f"Backtest data is missing return columns: {missing}")
+
+    scores = score_market_batch(data)
+    proposed = map_score_to_equity_batch(scores, prefs)
+    final = hysteresis_scan(proposed, band=band, prev_target=prev_target)
+
+    rs = data[stock_col].fillna(0.0).to_numpy(dtype="float64")
+    rb = data[bond_col].fillna(0.0).to_numpy(dtype="float64")
+    r = replay(final, rs, rb, initial_value=initial_value, initial_equity_pct=prev_target)
+
+    return pd.DataFrame(
+        {
+            "score": scores,
+            "proposed_pct": proposed,
+            "equity_target_pct": final,
+            "stock_to_buy(+)sell(-)$": r["stock_trade"],
+            "bond_to_buy(+)sell(-)$": r["bond_trade"],
+            "turnover": r["turnover"],
+            "portfolio_value": r["value"],
+        },
+        index=data.index,
+    )
+
+
+def summarize_backtest(result: pd.DataFrame) -> dict:
+    """
+    Headline stats for a run_backtest result.
+    Target changes count post-hysteresis moves; drawdown is peak-to-trough.
+    """
+    value = result["portfolio_value"].to_numpy(dtype="float64")
+    target = result["equity_target_pct"].to_numpy()
+    peak = np.maximum.accumulate(value) if len(value) else value
+    return {
+        "total_turnover": float(result["turnover"].sum()),
+        "target_changes": int(np.count_nonzero(np.diff(target))) if len(target) else 0,
+        "max_drawdown": float((1.0 - value / peak).max()) if len(value) else 0.0,
+        "final_value": float(value[-1]) if len(value) else float("nan"),
+    }
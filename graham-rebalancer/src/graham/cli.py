@@ -1,13 +1,21 @@
 import argparse
+import time
+_T_IMPORT = time.perf_counter()
+from . import instrument
 from .data_models import MarketInputs, UserPrefs
 from .portfolio import load_holdings
 from .target_policy import recommend_equity, next_equity_target
 from .rebalance import rebalance_plan
 from .reporting import explain
+_IMPORT_S = time.perf_counter() - _T_IMPORT
 
 def parse_args():
     ap = argparse.ArgumentParser(prog="graham")
     ap.add_argument("--holdings", required=True, help="Path to holdings CSV")
+    ap.add_argument("--engine", choices=("auto", "python", "pandas"), default="auto",
+                    help="CSV loader: stdlib for small files (auto), or force one")
+    ap.add_argument("--refresh-prices", action="store_true", help="Re-price holdings from live quotes first")
+    ap.add_argument("--quote-url", help="Batch quote endpoint for --refresh-prices (default: Yahoo)")
     # market inputs
     ap.add_argument("--cape", type=float)
     ap.add_argument("--spx200", type=float, help="% vs 200d")
@@ -21,12 +29,26 @@ def parse_args():
     # hysteresis
     ap.add_argument("--band", type=int, default=5, help="Hysteresis band in pct points")
     ap.add_argument("--prev-target", type=int, help="Previous equity target to compare against")
+    # run history
+    ap.add_argument("--state", help="State DB: previous target is read from and the run recorded to it")
+    ap.add_argument("--portfolio", default="default", help="Portfolio key in the state DB")
     # output
     ap.add_argument("--explain", action="store_true", help="Print human-readable explanation")
+    ap.add_argument("--report", metavar="PATH",
+                    help="Also write the result as a report row (.csv, .jsonl or .parquet)")
+    # instrumentation
+    ap.add_argument("--profile", metavar="PATH", help="Write cProfile stats here (inspect with pstats)")
+    ap.add_argument("--metrics", metavar="PATH",
+                    help="Write per-stage timings (.json, or .prom for a Prometheus textfile)")
     return ap.parse_args()
 
 def main():
     args = parse_args()
+    with instrument.profiled(metrics_path=args.metrics, profile_path=args.profile):
+        run(args)
+
+def run(args):
+    instrument.record("imports", _IMPORT_S)
 
     m = MarketInputs(
         cape=args.cape, spx_vs_200d_pct=args.spx200, yc_10y_3m_bps=args.yc,
@@ -35,18 +57,47 @@ def main():
     prefs = UserPrefs(risk_tilt_pct=args.tilt, include_cash=args.include_cash)
 
     # proposed equity from signals
-    rec = recommend_equity(m, prefs)  # {'score': s, 'equity_pct': proposed}
+    with instrument.span("target"):
+        rec = recommend_equity(m, prefs)  # {'score': s, 'equity_pct': proposed}
+
+    store = None
+    prev_target = args.prev_target
+    if args.state:
+        from .state_store import StateStore
+        store = StateStore(args.state)
+        if prev_target is None:
+            prev_target = store.latest_target(args.portfolio)
 
     # apply hysteresis if previous target supplied
-    if args.prev_target is not None:
-        eq_final = next_equity_target(args.prev_target, rec["score"], prefs, band=args.band)
+    proposed = rec["equity_pct"]
+    if prev_target is not None:
+        eq_final = next_equity_target(prev_target, rec["score"], prefs, band=args.band)
         rec = {"score": rec["score"], "equity_pct": eq_final}  # replace with final
     else:
         eq_final = rec["equity_pct"]
 
     # plan the rebalance
-    df = load_holdings(args.holdings)
-    plan = rebalance_plan(df, eq_final, include_cash=prefs.include_cash)
+    with instrument.span("load_holdings") as sp:
+        df = load_holdings(args.holdings, engine=args.engine)
+        sp.set(rows=len(df))
+    if args.refresh_prices or args.quote_url:
+        from .prices import HTTPQuotes, refresh_prices, yahoo_quotes
+        providers = {"http": HTTPQuotes(args.quote_url)} if args.quote_url else {"yahoo": yahoo_quotes}
+        df, _ = refresh_prices(df, providers)
+    with instrument.span("plan"):
+        plan = rebalance_plan(df, eq_final, include_cash=prefs.include_cash)
+
+    if store is not None:
+        with instrument.span("record_run"):
+            store.record_run(args.portfolio, eq_final, score=rec["score"], proposed_pct=proposed,
+                             inputs=m, plan=plan)
+
+    if args.report:
+        from .reporting import ReportWriter
+        from .scoring import active_rules, score_breakdown
+        with instrument.span("write_report"):
+            with ReportWriter(args.report, breakdown_fields=[r.field for r in active_rules()]) as w:
+                w.write(args.portfolio, {**rec, "proposed_pct": proposed}, plan, score_breakdown(m))
 
     if args.explain:
         print(explain(rec, plan))
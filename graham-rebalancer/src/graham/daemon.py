@@ -0,0 +1,196 @@
+import argparse
+import heapq
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .data_models import UserPrefs
+from .target_policy import map_score_to_equity, apply_hysteresis
+from .scoring import active_rules, signal_contribution
+
+
+@dataclass
+class SignalSource:
+    field: str                                  # MarketInputs field this feeds
+    fetch: Callable[[], float | None]           # returns the latest value (None = missing)
+    interval_s: float = 900.0                   # polling interval
+
+
+@dataclass
+class WatchedPortfolio:
+    name: str
+    holdings: object                            # DataFrame or path, loaded once
+    prefs: UserPrefs = field(default_factory=UserPrefs)
+    band: int = 5
+    target: int | None = None                   # current post-hysteresis target
+
+
+class RebalanceDaemon:
+    """
+    Long-running monitor over many portfolios.
+
+    Keeps the last value and score contribution of every signal. A poll only
+    re-scores signals whose upstream value changed; the equity mapping and
+    hysteresis only run when the total score moves; `on_plan` only fires
+    for portfolios whose target actually changes.
+    """
+
+    def __init__(self, sources: list[SignalSource], portfolios: list[WatchedPortfolio],
+                 on_plan: Callable | None = None, clock: Callable[[], float] = time.monotonic):
+        self.sources = {s.field: s for s in sources}
+        self.portfolios = portfolios
+        self.on_plan = on_plan or _print_plan
+        self.clock = clock
+        self.rules = active_rules()
+        self.values: dict[str, float | None] = {}
+        self.contribs: dict[str, float] = {r.field: 0.0 for r in self.rules}
+        self.total: float | None = None
+        self._due = [(0.0, f) for f in self.sources]
+        heapq.heapify(self._due)
+        self._holdings = {}
+
+    def _score(self) -> float:
+        # rule order, so the running total matches score_market exactly
+        s = 0.0
+        for r in self.rules:
+            s += self.contribs[r.field]
+        return s
+
+    def update(self, field_name: str, value: float | None) -> bool:
+        """Record a new value for one signal; True if its contribution changed."""
+        if field_name in self.values and self.values[field_name] == value:
+            return False
+        self.values[field_name] = value
+        c = signal_contribution(field_name, value, self.rules)
+        if c == self.contribs.get(field_name):
+            return False
+        self.contribs[field_name] = c
+        return True
+
+    def _holdings_for(self, p: WatchedPortfolio):
+        if p.name not in self._holdings:
+            from .portfolio import as_frame  # pandas only once there is a plan to build
+            self._holdings[p.name] = as_frame(p.holdings)
+        return self._holdings[p.name]
+
+    def retarget(self) -> list[tuple]:
+        """Re-run mapping + hysteresis for every portfolio; emit plans for changed targets."""
+        from .rebalance import rebalance_plan
+        events = []
+        for p in self.portfolios:
+            proposed = map_score_to_equity(self.total, p.prefs)
+            new = proposed if p.target is None else apply_hysteresis(p.target, proposed, band=p.band)
+            if new == p.target:
+                continue
+            p.target = new
+            plan = rebalance_plan(self._holdings_for(p), new, include_cash=p.prefs.include_cash)
+            rec = {"score": self.total, "equity_pct": new}
+            events.append((p.name, rec, plan))
+            self.on_plan(p.name, rec, plan)
+        return events
+
+    def poll(self, now: float | None = None) -> list[tuple]:
+        """Fetch every signal that is due; returns the plans emitted."""
+        now = self.clock() if now is None else now
+        changed = False
+        while self._due and self._due[0][0] <= now:
+            _, f = heapq.heappop(self._due)
+            src = self.sources[f]
+            try:
+                changed |= self.update(f, src.fetch())
+            except Exception as e:  # keep the last good value
+                print(f"[graham-daemon] {f}: fetch failed: {e}", file=sys.stderr)
+            heapq.heappush(self._due, (now + src.interval_s, f))
+
+        if changed or self.total is None:
+            total = self._score()
+            if total != self.total:
+                self.total = total
+                return self.retarget()
+        return []
+
+    def next_due(self) -> float:
+        return self._due[0][0] if self._due else float("inf")
+
+    def run(self, stop: threading.Event | None = None):
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.poll()
+            stop.wait(max(0.0, self.next_due() - self.clock()))
+
+
+def _print_plan(name: str, rec: dict, plan: dict):
+    from .reporting import explain
+    print(f"[{name}] target changed")
+    print(explain(rec, plan))
+    print()
+
+
+def default_sources(intervals: dict | None = None, cache=None) -> list[SignalSource]:
+    """
+    The live signals from market_signals, one SignalSource per score field.
+    `intervals` overrides the polling interval (seconds) per field.
+    """
+    from . import market_signals as ms
+
+    def yc():
+        d10, d3m = ms._fred_latest("DGS10", cache=cache), ms._fred_latest("DGS3MO", cache=cache)
+        return (d10 - d3m) * 100.0 if d10 is not None and d3m is not None else None
+
+    def hy():
+        v = ms._fred_latest("BAMLH0A0HYM2", cache=cache)
+        return v * 100.0 if v is not None else None
+
+    def unemp():
+        now, prior = ms._fred_value_and_prior("UNRATE", months_back=24, lag_months=6, cache=cache)
+        return now - prior if now is not None and prior is not None else None
+
+    def ey():
+        fpe = ms.fetch_forward_pe_spy(cache=cache)
+        return 100.0 / fpe if fpe and fpe > 0 else None
+
+    defaults = [
+        SignalSource("spx_vs_200d_pct", lambda: ms._yf_sma_pct_vs("^GSPC", window=200, cache=cache), 900),
+        SignalSource("vix_level", lambda: ms._yf_last_close("^VIX", cache=cache), 300),
+        SignalSource("yc_10y_3m_bps", yc, 3600),
+        SignalSource("hy_oas_bps", hy, 3600),
+        SignalSource("unemp_6m_change_pp", unemp, 6 * 3600),
+        SignalSource("earnings_yield_pct", ey, 6 * 3600),
+    ]
+    for s in defaults:
+        s.interval_s = float((intervals or {}).get(s.field, s.interval_s))
+    return defaults
+
+
+def main():
+    ap = argparse.ArgumentParser(prog="graham-daemon")
+    ap.add_argument("--holdings", action="append", required=True,
+                    help="Holdings CSV/snapshot to monitor (repeatable)")
+    ap.add_argument("--tilt", type=int, default=0)
+    ap.add_argument("--include-cash", action="store_true")
+    ap.add_argument("--band", type=int, default=5, help="Hysteresis band in pct points")
+    ap.add_argument("--prev-target", type=int, help="Starting equity target for every portfolio")
+    ap.add_argument("--interval", action="append", default=[], metavar="FIELD=SECONDS",
+                    help="Polling interval per signal, e.g. vix_level=60")
+    ap.add_argument("--cache", help="SeriesCache path for incremental fetches")
+    args = ap.parse_args()
+
+    intervals = dict(kv.split("=", 1) for kv in args.interval)
+    cache = None
+    if args.cache:
+        from .market_signals import DEFAULT_TTLS
+        from .series_cache import SeriesCache
+        cache = SeriesCache(args.cache, ttls=DEFAULT_TTLS)
+    prefs = UserPrefs(risk_tilt_pct=args.tilt, include_cash=args.include_cash)
+    portfolios = [WatchedPortfolio(path, path, prefs, args.band, args.prev_target) for path in args.holdings]
+
+    daemon = RebalanceDaemon(default_sources(intervals, cache=cache), portfolios)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Dict
 
 @dataclass
 class MarketInputs:
@@ -11,6 +11,7 @@ class MarketInputs:
     unemp_6m_change_pp: Optional[float] = None
     forward_pe: Optional[float] = None           # SP500 forward P/E via SPY
     earnings_yield_pct: Optional[float] = None   # = 100 / forward_pe
+    trend_signals: Optional[Dict[str, Optional[float]]] = None  # trends.trend_key -> % vs SMA
 
 @dataclass
 class UserPrefs:
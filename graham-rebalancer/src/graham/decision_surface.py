@@ -0,0 +1,197 @@
+import argparse
+import bisect
+import json
+import math
+import os
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from .data_models import UserPrefs
+from .scoring import _value, active_rules
+from .target_policy import apply_hysteresis, map_score_to_equity_batch
+
+# Every signal's contribution is a step function, so the input space is a
+# finite grid of regions: one state per signal (its bucket, or "missing")
+# and one score / equity target per combination. A region id is the
+# mixed-radix number of those states, first rule most significant, with
+# radix len(contribs) + 1 per rule (the extra digit is "missing").
+
+
+class DecisionSurface:
+    """
+    Materialized score and equity target for every region of the rules.
+
+    lookup() / what_if() are O(number of signals): one bisect per signal to
+    find its state, then a single array read. sensitivity() lists every
+    single-signal move that would change the target.
+    """
+
+    def __init__(self, fields, breaks, contribs, scores, equity, prefs: UserPrefs, right_closed=None):
+        self.fields = tuple(fields)
+        self.breaks = tuple(tuple(b) for b in breaks)      # effective (bisect_right) breaks
+        self.contribs = tuple(tuple(c) for c in contribs)
+        self.right_closed = tuple(tuple(bool(x) for x in c) or (False,) * len(b)
+                                  for c, b in zip(right_closed or [()] * len(self.breaks), self.breaks))
+        # breaks as written in the rules table (right_closed ones un-nudged), for display
+        self.table_breaks = tuple(tuple(math.nextafter(x, -math.inf) if c else x for x, c in zip(b, cl))
+                                  for b, cl in zip(self.breaks, self.right_closed))
+        self.radix = tuple(len(c) + 1 for c in self.contribs)
+        self.strides = tuple(math.prod(self.radix[i + 1:]) for i in range(len(self.radix)))
+        self.scores = scores
+        self.equity = equity
+        self.prefs = prefs
+
+    # ---- Build / persist ----
+    @classmethod
+    def build(cls, prefs: UserPrefs | None = None, rules: tuple | None = None) -> "DecisionSurface":
+        """
+        Enumerate all regions. Scores are summed rule by rule in rule order
+        (missing adds nothing), so each equals score_market for any input in
+        that region bit for bit.
+        """
+        prefs = prefs or UserPrefs()
+        rules = rules or active_rules()
+        radix = [len(r.contribs) + 1 for r in rules]
+        total = np.zeros(())
+        for i, r in enumerate(rules):
+            c = np.array([*r.contribs, 0.0])
+            shape = [1] * len(rules)
+            shape[i] = radix[i]
+            total = total + c.reshape(shape)
+        scores = np.broadcast_to(total, radix).ravel().copy()
+        equity = map_score_to_equity_batch(scores, prefs).astype("int16")
+        return cls([r.field for r in rules], [r.breaks for r in rules], [r.contribs for r in rules],
+                   scores, equity, prefs, [r.right_closed for r in rules])
+
+    def save(self, path) -> Path:
+        """Write an .npz that load() reads back without rebuilding."""
+        path = Path(path)
+        meta = {"fields": self.fields, "breaks": self.breaks, "contribs": self.contribs,
+                "right_closed": self.right_closed, "prefs": asdict(self.prefs)}
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, scores=self.scores, equity=self.equity, meta=np.array(json.dumps(meta)))
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path) -> "DecisionSurface":
+        with np.load(path) as z:
+            meta = json.loads(str(z["meta"]))
+            return cls(meta["fields"], meta["breaks"], meta["contribs"], z["scores"], z["equity"],
+                       UserPrefs(**meta["prefs"]), meta.get("right_closed"))
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    # ---- Regions ----
+    def state(self, field: str, value) -> int:
+        """Bucket index of `value` for one signal; the last state means missing."""
+        i = self.fields.index(field)
+        if value is None or value != value:  # None / NaN
+            return len(self.contribs[i])
+        return bisect.bisect_right(self.breaks[i], float(value))
+
+    def states(self, m) -> tuple:
+        vals = _values(m, self.fields)
+        return tuple(self.state(f, vals[f]) for f in self.fields)
+
+    def region(self, m) -> int:
+        """Region id for a MarketInputs (or dict of field values)."""
+        return sum(s * k for s, k in zip(self.states(m), self.strides))
+
+    def decode(self, region: int) -> dict:
+        """Region id -> {field: state}."""
+        return {f: (region // k) % r for f, k, r in zip(self.fields, self.strides, self.radix)}
+
+    def bounds(self, field: str, state: int) -> tuple:
+        """
+        Value interval of one state as (lo, hi) in the rules table's breaks,
+        with -inf/inf at the ends; (None, None) for the missing state. An end
+        is inclusive as the table says: lo <= value < hi, or lo < value /
+        value <= hi at a right_closed break.
+        """
+        b = self.table_breaks[self.fields.index(field)]
+        if state == len(b) + 1:
+            return (None, None)
+        return (b[state - 1] if state > 0 else -math.inf, b[state] if state < len(b) else math.inf)
+
+    # ---- Queries ----
+    def lookup(self, m) -> dict:
+        rid = self.region(m)
+        return {"region": rid, "score": float(self.scores[rid]), "equity_pct": int(self.equity[rid])}
+
+    def what_if(self, m, **changes) -> dict:
+        """lookup() with some fields replaced, e.g. what_if(m, vix_level=30, hy_oas_bps=None)."""
+        unknown = set(changes) - set(_as_dict(m)) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Unknown signals: {sorted(unknown)}")
+        return self.lookup({**_as_dict(m), **changes})
+
+    def sensitivity(self, m, prev_target: int | None = None, band: int = 5) -> list[dict]:
+        """
+        Every single-signal move out of the current region that changes the
+        target (after hysteresis against `prev_target` when given). Each
+        entry has the field, the value interval to move into, how far the
+        current value is from it (None when missing either side), and the
+        resulting score and equity target.
+        """
+        vals = _values(m, self.fields)
+        cur = tuple(self.state(f, vals[f]) for f in self.fields)
+        rid = sum(s * k for s, k in zip(cur, self.strides))
+
+        def final(r):
+            eq = int(self.equity[r])
+            return eq if prev_target is None else apply_hysteresis(prev_target, eq, band=band)
+
+        base = final(rid)
+        moves = []
+        for i, f in enumerate(self.fields):
+            v = vals[f]
+            for s in range(self.radix[i]):
+                if s == cur[i]:
+                    continue
+                r = rid + (s - cur[i]) * self.strides[i]
+                eq = final(r)
+                if eq == base:
+                    continue
+                lo, hi = self.bounds(f, s)
+                distance = None
+                if lo is not None and cur[i] != self.radix[i] - 1:
+                    distance = lo - v if s > cur[i] else hi - v
+                moves.append({"field": f, "lo": lo, "hi": hi, "distance": distance,
+                              "score": float(self.scores[r]), "equity_pct": eq})
+        moves.sort(key=lambda d: math.inf if d["distance"] is None else abs(d["distance"]))
+        return moves
+
+
+def _as_dict(m) -> dict:
+    return vars(m) if is_dataclass(m) else m
+
+def _values(m, fields) -> dict:
+    """{field: value or None}, resolved as scoring does (MarketInputs fields, then trend_signals)."""
+    obj = m if is_dataclass(m) else SimpleNamespace(**m)
+    return {f: _value(obj, f) for f in fields}
+
+
+def main():
+    ap = argparse.ArgumentParser(prog="graham-surface", description="Build the decision-surface lookup table")
+    ap.add_argument("out", help="Output path (.npz)")
+    ap.add_argument("--tilt", type=int, default=0)
+    ap.add_argument("--min-equity", type=int, default=25)
+    ap.add_argument("--max-equity", type=int, default=75)
+    ap.add_argument("--step", type=int, default=5)
+    ap.add_argument("--rules", help="Signal rules JSON (default: packaged / $GRAHAM_SIGNAL_RULES)")
+    args = ap.parse_args()
+    if args.rules:
+        from .scoring import use_rules
+        use_rules(args.rules)
+    prefs = UserPrefs(risk_tilt_pct=args.tilt, min_equity=args.min_equity,
+                      max_equity=args.max_equity, step=args.step)
+    surface = DecisionSurface.build(prefs)
+    print(f"Wrote {surface.save(args.out)} ({len(surface)} regions)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+import argparse
+import csv
+import math
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+import numpy as np
+
+from .portfolio import as_frame
+from .prices import _ticker_codes, normalize_ticker
+
+# Drift monitor: per-position quantity/price and per-account market value
+# aggregates in flat typed arrays (array.array, with NumPy views for the
+# bulk build/resync passes). A price tick touches only the positions in
+# that ticker and the aggregates of the accounts holding them, never the
+# whole book.
+
+# Tickers with at least this many positions update through NumPy views;
+# below it a plain loop over the typed arrays is faster
+VECTOR_MIN_POSITIONS = 24
+
+
+@dataclass
+class DriftEvent:
+    account: str
+    equity_pct: float          # current equity weight (% of investable)
+    target_pct: int
+    drift_pp: float            # equity_pct - target_pct
+    investable_total: float
+    ts: object = None          # timestamp of the tick that crossed the band
+
+
+class DriftMonitor:
+    """
+    Equity-weight drift per account against its current target.
+
+    An event fires when an account's equity weight moves more than `band`
+    percentage points away from its target, once per excursion: the account
+    is re-armed when it comes back inside the band (or on retarget()).
+    Weights follow weights_by_class: Stock over the investable total, which
+    includes Cash when `include_cash`.
+
+    Each tick costs O(positions in that ticker). Incremental sums are
+    recomputed exactly every `resync_ticks` ticks, which keeps
+    floating-point drift bounded at an amortized O(1) per tick.
+    """
+
+    def __init__(self, accounts, classes, pos_account, pos_class, pos_qty, pos_price, by_ticker: dict,
+                 static_mv, targets, band: float = 5.0, include_cash: bool = True,
+                 resync_ticks: int = 1_000_000):
+        self.accounts = list(accounts)
+        self.classes = list(classes)
+        self.band = float(band)
+        self.include_cash = include_cash
+        self.resync_ticks = resync_ticks
+        self._index = {a: i for i, a in enumerate(self.accounts)}
+        self._ncls = len(self.classes)
+        self._stock = self.classes.index("Stock") if "Stock" in self.classes else -1
+        counted = [include_cash or c != "Cash" for c in self.classes]
+        self._counted = array("b", counted)
+
+        # positions (one per account/class/ticker)
+        self.pos_account = array("l", pos_account)
+        self.pos_class = array("l", pos_class)
+        self.pos_qty = array("d", pos_qty)
+        self.pos_price = array("d", pos_price)
+        self._pos_cell = array("l", (a * self._ncls + c for a, c in zip(self.pos_account, self.pos_class)))
+        self._pos_counted = array("b", (counted[c] for c in self.pos_class))
+        # tuples for the scalar path, index arrays for tickers held by many accounts
+        self._by_ticker = {t: np.asarray(ps, dtype=np.intp) if len(ps) >= VECTOR_MIN_POSITIONS
+                           else tuple(int(i) for i in ps) for t, ps in by_ticker.items()}
+        # aggregates: market value per account x class (row-major), investable per account
+        self._static_mv = np.asarray(static_mv, dtype="float64").reshape(len(self.accounts), self._ncls)
+        self.mv = array("d", bytes(8 * len(self.accounts) * self._ncls))
+        self.investable = array("d", bytes(8 * len(self.accounts)))
+        self.targets = array("d", targets)
+        self.outside = array("b", bytes(len(self.accounts)))
+        self.ticks = 0
+        self._since = 0
+        # NumPy views over the same buffers (the arrays are never resized)
+        mv = np.frombuffer(self.mv, dtype="float64")
+        self._views = {
+            "qty": np.frombuffer(self.pos_qty, dtype="float64"),
+            "px": np.frombuffer(self.pos_price, dtype="float64"),
+            "acct": np.frombuffer(self.pos_account, dtype=np.dtype("l")),
+            "cell": np.frombuffer(self._pos_cell, dtype=np.dtype("l")),
+            "counted": np.frombuffer(self._pos_counted, dtype="int8").astype("float64"),
+            "mv": mv,
+            "stock": mv[self._stock::self._ncls] if self._stock >= 0 else None,
+            "inv": np.frombuffer(self.investable, dtype="float64"),
+            "tgt": np.frombuffer(self.targets, dtype="float64"),
+            "out": np.frombuffer(self.outside, dtype="int8"),
+        }
+        self.resync()
+
+    @classmethod
+    def from_holdings(cls, holdings, targets, band: float = 5.0, include_cash: bool = True,
+                      account_col: str = "account_id", **kwargs) -> "DriftMonitor":
+        """
+        Build from a holdings frame / row list (load_holdings layout, with
+        `account_col`; one account if absent). `targets` is one equity % for
+        every account or a dict keyed by account.
+        """
+        df = as_frame(holdings)
+        n = len(df)
+        acct_raw = df[account_col].astype(str).str.strip() if account_col in df.columns else None
+        acct_codes, accounts = (acct_raw.factorize(sort=True) if acct_raw is not None
+                                else (np.zeros(n, dtype="int64"), ["default"]))
+        cls_codes, classes = df["asset_class"].astype(str).str.strip().factorize(sort=True)
+        accounts, classes = [str(a) for a in accounts], [str(c) for c in classes]
+        ncls = len(classes)
+
+        mv = df["market_value"].to_numpy(dtype="float64")
+        qty = df["quantity"].to_numpy(dtype="float64") if "quantity" in df.columns else np.full(n, np.nan)
+        if "ticker" in df.columns:
+            t_codes, names = _ticker_codes(df)
+            t_codes = np.where(np.append(names == "", True)[t_codes], -1, t_codes)
+        else:
+            t_codes, names = np.full(n, -1), np.array([], dtype=object)
+        cash = np.asarray(classes, dtype=object)[cls_codes] == "Cash"
+        live = ~np.isnan(qty) & (qty != 0) & ~np.isnan(mv) & ~cash & (t_codes >= 0)
+
+        # rows the feed never reprices (cash, value-only lines) stay as a fixed part of each cell
+        cell = acct_codes * ncls + cls_codes
+        static = np.bincount(cell[~live], weights=np.nan_to_num(mv[~live]), minlength=len(accounts) * ncls)
+
+        # merge lots into one position per (account, class, ticker); price = value / quantity
+        nt = max(len(names), 1)
+        pos_key, inv = np.unique(cell[live] * nt + t_codes[live], return_inverse=True)
+        p_qty = np.bincount(inv, weights=qty[live])
+        p_mv = np.bincount(inv, weights=mv[live])
+        p_cell, p_tick = pos_key // nt, pos_key % nt
+        with np.errstate(invalid="ignore", divide="ignore"):
+            p_price = np.where(p_qty != 0, p_mv / p_qty, 0.0)
+
+        order = np.argsort(p_tick, kind="stable")
+        bounds = np.searchsorted(p_tick[order], np.arange(len(names) + 1))
+        by_ticker = {str(t): order[bounds[i]:bounds[i + 1]] for i, t in enumerate(names)
+                     if bounds[i + 1] > bounds[i]}
+
+        if isinstance(targets, dict):
+            missing = [a for a in accounts if a not in targets][:5]
+            if missing:
+                raise ValueError(f"No equity target for accounts: {missing}")
+            tgt = [float(targets[a]) for a in accounts]
+        else:
+            tgt = [float(targets)] * len(accounts)
+        return cls(accounts, classes, (p_cell // ncls).tolist(), (p_cell % ncls).tolist(), p_qty.tolist(),
+                   p_price.tolist(), by_ticker, static, tgt, band=band, include_cash=include_cash, **kwargs)
+
+    # ---- Aggregates ----
+    def resync(self):
+        """
+        Recompute every aggregate exactly from positions (vectorized) and
+        re-evaluate all accounts. Accounts found outside their band are
+        marked without an event; drifted() lists them.
+        """
+        v, ncls = self._views, self._ncls
+        mv = self._static_mv.ravel() + np.bincount(v["cell"], weights=v["qty"] * v["px"],
+                                                   minlength=len(self.accounts) * ncls)
+        v["mv"][:] = mv
+        counted = np.frombuffer(self._counted, dtype="int8").astype(bool)
+        v["inv"][:] = mv.reshape(-1, ncls)[:, counted].sum(axis=1)
+        v["out"][:] = np.abs(self.equity_weights() - v["tgt"]) > self.band
+        self._since = 0
+
+    def equity_weights(self) -> np.ndarray:
+        """Equity % per account (NaN where the investable total is 0)."""
+        v = self._views
+        stock = v["stock"] if v["stock"] is not None else np.zeros(len(self.accounts))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(v["inv"] != 0, stock / v["inv"] * 100.0, np.nan)
+
+    def drifted(self) -> list[str]:
+        """Accounts currently outside their band."""
+        return [self.accounts[i] for i in np.flatnonzero(self._views["out"])]
+
+    def prices(self) -> dict:
+        """{ticker: current price}: the last tick, or the holdings price before any."""
+        return {t: self.pos_price[int(ps[0])] for t, ps in self._by_ticker.items()}
+
+    def weights(self, account) -> dict:
+        """weights_by_class for one account, from the running aggregates."""
+        a = self._index[str(account)]
+        total = self.investable[a]
+        row = self.mv[a * self._ncls:(a + 1) * self._ncls]
+        w = {c: v / total * 100 if total else math.nan for c, v in zip(self.classes, row)}
+        w["TOTAL"] = total
+        return w
+
+    def plan(self, account, equity_pct: int | None = None) -> dict:
+        """rebalance_plan for one account from the running aggregates (its target by default)."""
+        a = self._index[str(account)]
+        eq = self.targets[a] if equity_pct is None else equity_pct
+        investable = self.investable[a]
+        row = dict(zip(self.classes, self.mv[a * self._ncls:(a + 1) * self._ncls]))
+        cur_stock, cur_bond = row.get("Stock", 0.0), row.get("Bond", 0.0)
+        target_stock = investable * (eq / 100.0)
+        target_bond = investable - target_stock
+        return {
+            "investable_total": investable,
+            "equity_target_pct": int(eq),
+            "current_stock$": cur_stock,
+            "current_bond$": cur_bond,
+            "target_stock$": target_stock,
+            "target_bond$": target_bond,
+            "stock_to_buy(+)sell(-)$": target_stock - cur_stock,
+            "bond_to_buy(+)sell(-)$": target_bond - cur_bond,
+        }
+
+    def retarget(self, account, target: int):
+        """New target for one account (e.g. after a rebalance); re-arms its event."""
+        a = self._index[str(account)]
+        self.targets[a] = float(target)
+        w = self._weight(a)
+        self.outside[a] = w == w and abs(w - target) > self.band
+
+    def _weight(self, a: int) -> float:
+        inv = self.investable[a]
+        if not inv:
+            return math.nan
+        return (self.mv[a * self._ncls + self._stock] if self._stock >= 0 else 0.0) / inv * 100.0
+
+    # ---- Ticks ----
+    def tick(self, ticker: str, price: float, ts=None) -> list[DriftEvent]:
+        """Apply one price; returns the events it triggers (usually none)."""
+        positions = self._by_ticker.get(ticker)
+        if positions is None:
+            positions = self._by_ticker.get(normalize_ticker(ticker))
+            if positions is None:
+                return []
+        price = float(price)
+        if not price > 0:  # bad print: ignore
+            return []
+        events = self._tick_many(positions, price, ts) if type(positions) is not tuple \
+            else self._tick_few(positions, price, ts)
+        self.ticks += 1
+        self._since += 1
+        if self._since >= self.resync_ticks:
+            self.resync()
+        return events
+
+    def _tick_few(self, positions: tuple, price: float, ts) -> list[DriftEvent]:
+        # scalar loop: cheapest for the few holders of a typical ticker
+        qty, px, pa, pcell, pcounted = self.pos_qty, self.pos_price, self.pos_account, self._pos_cell, self._pos_counted
+        mv, inv, targets, outside, band = self.mv, self.investable, self.targets, self.outside, self.band
+        ncls, st = self._ncls, self._stock
+        for i in positions:
+            d = qty[i] * (price - px[i])
+            px[i] = price
+            mv[pcell[i]] += d
+            if pcounted[i]:
+                inv[pa[i]] += d
+        # evaluate once every position has moved (an account can hold the ticker in two classes)
+        events = []
+        for i in positions:
+            a = pa[i]
+            total = inv[a]
+            if not total:
+                outside[a] = 0
+                continue
+            w = (mv[a * ncls + st] if st >= 0 else 0.0) / total * 100.0
+            out = abs(w - targets[a]) > band
+            if out != outside[a]:
+                outside[a] = out
+                if out:
+                    events.append(DriftEvent(self.accounts[a], w, int(targets[a]), w - targets[a], total, ts))
+        return events
+
+    def _tick_many(self, idx: np.ndarray, price: float, ts) -> list[DriftEvent]:
+        # vectorized over a widely held ticker; each position is a distinct (account, class) cell
+        v = self._views
+        d = v["qty"][idx] * (price - v["px"][idx])
+        v["px"][idx] = price
+        v["mv"][v["cell"][idx]] += d
+        a = v["acct"][idx]
+        np.add.at(v["inv"], a, d * v["counted"][idx])
+        total = v["inv"][a]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            w = (v["stock"][a] if v["stock"] is not None else 0.0) / total * 100.0
+        out = np.abs(w - v["tgt"][a]) > self.band
+        flip = np.flatnonzero(out != v["out"][a].astype(bool))
+        if not len(flip):
+            return []
+        events = []
+        for j in flip.tolist():
+            k = int(a[j])
+            if bool(self.outside[k]) == bool(out[j]):  # account listed twice (two classes)
+                continue
+            self.outside[k] = bool(out[j])
+            if out[j]:
+                t = self.targets[k]
+                events.append(DriftEvent(self.accounts[k], float(w[j]), int(t), float(w[j]) - t, self.investable[k], ts))
+        return events
+
+    def run(self, feed: Iterable[tuple], on_event: Callable[[DriftEvent], None] | None = None) -> dict:
+        """Consume (ts, ticker, price) ticks; returns {"ticks", "events", "seconds", "ticks_per_s"}."""
+        n = n_events = 0
+        tick = self.tick
+        t0 = time.perf_counter()
+        for ts, ticker, price in feed:
+            n += 1
+            events = tick(ticker, price, ts)
+            if events:
+                n_events += len(events)
+                if on_event is not None:
+                    for e in events:
+                        on_event(e)
+        dt = time.perf_counter() - t0
+        return {"ticks": n, "events": n_events, "seconds": dt, "ticks_per_s": n / dt if dt else math.inf}
+
+
+# ---- Feeds ----
+def replay_feed(path) -> Iterable[tuple]:
+    """
+    (ts, ticker, price) from a recorded tick file: CSV with ticker and price
+    columns (ts/timestamp optional), or Parquet read batch by batch.
+    """
+    if str(path).lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+        f = pq.ParquetFile(path)
+        ts_col = next((c for c in ("ts", "timestamp") if c in f.schema_arrow.names), None)
+        cols = ["ticker", "price"] + ([ts_col] if ts_col else [])
+        for batch in f.iter_batches(columns=cols):
+            d = batch.to_pydict()
+            yield from zip(d[ts_col] if ts_col else [None] * batch.num_rows, d["ticker"], d["price"])
+        return
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        ts_col = next((c for c in ("ts", "timestamp") if c in (reader.fieldnames or ())), None)
+        for r in reader:
+            yield (r[ts_col] if ts_col else None), r["ticker"], float(r["price"])
+
+def simulated_feed(prices: dict, n_ticks: int, vol: float = 0.001, seed: int | None = None,
+                   chunk: int = 65_536) -> Iterable[tuple]:
+    """
+    Random-walk ticks: each tick picks a ticker uniformly and moves its price
+    by a lognormal step with per-tick volatility `vol`. ts is the tick number.
+    """
+    rng = np.random.default_rng(seed)
+    tickers = list(prices)
+    px = [float(prices[t]) for t in tickers]
+    done = 0
+    while done < n_ticks:
+        k = min(chunk, n_ticks - done)
+        which = rng.integers(0, len(tickers), size=k).tolist()
+        step = np.exp(vol * rng.standard_normal(k) - 0.5 * vol * vol).tolist()
+        for j in range(k):
+            i = which[j]
+            px[i] *= step[j]
+            yield done + j, tickers[i], px[i]
+        done += k
+
+
+def main():
+    ap = argparse.ArgumentParser(prog="graham-drift", description="Watch equity-weight drift tick by tick")
+    ap.add_argument("holdings", help="Holdings CSV or snapshot (account_id column for many accounts)")
+    ap.add_argument("--target", type=int, default=60, help="Equity target %% for every account")
+    ap.add_argument("--state", help="State DB: each account's latest target (falls back to --target)")
+    ap.add_argument("--band", type=float, default=5.0, help="Drift band in pct points")
+    ap.add_argument("--include-cash", action="store_true")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--replay", metavar="PATH", help="Recorded ticks (.csv or .parquet: ts, ticker, price)")
+    src.add_argument("--simulate", type=int, metavar="N", help="Simulate N random-walk ticks")
+    ap.add_argument("--vol", type=float, default=0.001, help="Per-tick volatility for --simulate")
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--quiet", action="store_true", help="Only print the final stats")
+    args = ap.parse_args()
+
+    from .portfolio import load_holdings
+    holdings = as_frame(load_holdings(args.holdings))
+    targets = args.target
+    if args.state:
+        from .state_store import StateStore
+        store = StateStore(args.state)
+        ids = holdings["account_id"].astype(str).str.strip().unique() if "account_id" in holdings else ["default"]
+        targets = {a: t if (t := store.latest_target(a)) is not None else args.target for a in ids}
+    mon = DriftMonitor.from_holdings(holdings, targets, band=args.band, include_cash=args.include_cash)
+    already = mon.drifted()
+    if already:
+        more = f" (+{len(already) - 10} more)" if len(already) > 10 else ""
+        print(f"Already outside the band before any tick: {', '.join(already[:10])}{more}", file=sys.stderr)
+
+    if args.replay:
+        feed = replay_feed(args.replay)
+    else:
+        # start each ticker from its current holdings price
+        feed = simulated_feed(mon.prices(), args.simulate, vol=args.vol, seed=args.seed)
+
+    def show(e: DriftEvent):
+        print(f"[{e.ts}] {e.account}: equity {e.equity_pct:.2f}% vs target {e.target_pct}% "
+              f"({e.drift_pp:+.2f}pp, investable ${e.investable_total:,.2f})")
+
+    stats = mon.run(feed, on_event=None if args.quiet else show)
+    print(f"{stats['ticks']:,} ticks, {stats['events']:,} events, {len(mon.accounts):,} accounts, "
+          f"{stats['ticks_per_s']:,.0f} ticks/s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
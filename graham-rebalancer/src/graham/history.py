@@ -0,0 +1,214 @@
+import argparse
+import datetime as dt
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Point-in-time MarketInputs history, built from local raw files:
+#
+#   raw/DGS10.csv, raw/DGS3MO.csv, raw/BAMLH0A0HYM2.csv   FRED downloads (date, value; "." = missing)
+#   raw/UNRATE_vintages.csv                                ALFRED vintages, wide (observation_date,
+#                                                          UNRATE_YYYYMMDD, ...) or long (realtime_start,
+#                                                          date, value); raw/UNRATE.csv as a fallback
+#   raw/^GSPC.csv, raw/^VIX.csv                            Yahoo daily bars (Date, ..., Close, ...)
+#
+# Each row holds what fetch_market_inputs_live would have returned when run
+# after that day's close: daily FRED values as of the previous day (they
+# publish with a one-day lag) and the UNRATE change from the vintage in
+# effect on the day, not today's revised series.
+FRED_DAILY = ("DGS10", "DGS3MO", "BAMLH0A0HYM2")
+YAHOO = ("^GSPC", "^VIX")
+HISTORY_COLUMNS = ["spx_vs_200d_pct", "yc_10y_3m_bps", "vix_level", "hy_oas_bps", "unemp_6m_change_pp"]
+
+_PART = re.compile(r"part-(\d{8})-(\d{8})\.parquet$")
+
+# Lazy import to keep pyarrow optional
+def _import_pq():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    return pa, pq
+
+
+# ---- Raw files ----
+def read_fred_csv(path) -> pd.Series:
+    """FRED CSV (observation_date/DATE, value column) -> float Series by date."""
+    df = pd.read_csv(path, na_values=["."])
+    s = pd.Series(pd.to_numeric(df.iloc[:, 1], errors="coerce").to_numpy(),
+                  index=pd.DatetimeIndex(pd.to_datetime(df.iloc[:, 0])), name=df.columns[1])
+    return s.dropna().sort_index()
+
+def read_yahoo_csv(path) -> pd.Series:
+    """Yahoo/yfinance daily CSV -> Close by date (handles yfinance's multi-row headers)."""
+    df = pd.read_csv(path)
+    if df.columns[0] == "Price":  # yf.download().to_csv(): Ticker and Date rows under the header
+        df = df.iloc[2:].rename(columns={"Price": "Date"})
+    close = pd.to_numeric(df["Close"], errors="coerce").to_numpy()
+    s = pd.Series(close, index=pd.DatetimeIndex(pd.to_datetime(df["Date"], utc=True).dt.tz_localize(None).dt.normalize()))
+    return s.dropna().sort_index()
+
+def read_alfred_vintages(path) -> pd.DataFrame:
+    """
+    ALFRED vintages -> wide frame: observation date x vintage date
+    (realtime_start), NaN where an observation was not yet published.
+
+    Each column is the full as-of view of that vintage. The long format only
+    lists the values published or revised on each realtime_start, so earlier
+    values are carried forward until superseded or past their realtime_end
+    (inclusive, as ALFRED reports it).
+    """
+    df = pd.read_csv(path, na_values=["."])
+    if {"realtime_start", "date", "value"}.issubset(df.columns):
+        df["realtime_start"] = df["realtime_start"].astype(str)
+        wide = df.pivot_table(index="date", columns="realtime_start", values="value", aggfunc="last")
+        if "realtime_end" in df.columns:
+            end = (df.dropna(subset=["value"]).drop_duplicates(["date", "realtime_start"], keep="last")
+                   .pivot(index="date", columns="realtime_start", values="realtime_end")
+                   .reindex_like(wide).ffill(axis=1).fillna("9999-12-31").astype(str))
+            wide = wide.ffill(axis=1).mask(end.to_numpy(dtype=str) < wide.columns.to_numpy(dtype=str))
+        else:
+            wide = wide.ffill(axis=1)
+    else:
+        wide = df.set_index(df.columns[0])
+        wide.columns = [re.search(r"(\d{8})$", c).group(1) for c in wide.columns]
+    wide.index = pd.to_datetime(wide.index)
+    wide.columns = pd.to_datetime(wide.columns)
+    return wide.apply(pd.to_numeric, errors="coerce").sort_index().sort_index(axis=1)
+
+
+# ---- Vectorized derivations ----
+def asof(s: pd.Series, dates: pd.DatetimeIndex, lag_days: int = 0) -> np.ndarray:
+    """Value of `s` known on each date: the last observation on or before date - lag."""
+    if s.empty:
+        return np.full(len(dates), np.nan)
+    when = (dates - pd.Timedelta(days=lag_days)).to_numpy()
+    i = np.searchsorted(s.index.to_numpy(), when, side="right") - 1
+    return np.where(i >= 0, s.to_numpy(dtype="float64")[np.clip(i, 0, None)], np.nan)
+
+def sma_pct_history(close: pd.Series, window: int = 200) -> pd.Series:
+    """% distance of each close from its trailing `window`-session SMA (NaN until it fills)."""
+    return 100.0 * (close / close.rolling(window).mean() - 1.0)
+
+def unrate_change_by_vintage(vintages: pd.DataFrame, lag_months: int = 6) -> pd.Series:
+    """
+    Latest UNRATE minus the value `lag_months` observations earlier, as
+    published in each vintage (indexed by vintage date). Same positional
+    rule as market_signals._fred_value_and_prior, all vintages at once.
+    """
+    x = vintages.to_numpy(dtype="float64")
+    valid = ~np.isnan(x)
+    # NaNs to the top of each column, published values in date order below
+    packed = np.take_along_axis(x, np.argsort(valid, axis=0, kind="stable"), axis=0)
+    n = valid.sum(axis=0)
+    latest = packed[-1]
+    prior = packed[np.maximum(len(x) - 1 - np.minimum(lag_months, n - 1), 0), np.arange(x.shape[1])]
+    return pd.Series(np.where(n > 0, latest - prior, np.nan), index=vintages.columns)
+
+def build_history(raw_dir, start=None, end=None, fred_lag_days: int = 1, unrate_release_lag_days: int = 37,
+                  window: int = 200) -> pd.DataFrame:
+    """
+    One row per business day in [start, end] with the MarketInputs fields
+    derivable from the raw files (HISTORY_COLUMNS; NaN where unavailable).
+
+    `end` is clamped to the last date all daily raw files cover, so rows
+    are never forward-filled past real data.
+
+    Without UNRATE vintages, UNRATE.csv (revised data) is used with each
+    month assumed known `unrate_release_lag_days` after the month starts.
+    """
+    raw = Path(raw_dir)
+    fred = {sid: read_fred_csv(raw / f"{sid}.csv") if (raw / f"{sid}.csv").exists() else pd.Series(dtype="float64")
+            for sid in FRED_DAILY}
+    yahoo = {t: read_yahoo_csv(raw / f"{t}.csv") if (raw / f"{t}.csv").exists() else pd.Series(dtype="float64")
+             for t in YAHOO}
+
+    daily = [s for s in (*fred.values(), *yahoo.values()) if len(s)]
+    today = pd.Timestamp(dt.date.today())
+    start = pd.Timestamp(start) if start is not None else min((s.index[0] for s in daily), default=today)
+    end = pd.Timestamp(end) if end is not None else today
+    if daily:  # never past the last day every daily source has reached (asof would carry stale values)
+        end = min(end, min(s.index[-1] for s in daily))
+    dates = pd.bdate_range(start, end, name="date")
+
+    dgs10 = asof(fred["DGS10"], dates, fred_lag_days)
+    dgs3m = asof(fred["DGS3MO"], dates, fred_lag_days)
+    out = pd.DataFrame(index=dates)
+    out["spx_vs_200d_pct"] = asof(sma_pct_history(yahoo["^GSPC"], window).dropna(), dates)
+    out["yc_10y_3m_bps"] = (dgs10 - dgs3m) * 100.0
+    out["vix_level"] = asof(yahoo["^VIX"], dates)
+    out["hy_oas_bps"] = asof(fred["BAMLH0A0HYM2"], dates, fred_lag_days) * 100.0
+
+    if (raw / "UNRATE_vintages.csv").exists():
+        change = unrate_change_by_vintage(read_alfred_vintages(raw / "UNRATE_vintages.csv"))
+        out["unemp_6m_change_pp"] = asof(change.dropna(), dates)
+    elif (raw / "UNRATE.csv").exists():
+        u = read_fred_csv(raw / "UNRATE.csv")
+        change = (u - u.shift(6)).dropna()
+        change.index = change.index + pd.Timedelta(days=unrate_release_lag_days)
+        out["unemp_6m_change_pp"] = asof(change, dates)
+    else:
+        out["unemp_6m_change_pp"] = np.nan
+    return out[HISTORY_COLUMNS]
+
+
+# ---- Parquet dataset (append-only parts) ----
+def _parts(out_dir: Path) -> list[tuple[pd.Timestamp, pd.Timestamp, Path]]:
+    found = []
+    for p in out_dir.glob("part-*.parquet"):
+        m = _PART.match(p.name)
+        if m:
+            found.append((pd.Timestamp(m.group(1)), pd.Timestamp(m.group(2)), p))
+    return sorted(found)
+
+def last_date(out_dir) -> pd.Timestamp | None:
+    """Last date already in the dataset (from part file names, no reads)."""
+    parts = _parts(Path(out_dir))
+    return parts[-1][1] if parts else None
+
+def update_dataset(raw_dir, out_dir, end=None, **build_kwargs) -> Path | None:
+    """
+    Append the dates after the dataset's last date as a new part file;
+    earlier parts are never rewritten. Returns the new part (None if
+    nothing new). Derivations run over the full raw history each time
+    (vectorized, so cheap) and only the new rows are kept.
+    """
+    pa, pq = _import_pq()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    prev = last_date(out_dir)
+    hist = build_history(raw_dir, end=end, **build_kwargs)
+    if prev is not None:
+        hist = hist.loc[hist.index > prev]
+    hist = hist.dropna(how="all")
+    if hist.empty:
+        return None
+    name = f"part-{hist.index[0]:%Y%m%d}-{hist.index[-1]:%Y%m%d}.parquet"
+    table = pa.Table.from_pandas(hist.reset_index(), preserve_index=False)
+    path = out_dir / name
+    tmp = out_dir / f".{name}.tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    tmp.replace(path)  # readers never see a half-written part
+    return path
+
+def read_history(out_dir, start=None, end=None) -> pd.DataFrame:
+    """The dataset as a date-indexed frame (backtest/simulate layout)."""
+    _, pq = _import_pq()
+    files = [str(p) for a, b, p in _parts(Path(out_dir))
+             if (start is None or b >= pd.Timestamp(start)) and (end is None or a <= pd.Timestamp(end))]
+    if not files:
+        return pd.DataFrame(columns=HISTORY_COLUMNS, index=pd.DatetimeIndex([], name="date"))
+    df = pq.ParquetDataset(files).read().to_pandas().set_index("date").sort_index()
+    return df.loc[pd.Timestamp(start) if start else None:pd.Timestamp(end) if end else None]
+
+def main():
+    ap = argparse.ArgumentParser(prog="graham-history", description="Build/extend the point-in-time MarketInputs dataset")
+    ap.add_argument("raw", help="Directory of raw FRED/ALFRED/Yahoo CSVs")
+    ap.add_argument("out", help="Parquet dataset directory (new dates are appended as a part)")
+    ap.add_argument("--end", help="Last date to include (default: today)")
+    args = ap.parse_args()
+    path = update_dataset(args.raw, args.out, end=args.end)
+    print(f"Wrote {path}" if path else "Dataset already up to date")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Lightweight run instrumentation: timing spans, counters and payload sizes.
+# Off by default; span() then hands back one shared no-op object, so the
+# cost on hot paths is a global lookup and a method call.
+
+_enabled = False
+_lock = threading.Lock()
+_spans: list[dict] = []
+_counters: dict[str, float] = defaultdict(float)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.start, error=exc_type.__name__ if exc_type else None,
+               **self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Attach attributes known only at the end (rows, bytes, ...)."""
+        self.attrs.update(attrs)
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = on
+
+def enabled() -> bool:
+    return _enabled
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+def span(name: str, **attrs):
+    """`with span("fetch", series="DGS10") as s: ...; s.set(rows=n)`"""
+    return _Span(name, attrs) if _enabled else _NOOP
+
+def record(name: str, seconds: float, **attrs):
+    """Record an already-measured span (e.g. import time taken before enable())."""
+    if not _enabled:
+        return
+    attrs = {k: v for k, v in attrs.items() if v is not None}
+    with _lock:
+        _spans.append({"name": name, "seconds": seconds, "thread": threading.current_thread().name, **attrs})
+
+def incr(name: str, n: float = 1):
+    if _enabled:
+        with _lock:
+            _counters[name] += n
+
+def summary() -> dict:
+    """Spans, per-name totals and counters as one JSON-ready dict."""
+    with _lock:
+        spans = list(_spans)
+        counters = dict(_counters)
+    totals: dict[str, dict] = {}
+    for s in spans:
+        t = totals.setdefault(s["name"], {"count": 0, "seconds": 0.0})
+        t["count"] += 1
+        t["seconds"] += s["seconds"]
+    return {"spans": spans, "totals": totals, "counters": counters}
+
+def _prom_label(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"')
+
+def to_prometheus() -> str:
+    """Prometheus textfile-collector format."""
+    s = summary()
+    lines = [
+        "# HELP graham_span_seconds_total Time spent per instrumented stage.",
+        "# TYPE graham_span_seconds_total counter",
+    ]
+    lines += [f'graham_span_seconds_total{{span="{_prom_label(k)}"}} {v["seconds"]:.6f}' for k, v in s["totals"].items()]
+    lines += ["# HELP graham_span_count_total Number of times each stage ran.",
+              "# TYPE graham_span_count_total counter"]
+    lines += [f'graham_span_count_total{{span="{_prom_label(k)}"}} {v["count"]}' for k, v in s["totals"].items()]
+    lines += ["# HELP graham_counter_total Run counters (cache hits/misses, bytes fetched, ...).",
+              "# TYPE graham_counter_total counter"]
+    lines += [f'graham_counter_total{{name="{_prom_label(k)}"}} {v:g}' for k, v in s["counters"].items()]
+    return "\n".join(lines) + "\n"
+
+def write(path):
+    """Write metrics to `path`: Prometheus text for .prom, JSON otherwise (atomic replace)."""
+    path = Path(path)
+    text = to_prometheus() if path.suffix == ".prom" else json.dumps(summary(), indent=2, default=str)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
+
+
+class profiled:
+    """
+    Context manager for a run: enables spans when `metrics_path` is set and
+    cProfile when `profile_path` is set; writes both on exit.
+    """
+
+    def __init__(self, metrics_path=None, profile_path=None):
+        self.metrics_path = metrics_path
+        self.profile_path = profile_path
+        self._prof = None
+
+    def __enter__(self):
+        if self.metrics_path:
+            reset()
+            enable()
+        if self.profile_path:
+            import cProfile
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self._prof is not None:
+            self._prof.disable()
+            self._prof.dump_stats(str(self.profile_path))
+        if self.metrics_path:
+            write(self.metrics_path)
+            enable(False)
+        return False
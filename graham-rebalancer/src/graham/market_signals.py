@@ -1,10 +1,15 @@
 import os
+import time
 import datetime as dt
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+
 import pandas as pd
-import yfinance as yf
 
+from . import instrument
 from .data_models import MarketInputs
-from dotenv import load_dotenv
+from .series_cache import SeriesCache
 
 # Lazy imports to keep optional deps optional
 def _import_yf():
@@ -15,32 +20,89 @@ def _import_fred():
     from fredapi import Fred
     return Fred
 
-load_dotenv()  # reads .env if present
+@lru_cache(maxsize=1)
+def _load_env():
+    # .env is read on first use of a client, not at import
+    from dotenv import load_dotenv
+    load_dotenv()
+
+# Per-series cache TTLs (seconds); anything not listed uses SeriesCache.ttl
+DEFAULT_TTLS = {
+    "UNRATE": 24 * 3600,          # monthly release
+    "SPY:forwardPE": 24 * 3600,
+}
+
+# ---- Raw fetchers: (series_id, start, end) -> pd.Series ----
+def _fred_fetch(series_id: str, start: dt.date, end: dt.date) -> pd.Series:
+    fred = _fred_client()
+    s = fred.get_series(series_id, observation_start=start, observation_end=end)
+    return pd.Series(dtype="float64") if s is None else s.dropna()
+
+def _yf_fetch(ticker: str, start: dt.date, end: dt.date) -> pd.Series:
+    if start >= end:  # yfinance treats `end` as exclusive
+        return pd.Series(dtype="float64")
+    # Ticker.history rather than yf.download: download() shares module-level
+    # state and is not safe to call from several threads at once.
+    df = _yf_ticker(ticker).history(start=start, end=end, auto_adjust=False)
+    if df is None or df.empty:
+        return pd.Series(dtype="float64")
+    return df["Close"].dropna()
+
+def _yf_info_fetch(key: str, start: dt.date, end: dt.date) -> pd.Series:
+    """'SPY:forwardPE' -> one observation dated today (info is a snapshot, not a series)."""
+    ticker, _ = key.split(":", 1)
+    fpe = _fetch_forward_pe(ticker)
+    if fpe is None:
+        return pd.Series(dtype="float64")
+    return pd.Series([fpe], index=pd.DatetimeIndex([pd.Timestamp(end)]))
+
+SOURCES = {"fred": _fred_fetch, "yahoo": _yf_fetch, "yahoo_info": _yf_info_fetch}
+
+def _series(source: str, series_id: str, start: dt.date, end: dt.date,
+            cache: SeriesCache | None = None) -> pd.Series:
+    """Fetch through the cache when one is given, straight from the source otherwise."""
+    with instrument.span("fetch", source=source, series=series_id) as sp:
+        if cache is not None:
+            s = cache.get(source, series_id, start, end, fetch=SOURCES[source])
+        else:
+            s = SOURCES[source](series_id, start, end)
+        if instrument.enabled():
+            sp.set(rows=len(s), bytes=int(s.memory_usage(index=True)))
+    return s
+
+# ---- Shared clients (one per source, reused across calls and threads) ----
+@lru_cache(maxsize=None)
+def _yf_ticker(ticker: str):
+    return _import_yf().Ticker(ticker)
 
 # ---- FRED helpers ----
+@lru_cache(maxsize=1)
 def _fred_client():
     Fred = _import_fred()
+    _load_env()
     key = os.getenv("FRED_API_KEY")
-    return Fred(api_key=key)
+    fred = Fred(api_key=key)
+    if os.getenv("FRED_API_URL"):  # e.g. a local stub server
+        fred.root_url = os.getenv("FRED_API_URL").rstrip("/")
+    return fred
 
-def _fred_latest(series_id: str, months_back: int = 24) -> float | None:
+def _fred_latest(series_id: str, months_back: int = 24, cache: SeriesCache | None = None) -> float | None:
     """
     Get the latest non-NaN value from a FRED series (as float).
     months_back limits how far we pull to keep it snappy.
     """
-    fred = _fred_client()
     end = dt.date.today()
     start = end - dt.timedelta(days=months_back * 31)
-    s = fred.get_series(series_id, observation_start=start, observation_end=end)
+    s = _series("fred", series_id, start, end, cache)
     if s is None or len(s.dropna()) == 0:
         return None
     return float(s.dropna().to_numpy()[-1])
 
-def _fred_value_and_prior(series_id: str, months_back: int = 24, lag_months: int = 6) -> tuple[float | None, float | None]:
-    fred = _fred_client()
+def _fred_value_and_prior(series_id: str, months_back: int = 24, lag_months: int = 6,
+                          cache: SeriesCache | None = None) -> tuple[float | None, float | None]:
     end = dt.date.today()
     start = end - dt.timedelta(days=max(months_back, lag_months + 1) * 31)
-    s = fred.get_series(series_id, observation_start=start, observation_end=end).dropna()
+    s = _series("fred", series_id, start, end, cache).dropna()
     if len(s) == 0:
         return None, None
     latest = float(s.iloc[-1])
@@ -50,36 +112,43 @@ def _fred_value_and_prior(series_id: str, months_back: int = 24, lag_months: int
     return latest, prior
 
 # ---- Yahoo Finance helpers ----
-def _yf_last_close(ticker: str, lookback_days: int = 400) -> float | None:
-    yf = _import_yf()
+def _yf_last_close(ticker: str, lookback_days: int = 400, cache: SeriesCache | None = None) -> float | None:
     end = dt.date.today()
     start = end - dt.timedelta(days=lookback_days)
-    df = yf.download(ticker, start=start, end=end, progress=False, auto_adjust=False)
-    if df is None or df.empty:
+    close = _series("yahoo", ticker, start, end, cache)
+    if close is None or close.empty:
         return None
-    return float(df["Close"].to_numpy()[-1])
+    return float(close.to_numpy()[-1])
 
 
-def _yf_sma_pct_vs(ticker: str, window: int = 200, lookback_days: int = 480) -> float | None:
-    yf = _import_yf()
+def _yf_sma_pct_vs(ticker: str, window: int = 200, lookback_days: int = 480,
+                   cache: SeriesCache | None = None) -> float | None:
     end = dt.date.today()
     start = end - dt.timedelta(days=lookback_days)
-    df = yf.download(ticker, start=start, end=end, progress=False, auto_adjust=False)
-    if df is None or df.empty or len(df) < window + 5:
+    close = _series("yahoo", ticker, start, end, cache)
+    if close is None or close.empty or len(close) < window + 5:
         return None
-    sma = df["Close"].rolling(window).mean()
-    last = float(df["Close"].to_numpy()[-1])
+    sma = close.rolling(window).mean()
+    last = float(close.to_numpy()[-1])
     last_sma = float(sma.to_numpy()[-1])
     if pd.isna(last_sma) or last_sma == 0:
         return None
     return 100.0 * (last / last_sma - 1.0)
 
-def fetch_forward_pe_spy() -> float | None:
+def fetch_forward_pe_spy(cache: SeriesCache | None = None) -> float | None:
     """
     Try to get SPY forward P/E from yfinance. Returns None if unavailable.
+    With a cache, the last stored snapshot is served while it is within TTL.
     """
+    if cache is None:
+        return _fetch_forward_pe("SPY")
+    end = dt.date.today()
+    s = _series("yahoo_info", "SPY:forwardPE", end - dt.timedelta(days=30), end, cache)
+    return float(s.to_numpy()[-1]) if len(s) else None
+
+def _fetch_forward_pe(ticker: str) -> float | None:
     try:
-        t = yf.Ticker("SPY")
+        t = _yf_ticker(ticker)
         # Prefer the newer .get_info() where available
         info = None
         try:
@@ -98,37 +167,59 @@ def fetch_forward_pe_spy() -> float | None:
         return None
 
 # ---- Public API ----
-def fetch_market_inputs_live(include_cape: bool = False) -> MarketInputs:
+def _yahoo_batch(cache: SeriesCache | None = None, trend_tickers=(), trend_windows=None) -> dict:
     """
-    Pulls live-ish signals:
-      - spx_vs_200d_pct: from Yahoo ^GSPC
-      - vix_level: from Yahoo ^VIX
-      - yc_10y_3m_bps: FRED DGS10 - DGS3MO (in basis points)
-      - hy_oas_bps: FRED BAMLH0A0HYM2 (in bps)
-      - unemp_6m_change_pp: FRED UNRATE last minus ~6 months prior (pp)
+    ^GSPC, ^VIX and any extra trend tickers from one batched download:
+    spx_vs_200d_pct, vix_level and the trend_signals dict.
     """
-    # Yahoo
-    spx_vs_200d_pct = _yf_sma_pct_vs("^GSPC", window=200)
-    vix_level = _yf_last_close("^VIX")
-    
+    from .trends import DEFAULT_WINDOWS, fetch_closes, lookback_days, trend_key, trend_signals
+    windows = tuple(sorted({200, *(trend_windows or DEFAULT_WINDOWS)}))
+    end = dt.date.today()
+    tickers = ["^GSPC", "^VIX", *trend_tickers]
+    closes = fetch_closes(tickers, end - dt.timedelta(days=lookback_days(windows)), end, cache)
+    trends = trend_signals(closes[[t for t in closes.columns if t != "^VIX"]], windows)
+    vix = closes["^VIX"].dropna() if "^VIX" in closes else ()
+    return {
+        "spx_vs_200d_pct": trends.get(trend_key("^GSPC", 200)),
+        "vix_level": float(vix.iloc[-1]) if len(vix) else None,
+        "trend_signals": trends,
+    }
+
+def _raw_jobs(cache: SeriesCache | None = None, trend_tickers=(), trend_windows=None) -> dict:
+    """One zero-arg callable per upstream call fetch_market_inputs_live needs."""
+    return {
+        "yahoo": lambda: _yahoo_batch(cache, trend_tickers, trend_windows),   # ^GSPC, ^VIX, trends
+        "DGS10": lambda: _fred_latest("DGS10", cache=cache),            # 10y Treasury, %
+        "DGS3MO": lambda: _fred_latest("DGS3MO", cache=cache),          # 3m Treasury, %
+        "BAMLH0A0HYM2": lambda: _fred_latest("BAMLH0A0HYM2", cache=cache),  # HY OAS, %
+        "UNRATE": lambda: _fred_value_and_prior("UNRATE", months_back=24, lag_months=6, cache=cache),
+        "forward_pe": lambda: fetch_forward_pe_spy(cache=cache),
+    }
+
+def _assemble(raw: dict) -> MarketInputs:
+    """Turn the raw upstream values (None = unavailable) into MarketInputs."""
+    # Yahoo (one batched job)
+    yahoo = raw.get("yahoo") or {}
+    spx_vs_200d_pct = yahoo.get("spx_vs_200d_pct")
+    vix_level = yahoo.get("vix_level")
 
     # FRED (percents to bps where needed)
-    dgs10 = _fred_latest("DGS10")     # 10y Treasury, %
-    dgs3m = _fred_latest("DGS3MO")    # 3m Treasury, %
+    dgs10 = raw.get("DGS10")
+    dgs3m = raw.get("DGS3MO")
     yc_10y_3m_bps = None
     if dgs10 is not None and dgs3m is not None:
         yc_10y_3m_bps = (dgs10 - dgs3m) * 100.0  # % → bps
 
-    hy_oas_pct = _fred_latest("BAMLH0A0HYM2")  # HY OAS, %
+    hy_oas_pct = raw.get("BAMLH0A0HYM2")
     hy_oas_bps = hy_oas_pct * 100.0 if hy_oas_pct is not None else None
 
-    unrate_now, unrate_prior = _fred_value_and_prior("UNRATE", months_back=24, lag_months=6)
+    unrate_now, unrate_prior = raw.get("UNRATE") or (None, None)
     unemp_6m_change_pp = None
     if unrate_now is not None and unrate_prior is not None:
         unemp_6m_change_pp = unrate_now - unrate_prior  # already in percentage points
-        
+
     # Forward P/E via SPY
-    fpe = fetch_forward_pe_spy()
+    fpe = raw.get("forward_pe")
     ey = 100.0 / fpe if fpe and fpe > 0 else None
 
     # CAPE: left None by default (can be added later via a durable source)
@@ -142,5 +233,94 @@ def fetch_market_inputs_live(include_cape: bool = False) -> MarketInputs:
         hy_oas_bps=hy_oas_bps,
         unemp_6m_change_pp=unemp_6m_change_pp,
         forward_pe=fpe,
-        earnings_yield_pct=ey
+        earnings_yield_pct=ey,
+        trend_signals=yahoo.get("trend_signals"),
     )
+
+def fetch_market_inputs_live(include_cape: bool = False, cache: SeriesCache | None = None,
+                             concurrent: bool = False, timeout: float | dict = 10.0,
+                             retries: int | dict = 1, trend_tickers=(), trend_windows=None) -> MarketInputs:
+    """
+    Pulls live-ish signals:
+      - spx_vs_200d_pct: from Yahoo ^GSPC
+      - vix_level: from Yahoo ^VIX
+      - trend_signals: % vs SMA for ^GSPC and `trend_tickers` over
+        `trend_windows` (default trends.DEFAULT_WINDOWS); all Yahoo tickers
+        come from one batched download
+      - yc_10y_3m_bps: FRED DGS10 - DGS3MO (in basis points)
+      - hy_oas_bps: FRED BAMLH0A0HYM2 (in bps)
+      - unemp_6m_change_pp: FRED UNRATE last minus ~6 months prior (pp)
+    With a SeriesCache, only new observations are fetched; an offline cache
+    serves everything from disk. concurrent=True fetches all signals at once
+    (see fetch_market_inputs_concurrent).
+    """
+    if concurrent:
+        m, _ = fetch_market_inputs_concurrent(include_cape, cache=cache, timeout=timeout, retries=retries,
+                                              trend_tickers=trend_tickers, trend_windows=trend_windows)
+        return m
+    raw = {name: job() for name, job in _raw_jobs(cache, trend_tickers, trend_windows).items()}
+    return _assemble(raw)
+
+# ---- Concurrent fetch ----
+@dataclass
+class SignalFetch:
+    name: str
+    value: object = None          # raw upstream value, None if unavailable
+    latency_s: float = 0.0        # wall time until the value (or the timeout)
+    attempts: int = 0
+    timed_out: bool = False
+    error: str | None = None
+
+def _per_signal(setting, name: str):
+    return setting.get(name, setting.get("default")) if isinstance(setting, dict) else setting
+
+def _run_job(job, retries: int, deadline: float, t0: float, rec: SignalFetch):
+    for attempt in range(retries + 1):
+        rec.attempts = attempt + 1
+        try:
+            rec.value = job()
+            rec.error = None
+            break
+        except Exception as e:  # network/parse errors: retry while budget remains
+            rec.error = f"{type(e).__name__}: {e}"
+            if time.perf_counter() >= deadline:
+                break
+    rec.latency_s = time.perf_counter() - t0
+
+def fetch_market_inputs_concurrent(include_cape: bool = False, cache: SeriesCache | None = None,
+                                   timeout: float | dict = 10.0, retries: int | dict = 1,
+                                   trend_tickers=(), trend_windows=None) -> tuple[MarketInputs, dict]:
+    """
+    Fetch every upstream series at once, one daemon thread per job.
+
+    `timeout` (seconds) and `retries` are either scalars or dicts keyed by
+    job name ('yahoo', 'DGS10', 'DGS3MO', 'BAMLH0A0HYM2', 'UNRATE',
+    'forward_pe'; 'default' for the rest).
+    A job that fails or outlives its timeout comes back as None, so wall
+    time is roughly the slowest single call. Threads are daemonic so a hung
+    request can't hold up interpreter exit either. Returns (MarketInputs,
+    {job name: SignalFetch}) for per-signal latency reporting.
+    """
+    t0 = time.perf_counter()
+    report, threads, deadlines = {}, {}, {}
+    for name, job in _raw_jobs(cache, trend_tickers, trend_windows).items():
+        limit = _per_signal(timeout, name)  # 0 is a real budget (fail fast), only None falls back
+        deadlines[name] = t0 + float(limit if limit is not None else 10.0)
+        report[name] = SignalFetch(name)
+        threads[name] = threading.Thread(
+            target=_run_job,
+            args=(job, int(_per_signal(retries, name) or 0), deadlines[name], t0, report[name]),
+            name=f"graham-fetch-{name}",
+            daemon=True,
+        )
+        threads[name].start()
+
+    for name, th in threads.items():
+        th.join(max(0.0, deadlines[name] - time.perf_counter()))
+        if th.is_alive():  # straggler: its result is discarded
+            rec = report[name]
+            report[name] = SignalFetch(name, None, time.perf_counter() - t0, rec.attempts,
+                                       timed_out=True, error=rec.error)
+
+    raw = {name: rec.value for name, rec in report.items()}
+    return _assemble(raw), report
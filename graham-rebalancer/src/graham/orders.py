@@ -0,0 +1,129 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .portfolio import as_frame
+
+# plan key holding each class's dollar delta
+PLAN_DELTAS = {
+    "Stock": "stock_to_buy(+)sell(-)$",
+    "Bond": "bond_to_buy(+)sell(-)$",
+}
+
+ORDER_COLUMNS = ["asset_class", "ticker", "side", "shares", "price", "notional$"]
+
+
+def _positions(df: pd.DataFrame, asset_class: str) -> pd.DataFrame:
+    """Per-ticker quantity / market value / price for one asset class."""
+    rows = df.loc[df["asset_class"] == asset_class]
+    if rows.empty:
+        return pd.DataFrame(columns=["quantity", "market_value", "price"])
+    tickers = rows["ticker"].astype(str).str.strip()
+    pos = rows.groupby(tickers, sort=True)[["quantity", "market_value"]].sum()
+    pos["price"] = pos["market_value"] / pos["quantity"].where(pos["quantity"] != 0)
+    return pos.loc[(pos["market_value"] > 0) & (pos["price"] > 0)]
+
+
+def _keep_for_min_trade(weights: np.ndarray, delta: float, min_trade: float) -> int:
+    """
+    How many of the (descending) weights to keep so that every order,
+    after renormalizing over the kept set, is at least min_trade dollars.
+    The smallest kept allocation delta*w_k/cumsum(w)_k shrinks with k, so
+    the answer is the last k where it still clears min_trade.
+    """
+    if min_trade <= 0:
+        return len(weights)
+    smallest = abs(delta) * weights / np.cumsum(weights)
+    ok = np.flatnonzero(smallest >= min_trade)
+    return int(ok[-1]) + 1 if len(ok) else 0
+
+
+def _split_class(pos: pd.DataFrame, delta: float, increments: np.ndarray, min_trade: float) -> tuple[pd.DataFrame, float]:
+    """
+    Split one class's dollar delta across its tickers by current weight,
+    round to each ticker's share increment and hand leftover increments to
+    the largest rounding remainders. Returns (orders, residual $).
+    """
+    order = np.argsort(-pos["market_value"].to_numpy(), kind="stable")
+    pos = pos.iloc[order]
+    inc = increments[order]
+    w = pos["market_value"].to_numpy() / pos["market_value"].sum()
+
+    k = _keep_for_min_trade(w, delta, min_trade)
+    if k == 0:
+        return pd.DataFrame(columns=["ticker", "shares", "price", "notional$"]), delta
+    pos, inc, w = pos.iloc[:k], inc[:k], w[:k] / w[:k].sum()
+
+    price = pos["price"].to_numpy()
+    sign = 1.0 if delta >= 0 else -1.0
+    units_raw = np.abs(delta * w / price / inc)
+    units = np.floor(units_raw)
+    # can't sell more than is held
+    max_units = np.floor(pos["quantity"].to_numpy() / inc + 1e-9) if sign < 0 else np.full(k, np.inf)
+    units = np.minimum(units, max_units)
+
+    residual = abs(delta) - float((units * inc * price).sum())
+    cost = inc * price
+    for i in np.argsort(-(units_raw - units), kind="stable"):  # largest remainder first
+        if cost[i] <= residual + 1e-9 and units[i] + 1 <= max_units[i]:
+            units[i] += 1
+            residual -= cost[i]
+
+    shares = sign * units * inc
+    out = pd.DataFrame({
+        "ticker": pos.index.to_numpy(),
+        "shares": shares,
+        "price": price,
+        "notional$": shares * price,
+    })
+    small = out["notional$"].abs() < min_trade
+    residual += float(out.loc[small, "notional$"].abs().sum())
+    out = out.loc[(out["shares"] != 0) & ~small]
+    return out, float(sign * residual)
+
+
+def generate_orders(df: pd.DataFrame, plan: dict, share_increment=1.0, min_trade: float = 0.0,
+                    tolerance: float | None = None) -> pd.DataFrame:
+    """
+    Turn a rebalance_plan's class-level dollar deltas into ticker orders.
+
+    Each class delta is split across that class's tickers in proportion to
+    current market value, then rounded to `share_increment` (a number, or a
+    {ticker: increment} dict, e.g. 1 for whole shares, 0.0001 for fractional).
+    Tickers whose share would fall under `min_trade` dollars are dropped and
+    the rest reweighted. Leftover dollars from rounding are assigned one
+    increment at a time to the largest remainders (sort, then one pass),
+    so the residual per class ends below one increment's cost.
+
+    Returns an order table (shares/notional$ are +buy / -sell). The residual
+    dollars per class are in `orders.attrs["residual$"]`; a warning is
+    raised if one exceeds `tolerance`.
+    """
+    df = as_frame(df)
+    parts, residuals = [], {}
+    for cls, key in PLAN_DELTAS.items():
+        delta = float(plan.get(key, 0.0))
+        if delta == 0:
+            residuals[cls] = 0.0
+            continue
+        pos = _positions(df, cls)
+        if pos.empty:
+            raise ValueError(f"No {cls} positions to split a {delta:+,.2f} trade across.")
+        if isinstance(share_increment, dict):
+            inc = pos.index.map(lambda t: share_increment.get(t, 1.0)).to_numpy(dtype="float64")
+        else:
+            inc = np.full(len(pos), float(share_increment))
+        orders, residual = _split_class(pos, delta, inc, min_trade)
+        orders.insert(0, "asset_class", cls)
+        parts.append(orders)
+        residuals[cls] = residual
+        if tolerance is not None and abs(residual) > tolerance:
+            warnings.warn(f"{cls} rounding residual ${residual:,.2f} exceeds tolerance ${tolerance:,.2f}")
+
+    parts = [p for p in parts if not p.empty]
+    out = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=ORDER_COLUMNS)
+    out["side"] = np.where(out["shares"] > 0, "BUY", "SELL")
+    out = out[ORDER_COLUMNS]
+    out.attrs["residual$"] = residuals
+    return out
@@ -1,7 +1,32 @@
 
-import pandas as pd
+import csv
+import math
+import os
+from typing import TYPE_CHECKING
 
-def load_holdings(path: str) -> pd.DataFrame:
+if TYPE_CHECKING:  # pandas loads on first use; the stdlib row path never imports it
+    import pandas as pd
+
+# engine="auto" parses CSVs up to this size with the csv module: below it,
+# importing pandas costs more than the file does.
+SMALL_CSV_BYTES = 1 << 20
+
+def load_holdings(path: str, engine: str = "pandas"):
+    """
+    engine="pandas" returns a DataFrame; "python" returns a list of row
+    dicts (stdlib only, for small files and fast cold starts); "auto" picks
+    "python" for CSVs up to SMALL_CSV_BYTES and "pandas" otherwise.
+    """
+    from .snapshot import is_snapshot, read_snapshot
+    if is_snapshot(path):  # binary snapshot: no parsing
+        return read_snapshot(path)
+    if engine == "auto":
+        engine = "python" if os.path.getsize(path) <= SMALL_CSV_BYTES else "pandas"
+    if engine == "python":
+        return load_holdings_rows(path)
+    if engine != "pandas":
+        raise ValueError(f"Unknown engine '{engine}' (expected 'pandas', 'python' or 'auto').")
+    import pandas as pd
     df = pd.read_csv(path)
     if "market_value" not in df.columns:
         if {"quantity", "price"}.issubset(df.columns):
@@ -10,8 +35,162 @@ def load_holdings(path: str) -> pd.DataFrame:
             raise ValueError("DataFrame must contain 'market_value' or both 'quantity' and 'price' columns.")
     return df
 
-def weights_by_class(df: pd.DataFrame, include_cash: bool = True) -> dict:
-    g = df.groupby("asset_class")["market_value"].sum()
+def _float(v) -> float:
+    if v is None:
+        return math.nan
+    if isinstance(v, str):
+        v = v.strip()
+        return float(v) if v else math.nan
+    return float(v)
+
+def load_holdings_rows(path: str) -> list[dict]:
+    """
+    Holdings CSV as a list of dicts without pandas. Values are kept as in
+    the file (like read_csv), except quantity/price/market_value which are
+    floats (empty -> NaN); market_value is quantity * price when absent.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = [dict(zip(header, r)) for r in reader if r]
+    return holdings_rows(rows, header)
+
+def holdings_rows(records: list[dict], columns=None) -> list[dict]:
+    """
+    Normalize row dicts in place (CSV rows, or JSON records from a request)
+    the way load_holdings_rows does. `columns` defaults to the union of keys.
+    """
+    columns = columns if columns is not None else {k for r in records for k in r}
+    numeric = [c for c in ("quantity", "price", "market_value") if c in columns]
+    if "market_value" not in columns and not {"quantity", "price"}.issubset(columns):
+        raise ValueError("DataFrame must contain 'market_value' or both 'quantity' and 'price' columns.")
+    for r in records:
+        derive = "market_value" not in r
+        for c in numeric:
+            r[c] = _float(r.get(c))
+        if derive:  # per row, so JSON records may mix cash lines (market_value only) with positions
+            r["market_value"] = r.get("quantity", math.nan) * r.get("price", math.nan)
+    return records
+
+# Explicit dtypes for custodian exports; anything else in the file is ignored
+HOLDINGS_DTYPES = {
+    "account_id": "str",
+    "asset_class": "category",
+    "ticker": "str",
+    "quantity": "float64",
+    "price": "float64",
+    "market_value": "float64",
+}
+
+def load_holdings_stream(path: str, chunksize: int = 1_000_000) -> "pd.DataFrame":
+    """
+    Memory-bounded loader for large lot-level exports.
+
+    Reads the CSV in chunks with fixed dtypes, strips a leading BOM and
+    whitespace-padded tickers/classes, and aggregates each chunk into
+    per-(account_id, asset_class, ticker) totals as it goes, so peak memory
+    tracks the number of distinct positions rather than the file size.
+    `price` in the result is market_value / quantity for the position.
+    """
+    import pandas as pd
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f, skipinitialspace=True), [])
+    # dtypes keyed by the names read_csv will see (padding kept), looked up by the stripped name
+    dtypes = {c: HOLDINGS_DTYPES[c.strip()] for c in header if c.strip() in HOLDINGS_DTYPES}
+    cols = [c.strip() for c in dtypes]
+    if "market_value" not in cols and not {"quantity", "price"}.issubset(cols):
+        raise ValueError("DataFrame must contain 'market_value' or both 'quantity' and 'price' columns.")
+    keys = [k for k in ("account_id", "asset_class", "ticker") if k in cols]
+    values = ["quantity", "market_value"] if "quantity" in cols else ["market_value"]
+
+    acc = None
+    reader = pd.read_csv(
+        path,
+        encoding="utf-8-sig",
+        usecols=lambda c: c.strip() in HOLDINGS_DTYPES,
+        dtype=dtypes,
+        skipinitialspace=True,
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        chunk.columns = [c.strip() for c in chunk.columns]
+        for k in keys:
+            chunk[k] = _strip_categories(chunk[k]) if k == "asset_class" else chunk[k].str.strip()
+        if "market_value" not in chunk:
+            chunk["market_value"] = chunk["quantity"] * chunk["price"]
+        # dropna=False: value-only lines (e.g. Cash) often have a blank ticker or account
+        part = chunk.groupby(keys, observed=True, dropna=False, sort=False)[values].sum()
+        acc = part if acc is None else pd.concat([acc, part]).groupby(
+            level=keys, observed=True, dropna=False, sort=False).sum()
+
+    if acc is None:
+        out = pd.DataFrame({c: pd.Series(dtype=HOLDINGS_DTYPES[c]) for c in keys + values})
+    else:
+        out = acc.reset_index()
+    if "asset_class" in out:
+        out["asset_class"] = out["asset_class"].astype("category")
+    if "quantity" in out:
+        qty = out["quantity"].where(out["quantity"] != 0)
+        out["price"] = out["market_value"] / qty
+    return out
+
+def _strip_categories(col: "pd.Series") -> "pd.Series":
+    """Strip a categorical's labels rather than its values; padded variants merge into one category."""
+    import numpy as np
+    import pandas as pd
+    cats = col.cat.categories.str.strip()
+    uniq = cats.unique()
+    codes = np.append(uniq.get_indexer(cats), -1)[col.cat.codes.to_numpy()]  # code -1 (missing) stays -1
+    return pd.Series(pd.Categorical.from_codes(codes, uniq), index=col.index, name=col.name)
+
+def as_frame(holdings) -> "pd.DataFrame":
+    """
+    Accept a DataFrame, an Arrow Table from a snapshot, or a snapshot path.
+    """
+    import pandas as pd
+    if isinstance(holdings, list):
+        return pd.DataFrame(holdings)
+    if isinstance(holdings, pd.DataFrame):
+        return holdings
+    from .snapshot import table_to_frame
+    if hasattr(holdings, "to_pandas") and hasattr(holdings, "schema"):
+        return table_to_frame(holdings)
+    return load_holdings(holdings)
+
+def class_totals(df):
+    """
+    Market value per asset_class (one grouped pass over the frame). For a
+    list of rows (load_holdings_rows) this is a dict in sorted class order.
+    """
+    if isinstance(df, list):
+        return _class_totals_rows(df)
+    return as_frame(df).groupby("asset_class")["market_value"].sum()
+
+def _class_totals_rows(rows: list[dict]) -> dict:
+    # Kahan-compensated like pandas' groupby sum, NaN skipped, so both
+    # engines produce the same floats for the same file.
+    sums, comp = {}, {}
+    for r in rows:
+        k, v = r["asset_class"], r["market_value"]
+        s, c = sums.setdefault(k, 0.0), comp.get(k, 0.0)
+        if v != v:
+            continue
+        y = v - c
+        t = s + y
+        comp[k] = t - s - y
+        sums[k] = t
+    return {k: sums[k] for k in sorted(sums)}
+
+def weights_by_class(df, include_cash: bool = True, totals=None) -> dict:
+    g = class_totals(df) if totals is None else totals
+    if isinstance(g, dict):
+        total = 0.0
+        for k, v in g.items():
+            if include_cash or k != "Cash":
+                total += v
+        w = {k: v / total * 100 if total else math.nan for k, v in g.items()}
+        w["TOTAL"] = total
+        return w
     total = g.sum() if include_cash else g.drop(labels=["Cash"], errors = "ignore").sum()
     w = (g / total * 100).to_dict()
     w["TOTAL"] = float(total)
@@ -0,0 +1,229 @@
+import json
+import math
+import threading
+import time
+import urllib.request
+from typing import TYPE_CHECKING, Callable
+
+from . import instrument
+
+if TYPE_CHECKING:  # frame paths import numpy/pandas on use; row lists stay stdlib-only
+    import numpy as np
+
+# fetch(tickers) -> {ticker: price}, one upstream request for the whole list;
+# tickers it has no quote for are simply left out
+QuoteFetcher = Callable[[list], dict]
+
+DEFAULT_QUOTE_TTL = 300  # seconds
+
+
+def normalize_ticker(t) -> str:
+    """' lly' -> 'LLY' (custodian exports pad and mix case)."""
+    return str(t).strip().upper()
+
+
+# ---- Providers ----
+def yahoo_quotes(tickers: list) -> dict:
+    """Last close for every ticker from one yf.download over the past few sessions."""
+    if not tickers:
+        return {}
+    from .market_signals import _import_yf
+    from .trends import _DOWNLOAD_LOCK
+    with _DOWNLOAD_LOCK:
+        df = _import_yf().download(list(tickers), period="5d", auto_adjust=False, progress=False, threads=False)
+    if df is None or df.empty:
+        return {}
+    close = df["Close"]
+    if close.ndim == 1:  # single ticker, flat columns
+        close = close.to_frame(tickers[0])
+    last = close.ffill().iloc[-1]
+    return {t: float(v) for t, v in last.items() if v == v}
+
+
+class HTTPQuotes:
+    """
+    Quote endpoint that takes every symbol in one request: POSTs
+    {"symbols": [...]} to `url` and accepts {"SYM": price, ...} or
+    {"quotes": [{"symbol": ..., "price": ...}, ...]} back.
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0, headers: dict | None = None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def __call__(self, tickers: list) -> dict:
+        req = urllib.request.Request(self.url, data=json.dumps({"symbols": list(tickers)}).encode(),
+                                     headers=self.headers, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            doc = json.loads(resp.read())
+        if isinstance(doc, dict) and isinstance(doc.get("quotes"), list):
+            doc = {q["symbol"]: q.get("price") for q in doc["quotes"]}
+        if not isinstance(doc, dict):
+            raise ValueError(f"Unexpected quote response from {self.url}")
+        return {normalize_ticker(t): float(p) for t, p in doc.items() if p is not None}
+
+
+# ---- Cache ----
+class QuoteCache:
+    """
+    In-memory ticker -> (price, fetched_at) with a TTL; one instance is
+    shared across accounts and runs so each ticker is fetched once per TTL.
+    Thread-safe.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_QUOTE_TTL, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._quotes: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tickers) -> tuple[dict, list]:
+        """(fresh quotes, tickers that are missing or expired)."""
+        now = self.clock()
+        hits, missing = {}, []
+        with self._lock:
+            for t in tickers:
+                q = self._quotes.get(t)
+                if q is not None and now - q[1] < self.ttl:
+                    hits[t] = q[0]
+                else:
+                    missing.append(t)
+        return hits, missing
+
+    def put(self, quotes: dict):
+        now = self.clock()
+        with self._lock:
+            for t, p in quotes.items():
+                self._quotes[t] = (p, now)
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+
+def fetch_quotes(tickers, providers: dict[str, QuoteFetcher] | None = None,
+                 cache: QuoteCache | None = None) -> tuple[dict, dict]:
+    """
+    Quotes for the distinct normalized `tickers`: fresh ones from `cache`,
+    the rest in one request per provider, in order, each provider asked
+    only for what the previous ones did not return. A failing provider is
+    recorded and skipped.
+
+    Returns (quotes, report) with report = {"tickers", "cached",
+    "fetched": {provider: n}, "errors": {provider: msg}, "missing": [...]}.
+    """
+    providers = providers if providers is not None else {"yahoo": yahoo_quotes}
+    tickers = list(dict.fromkeys(normalize_ticker(t) for t in tickers))
+    quotes, missing = cache.get(tickers) if cache is not None else ({}, tickers)
+    report = {"tickers": len(tickers), "cached": len(quotes), "fetched": {}, "errors": {}}
+    instrument.incr("quotes.cached", len(quotes))
+    for name, fetch in providers.items():
+        if not missing:
+            break
+        try:
+            with instrument.span("fetch", source=f"quotes:{name}", series=len(missing)) as sp:
+                got = fetch(missing)
+                sp.set(rows=len(got))
+        except Exception as e:
+            report["errors"][name] = f"{type(e).__name__}: {e}"
+            continue
+        got = {normalize_ticker(t): float(p) for t, p in got.items()
+               if p is not None and math.isfinite(p) and p > 0}
+        wanted = {t: got[t] for t in missing if t in got}
+        if cache is not None:
+            cache.put(wanted)
+        quotes.update(wanted)
+        report["fetched"][name] = len(wanted)
+        missing = [t for t in missing if t not in wanted]
+    report["missing"] = missing
+    return quotes, report
+
+
+# ---- Revaluation ----
+def holdings_tickers(holdings) -> set:
+    """Distinct normalized tickers of priced (non-Cash) rows in a frame or row list."""
+    if isinstance(holdings, list):
+        return {normalize_ticker(r["ticker"]) for r in holdings
+                if r.get("ticker") and str(r.get("asset_class", "")).strip() != "Cash"}
+    import numpy as np
+    if "ticker" not in holdings.columns:
+        return set()
+    codes, uniq = _ticker_codes(holdings)
+    return set(uniq[np.unique(codes[_priced(holdings) & (codes >= 0)])])
+
+def apply_quotes(holdings, quotes: dict):
+    """
+    Set price = quote and market_value = quantity * price on every row
+    whose ticker has a quote and that has a quantity; other rows (cash,
+    unquoted tickers) keep their exported values. A DataFrame is returned
+    as an updated copy in one vectorized pass; a row list is updated in place.
+    """
+    if isinstance(holdings, list):
+        for r in holdings:
+            p = quotes.get(normalize_ticker(r.get("ticker", "")))
+            q = r.get("quantity", math.nan)
+            if p is not None and q == q and str(r.get("asset_class", "")).strip() != "Cash":
+                r["price"] = p
+                r["market_value"] = q * p
+        return holdings
+    if "ticker" not in holdings.columns or "quantity" not in holdings.columns:
+        return holdings
+    import numpy as np
+    df = holdings.copy()
+    codes, uniq = _ticker_codes(df)
+    # one dict lookup per distinct ticker, then a gather over all rows;
+    # code -1 (no ticker) reads the trailing NaN
+    px = np.array([quotes.get(t, np.nan) for t in uniq] + [np.nan], dtype="float64")[codes]
+    qty = df["quantity"].to_numpy(dtype="float64")
+    ok = ~np.isnan(px) & ~np.isnan(qty) & _priced(df)
+    price = df["price"].to_numpy(dtype="float64", copy=True) if "price" in df.columns else np.full(len(df), np.nan)
+    mv = df["market_value"].to_numpy(dtype="float64", copy=True)
+    price[ok] = px[ok]
+    mv[ok] = qty[ok] * px[ok]
+    df["price"] = price
+    df["market_value"] = mv
+    return df
+
+def _ticker_codes(df) -> tuple["np.ndarray", "np.ndarray"]:
+    """Row codes into the distinct normalized tickers; each distinct raw value is normalized once."""
+    import numpy as np
+    import pandas as pd
+    raw_codes, raw = pd.factorize(df["ticker"])
+    norm_codes, uniq = pd.factorize(pd.Index(raw).astype(str).str.strip().str.upper())
+    codes = np.append(norm_codes, -1)[raw_codes]
+    return codes, np.asarray(uniq, dtype=object)
+
+def _priced(df) -> "np.ndarray":
+    """Rows that carry a market price: everything but the Cash class."""
+    import numpy as np
+    import pandas as pd
+    if "asset_class" not in df.columns:
+        return np.ones(len(df), dtype=bool)
+    codes, classes = pd.factorize(df["asset_class"])
+    cash = np.array([str(c).strip() == "Cash" for c in classes] + [False])
+    return ~cash[codes]
+
+def refresh_prices(books, providers: dict[str, QuoteFetcher] | None = None,
+                   cache: QuoteCache | None = None):
+    """
+    Re-price holdings before planning. `books` is one holdings frame / row
+    list, or a list or dict of them (e.g. one per account file): tickers are
+    gathered across all of them and quoted in a single fetch_quotes call.
+    Returns (books in the same shape, fetch_quotes report).
+    """
+    items = books if isinstance(books, dict) else dict(enumerate(books)) if _is_collection(books) else {None: books}
+    tickers = set()
+    for h in items.values():
+        tickers |= holdings_tickers(h)
+    with instrument.span("refresh_prices", tickers=len(tickers)):
+        quotes, report = fetch_quotes(sorted(tickers), providers, cache)
+        out = {k: apply_quotes(h, quotes) for k, h in items.items()}
+    if isinstance(books, dict):
+        return out, report
+    if None in out:
+        return out[None], report
+    return [out[i] for i in range(len(out))], report
+
+def _is_collection(books) -> bool:
+    """A list of holdings (frames or row lists) rather than a single row list."""
+    return isinstance(books, (list, tuple)) and bool(books) and not isinstance(books[0], dict)
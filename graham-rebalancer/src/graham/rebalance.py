@@ -1,19 +1,27 @@
-import pandas as pd
-from .portfolio import weights_by_class
+from typing import TYPE_CHECKING
 
-def rebalance_plan(df: pd.DataFrame, equity_pct: int, include_cash: bool = True) -> dict:
+from .portfolio import as_frame, class_totals, weights_by_class
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+def rebalance_plan(df, equity_pct: int, include_cash: bool = True) -> dict:
     """
-    Given a portfolio DataFrame and target equity %, returns the dollar
-    amounts to buy/sell in stocks and bonds to reach the target.
+    Given a portfolio DataFrame (or a list of rows from load_holdings_rows)
+    and target equity %, returns the dollar amounts to buy/sell in stocks
+    and bonds to reach the target.
     """
     
-    # Calculate current weights
-    w = weights_by_class(df, include_cash=include_cash)
+    # Calculate current weights (one groupby shared by everything below)
+    if not isinstance(df, list):  # row lists are planned without pandas
+        df = as_frame(df)
+    g = class_totals(df)
+    w = weights_by_class(df, include_cash=include_cash, totals=g)
     investable = float(w["TOTAL"])
     
     # Current $ amounts
-    cur_stock = float(df.loc[df["asset_class"] == "Stock", "market_value"].sum())
-    cur_bond = float(df.loc[df["asset_class"] == "Bond", "market_value"].sum())
+    cur_stock = float(g.get("Stock", 0.0))
+    cur_bond = float(g.get("Bond", 0.0))
     
     # Target $ amounts based on equity percentage
     target_stock = investable * (equity_pct / 100.0)
@@ -28,4 +36,57 @@ def rebalance_plan(df: pd.DataFrame, equity_pct: int, include_cash: bool = True)
         "target_bond$": target_bond,
         "stock_to_buy(+)sell(-)$": target_stock - cur_stock,
         "bond_to_buy(+)sell(-)$": target_bond - cur_bond
-    }
\ No newline at end of file
+    }
+
+
+def rebalance_plan_batch(df: "pd.DataFrame", equity_pct, include_cash: bool = True,
+                         account_col: str = "account_id") -> "pd.DataFrame":
+    """
+    rebalance_plan for many accounts at once.
+
+    `df` is one holdings table with an `account_col` column; `equity_pct` is
+    a single target for every account or a dict/Series keyed by account.
+    Returns one row per account (indexed by account) with the same keys
+    rebalance_plan returns, from a single grouped pass over the holdings.
+    """
+    import pandas as pd
+    df = as_frame(df)
+    g = (
+        df.groupby([account_col, "asset_class"], observed=True)["market_value"]
+        .sum()
+        .unstack("asset_class", fill_value=0.0)
+    )
+    g = g.reindex(columns=sorted(g.columns))
+
+    # Summed column by column in class order, like Series.sum over class_totals
+    investable = pd.Series(0.0, index=g.index)
+    for cls in g.columns:
+        if include_cash or cls != "Cash":
+            investable = investable + g[cls]
+
+    if isinstance(equity_pct, (dict, pd.Series)):
+        target = pd.Series(equity_pct).reindex(g.index)
+        if target.isna().any():
+            missing = list(target.index[target.isna()])[:5]
+            raise ValueError(f"No equity target for accounts: {missing}")
+        target = target.astype("int64")
+    else:
+        target = pd.Series(int(equity_pct), index=g.index, dtype="int64")
+
+    cur_stock = g["Stock"] if "Stock" in g.columns else pd.Series(0.0, index=g.index)
+    cur_bond = g["Bond"] if "Bond" in g.columns else pd.Series(0.0, index=g.index)
+    target_stock = investable * (target / 100.0)
+    target_bond = investable - target_stock
+
+    out = pd.DataFrame({
+        "investable_total": investable,
+        "equity_target_pct": target,
+        "current_stock$": cur_stock,
+        "current_bond$": cur_bond,
+        "target_stock$": target_stock,
+        "target_bond$": target_bond,
+        "stock_to_buy(+)sell(-)$": target_stock - cur_stock,
+        "bond_to_buy(+)sell(-)$": target_bond - cur_bond,
+    })
+    out.columns.name = None
+    return out
@@ -1,4 +1,11 @@
+import csv
+import json
+import math
+from pathlib import Path
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    import pandas as pd
 
 def _fmt(x):
     return f"${x:,.2f}"
@@ -24,3 +31,216 @@ def explain(rec: dict, plan: dict) -> str:
     )
     return "\n".join(lines)
 
+
+# ---- Streaming reports ----
+# Nightly batch output: one row per account (recommendation, plan and
+# optionally the score breakdown) streamed to CSV, JSONL or Parquet in
+# fixed-size batches, so memory stays bounded however many accounts run.
+PLAN_KEYS = (
+    "investable_total", "equity_target_pct", "current_stock$", "current_bond$",
+    "target_stock$", "target_bond$", "stock_to_buy(+)sell(-)$", "bond_to_buy(+)sell(-)$",
+)
+REPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet", ".pq": "parquet"}
+
+_JSON = json.JSONEncoder(separators=(",", ":"), allow_nan=False, default=float)
+
+# Lazy import to keep pyarrow optional
+def _import_pq():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    return pa, pq
+
+def _nan_to_none(v):
+    return None if isinstance(v, float) and math.isnan(v) else v
+
+
+class ReportWriter:
+    """
+    Streams per-account results to `path` (format from the suffix, or
+    `fmt`). Columns are fixed up front: account, score, proposed_pct,
+    equity_pct, PLAN_KEYS, then `<field>` / `<field>_contrib` for each of
+    `breakdown_fields` (e.g. the active rules' fields) when given.
+
+    Rows are buffered `batch_rows` at a time; the file is written under a
+    temporary name and renamed on close(), so readers never see a partial
+    report (an exception inside `with` discards it). close() returns the
+    running summary; `summary_path` also writes it (.json, or rendered text).
+    """
+
+    def __init__(self, path, fmt: str | None = None, breakdown_fields=(), batch_rows: int = 8192,
+                 summary_path=None):
+        self.path = Path(path)
+        self.fmt = fmt or REPORT_FORMATS.get(self.path.suffix.lower())
+        if self.fmt not in ("csv", "jsonl", "parquet"):
+            raise ValueError(f"Unknown report format for '{self.path.name}' (expected .csv, .jsonl or .parquet).")
+        self.breakdown_fields = tuple(breakdown_fields)
+        self.columns = ["account", "score", "proposed_pct", "equity_pct", *PLAN_KEYS,
+                        *(c for f in self.breakdown_fields for c in (f, f"{f}_contrib"))]
+        self.batch_rows = batch_rows
+        self.summary_path = summary_path
+        self._rows: list[tuple] = []
+        self._summary = {"accounts": 0, "investable_total": 0.0, "stock_trade$": 0.0, "bond_trade$": 0.0,
+                         "buy_stock": 0, "sell_stock": 0, "targets": {}}
+        self._tmp = self.path.with_name(f".{self.path.name}.tmp")
+        if self.fmt == "parquet":
+            pa, pq = _import_pq()
+            self.schema = pa.schema([
+                ("account", pa.string()), ("score", pa.float64()), ("proposed_pct", pa.int64()),
+                ("equity_pct", pa.int64()),
+                *((k, pa.int64() if k == "equity_target_pct" else pa.float64()) for k in PLAN_KEYS),
+                *((c, pa.float64()) for c in self.columns[4 + len(PLAN_KEYS):]),
+            ])
+            self._writer = pq.ParquetWriter(self._tmp, self.schema, compression="zstd")
+        else:
+            self._file = open(self._tmp, "w", newline="", encoding="utf-8")
+            if self.fmt == "csv":
+                self._csv = csv.writer(self._file)
+                self._csv.writerow(self.columns)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # ---- Rows ----
+    def write(self, account, rec: dict, plan: dict, breakdown: dict | None = None):
+        """One account: rec as from recommend_equity (may carry proposed_pct), plan from rebalance_plan."""
+        bd = breakdown or {}
+        eq = int(rec["equity_pct"])
+        row = [str(account), _nan_to_none(rec.get("score")), int(rec.get("proposed_pct", eq)), eq]
+        row += [plan[k] for k in PLAN_KEYS]
+        for f in self.breakdown_fields:
+            part = bd.get(f)
+            row += (None, None) if part is None else (part["value"], part["contrib"])
+        self._rows.append(tuple(row))
+
+        s = self._summary
+        s["accounts"] += 1
+        s["investable_total"] += plan["investable_total"]
+        trade = plan["stock_to_buy(+)sell(-)$"]
+        s["stock_trade$"] += trade
+        s["bond_trade$"] += plan["bond_to_buy(+)sell(-)$"]
+        s["buy_stock"] += trade > 0
+        s["sell_stock"] += trade < 0
+        s["targets"][eq] = s["targets"].get(eq, 0) + 1
+        if len(self._rows) >= self.batch_rows:
+            self.flush()
+
+    def write_frame(self, plans: "pd.DataFrame", rec: dict | None = None, breakdown: dict | None = None):
+        """
+        Many accounts at once from rebalance_plan_batch (indexed by account),
+        written in batch_rows slices without going through Python rows.
+        `rec` / `breakdown` are the shared score and breakdown of the run.
+        """
+        import pandas as pd
+        self.flush()
+        rec, bd = rec or {}, breakdown or {}
+        out = pd.DataFrame({"account": plans.index.astype(str)})
+        out["score"] = float(rec["score"]) if rec.get("score") is not None else float("nan")
+        eq = plans["equity_target_pct"].to_numpy(dtype="int64")
+        out["proposed_pct"] = int(rec["proposed_pct"]) if "proposed_pct" in rec else eq
+        out["equity_pct"] = eq
+        for k in PLAN_KEYS:
+            out[k] = plans[k].to_numpy()
+        for f in self.breakdown_fields:
+            part = bd.get(f)
+            out[f] = float("nan") if part is None else float(part["value"])
+            out[f"{f}_contrib"] = float("nan") if part is None else float(part["contrib"])
+
+        s = self._summary
+        trade = plans["stock_to_buy(+)sell(-)$"]
+        s["accounts"] += len(plans)
+        s["investable_total"] += float(plans["investable_total"].sum())
+        s["stock_trade$"] += float(trade.sum())
+        s["bond_trade$"] += float(plans["bond_to_buy(+)sell(-)$"].sum())
+        s["buy_stock"] += int((trade > 0).sum())
+        s["sell_stock"] += int((trade < 0).sum())
+        for pct, n in out["equity_pct"].value_counts().items():
+            s["targets"][int(pct)] = s["targets"].get(int(pct), 0) + int(n)
+
+        for i in range(0, len(out), self.batch_rows):
+            self._write_chunk(out.iloc[i:i + self.batch_rows])
+
+    def _write_chunk(self, chunk: "pd.DataFrame"):
+        if self.fmt == "parquet":
+            pa, _ = _import_pq()
+            self._writer.write_table(pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False))
+        else:  # same serializer as write(), so both paths produce identical text
+            cols = []
+            for c in self.columns:
+                col = chunk[c]
+                vals = col.tolist()
+                if col.dtype.kind == "f" and col.isna().any():  # missing -> None, as in write()
+                    vals = [None if v != v else v for v in vals]
+                cols.append(vals)
+            self._emit(list(zip(*cols)))
+
+    def flush(self):
+        rows, self._rows = self._rows, []
+        if rows:
+            self._emit(rows)
+
+    def _emit(self, rows: list[tuple]):
+        if self.fmt == "csv":
+            self._csv.writerows(rows)
+        elif self.fmt == "jsonl":
+            cols, enc = self.columns, _JSON.encode
+            lines = []
+            for r in rows:
+                try:
+                    lines.append(enc(dict(zip(cols, r))))
+                except ValueError:  # NaN/inf are not valid JSON: written as null
+                    lines.append(enc({c: _nan_to_none(v) for c, v in zip(cols, r)}))
+            lines.append("")
+            self._file.write("\n".join(lines))
+        else:
+            pa, _ = _import_pq()
+            cols = list(zip(*rows))
+            self._writer.write_table(pa.Table.from_arrays(
+                [pa.array(c, type=f.type, from_pandas=True) for c, f in zip(cols, self.schema)], schema=self.schema))
+
+    # ---- Finish ----
+    def summary(self) -> dict:
+        s = dict(self._summary)
+        s["targets"] = dict(sorted(s["targets"].items()))
+        return s
+
+    def close(self) -> dict:
+        self.flush()
+        if self.fmt == "parquet":
+            self._writer.close()
+        else:
+            self._file.close()
+        self._tmp.replace(self.path)
+        summary = self.summary()
+        if self.summary_path:
+            p = Path(self.summary_path)
+            text = json.dumps(summary, indent=2) if p.suffix.lower() == ".json" else render_summary(summary)
+            p.write_text(text + "\n", encoding="utf-8")
+        return summary
+
+    def abort(self):
+        """Discard everything written so far."""
+        self._rows = []
+        if self.fmt == "parquet":
+            self._writer.close()
+        else:
+            self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+def render_summary(summary: dict) -> str:
+    """Human-readable ReportWriter summary (aggregate counterpart of explain)."""
+    lines = [
+        f"Accounts: {summary['accounts']:,}",
+        f"Investable total: {_fmt(summary['investable_total'])}",
+        f"Net stock trade: {_fmt(summary['stock_trade$'])} "
+        f"({summary['buy_stock']:,} buying, {summary['sell_stock']:,} selling)",
+        f"Net bond trade:  {_fmt(summary['bond_trade$'])}",
+        "Equity targets: " + ", ".join(f"{pct}%: {n:,}" for pct, n in summary["targets"].items()),
+    ]
+    return "\n".join(lines)
@@ -1,157 +1,182 @@
+import bisect
+import json
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 from .data_models import MarketInputs
 
-def score_market(m: MarketInputs) -> float:
+# ---- Signal rules ----
+# Each signal's score is a step function of its value, declared once in
+# signal_rules.json (or a file named by GRAHAM_SIGNAL_RULES):
+#
+#   "vix_level": {"breaks": [15, 25], "right_closed": [false, true],
+#                 "contribs": [0.25, 0.0, -0.5]}
+#
+# reads "< 15 -> +0.25, 15..25 -> 0, > 25 -> -0.5". `breaks` are ascending;
+# a value equal to a break falls in the bucket above it unless that break is
+# right_closed (then it stays below). Any MarketInputs field can have a rule.
+if TYPE_CHECKING:  # numpy/pandas load on the first batch call, not at import
+    import numpy as np
+    import pandas as pd
+
+RULES_PATH = Path(__file__).with_name("signal_rules.json")
+
+@dataclass(frozen=True)
+class CompiledRule:
+    field: str
+    breaks: tuple       # right_closed breaks nudged up one ulp, so bisect_right
+    contribs: tuple     # works for every break; len(contribs) == len(breaks) + 1
+    right_closed: tuple = ()  # per break, as in the table (empty = none closed)
+
+    def contrib(self, value: float) -> float:
+        return self.contribs[bisect.bisect_right(self.breaks, value)]
+
+def load_rules(path=None) -> dict:
+    """Read a rules table (JSON) from `path`, $GRAHAM_SIGNAL_RULES or the packaged default."""
+    path = path or os.getenv("GRAHAM_SIGNAL_RULES") or RULES_PATH
+    return json.loads(Path(path).read_text())
+
+def compile_rules(rules: dict) -> tuple:
+    compiled = []
+    for field, r in rules.items():
+        breaks = [float(b) for b in r["breaks"]]
+        closed = r.get("right_closed") or [False] * len(breaks)
+        contribs = tuple(float(c) for c in r["contribs"])
+        if len(contribs) != len(breaks) + 1 or len(closed) != len(breaks):
+            raise ValueError(f"Rule '{field}': need len(contribs) == len(breaks) + 1 == len(right_closed) + 1")
+        eff = tuple(math.nextafter(b, math.inf) if c else b for b, c in zip(breaks, closed))
+        if any(a >= b for a, b in zip(eff, eff[1:])):
+            raise ValueError(f"Rule '{field}': breaks must be strictly ascending")
+        compiled.append(CompiledRule(field, eff, contribs, tuple(bool(c) for c in closed)))
+    return tuple(compiled)
+
+_RULES: tuple | None = None
+
+def use_rules(rules=None):
+    """Install a rules table (dict or JSON path; None = reload the default) for all scoring."""
+    global _RULES
+    _RULES = compile_rules(rules if isinstance(rules, dict) else load_rules(rules))
+    return _RULES
+
+def active_rules() -> tuple:
+    return _RULES if _RULES is not None else use_rules()
+
+def _value(m: MarketInputs, field: str) -> float | None:
+    v = getattr(m, field, None)
+    if v is None:  # rules may also name extra trend signals, e.g. "^NDX_vs_200d_pct"
+        v = (getattr(m, "trend_signals", None) or {}).get(field)
+    if v is None:
+        return None
+    v = float(v)
+    return None if math.isnan(v) else v
+
+def signal_contribution(field: str, value: float | None, rules: tuple | None = None) -> float:
+    """Score contribution of one signal value (0.0 if missing or unscored)."""
+    for r in rules or active_rules():
+        if r.field == field:
+            return 0.0 if value is None or math.isnan(value) else r.contrib(float(value))
+    return 0.0
+
+def score_market(m: MarketInputs, rules: tuple | None = None) -> float:
     """ 
     Returns a signed score. Higher -> more equity, lower -> less equity.
     Rough target range is about [-3, +3], but we clip/scale later.
+    Missing (None) signals contribute nothing.
     """
-    
     s = 0.0
-    
-    # - Valution (CAPE): cheaper is better
-    if m.cape is not None:
-        if m.cape < 15:
-            s += 1.0
-        elif m.cape <= 22:
-            s += 0.3
-        elif m.cape <= 28:
-            s -= -0.3
-        else:
-            s -= 1.0
-            
-    # - Trend (S&P vs 200d): above = mild tailwind; below = caution
-    if m.spx_vs_200d_pct is not None:
-        s += 0.5 if m.spx_vs_200d_pct >= 0 else -0.5
-        
-    # - Yield Curve (10y - 3m, bps): inverted = caution
-    if m.yc_10y_3m_bps is not None:
-        if m.yc_10y_3m_bps < 0:
-            s += -0.5
-        elif m.yc_10y_3m_bps < 50:
-            s += -0.1
-        else:
-            s += 0.2
-            
-    # - Volatility (VIX): high = caution
-    if m.vix_level is not None:
-        if m.vix_level < 15:
-            s += 0.25
-        elif m.vix_level > 25:
-            s += -0.5
-        # 15 - 25 is neutral (0)
-        
-    # - Credit spreads (HY OAS, bps): wide spreads = stress
-    if m.hy_oas_bps is not None:
-        if m.hy_oas_bps < 350:
-            s += 0.25
-        elif m.hy_oas_bps > 500:
-            s += -0.5
-            # in-between is neutral 
-            
-    # Labor (unemployment 6m change, pp): rising unemployment = caution
-    if m.unemp_6m_change_pp is not None:
-        if m.unemp_6m_change_pp < -0.2:
-            s += 0.25
-        elif m.unemp_6m_change_pp >= 0.2:
-            s += -0.25
-            # small changes are neutral
-            
-    # if m.forward_pe is not None:
-    #     fpe = float(m.forward_pe)
-    #     if fpe < 15:      
-    #         s += 1.0   # cheap
-    #     elif fpe <= 18:   
-    #         s += 0.3   # somewhat reasonable
-    #     elif fpe <= 22:   
-    #         s -= 0.3   # a bit rich
-    #     else:             
-    #         s -= 1.0   # expensive
-            
-    if m.earnings_yield_pct is not None:
-        ey = float(m.earnings_yield_pct)  # e.g., 5.5 means 5.5%
-        if ey >= 6.0:       
-            s += 1.0    # attractive vs bonds
-        elif ey >= 4.5:     
-            s += 0.3
-        elif ey >= 3.5:     
-            s += -0.3
-        else:               
-            s += -1.0   # expensive / low yield
-
+    for r in rules or active_rules():
+        v = _value(m, r.field)
+        if v is not None:
+            s += r.contrib(v)
     return s
 
 
-def score_breakdown(m: MarketInputs) -> dict:
+def score_breakdown(m: MarketInputs, rules: tuple | None = None) -> dict:
     """
-    Return a per-signal breakdown with raw values and contributions.
-    Works with either valuation input:
-      - earnings_yield_pct (preferred, if present)
-      - forward_pe (fallback)
+    Return a per-signal breakdown with raw values and contributions,
+    for every signal that is present. Same rules and total as score_market.
     """
     parts = {}
     total = 0.0
-
-    # --- Valuation: Earnings Yield (%) preferred ---
-    if m.earnings_yield_pct is not None:
-        ey = float(m.earnings_yield_pct)  # e.g., 5.5 means 5.5%
-        if ey >= 6.0:      c =  +1.0   # cheap vs bonds
-        elif ey >= 4.5:    c =  +0.3
-        elif ey >= 3.5:    c =  -0.3
-        else:              c =  -1.0   # expensive / low yield
-        parts["earnings_yield_pct"] = {"value": round(ey, 2), "contrib": c}
+    for r in rules or active_rules():
+        v = _value(m, r.field)
+        if v is None:
+            continue
+        c = r.contrib(v)
+        parts[r.field] = {"value": round(v, 2), "contrib": c}
         total += c
 
-    # # --- Valuation: Forward P/E (used only if EY missing) ---
-    # elif m.forward_pe is not None:
-    #     fpe = float(m.forward_pe)
-    #     if fpe < 15:       c =  +1.0   # cheap
-    #     elif fpe <= 18:    c =  +0.3
-    #     elif fpe <= 22:    c =  -0.3
-    #     else:              c =  -1.0   # expensive
-    #     parts["forward_pe"] = {"value": fpe, "contrib": c}
-    #     total += c
-
-    # --- Trend (S&P vs 200d, %) ---
-    if m.spx_vs_200d_pct is not None:
-        c = 0.5 if m.spx_vs_200d_pct >= 0 else -0.5
-        parts["spx_vs_200d_pct"] = {"value": round(m.spx_vs_200d_pct, 2), "contrib": c}
-        total += c
+    parts["total_score"] = total
+    return parts
 
-    # --- Yield curve (10y-3m, bps) ---
-    if m.yc_10y_3m_bps is not None:
-        yc = float(m.yc_10y_3m_bps)
-        if yc < 0:         c = -0.5
-        elif yc < 50:      c = -0.1
-        else:              c = +0.2
-        parts["yc_10y_3m_bps"] = {"value": round(yc, 2), "contrib": c}
-        total += c
 
-    # --- VIX level ---
-    if m.vix_level is not None:
-        vx = float(m.vix_level)
-        if vx < 15:        c = +0.25
-        elif vx > 25:      c = -0.5
-        else:              c =  0.0
-        parts["vix_level"] = {"value": round(vx, 2), "contrib": c}
-        total += c
+# ---- Batch scoring ----
+# Vectorized counterparts of score_market / score_breakdown over the same
+# compiled rules (np.searchsorted instead of bisect). Input is a DataFrame
+# or a dict of NumPy columns, one per MarketInputs field, with NaN (or an
+# absent column) meaning "missing" — exactly like `None` above.
 
-    # --- HY OAS (bps) ---
-    if m.hy_oas_bps is not None:
-        hy = float(m.hy_oas_bps)
-        if hy < 350:       c = +0.25
-        elif hy > 500:     c = -0.5
-        else:              c =  0.0
-        parts["hy_oas_bps"] = {"value": round(hy, 2), "contrib": c}
-        total += c
+def _batch_columns(data, rules: tuple) -> tuple[dict, int, object]:
+    """
+    Normalize a DataFrame / dict of columns into float64 arrays, one per rule.
+    Returns (columns, n_rows, index) where index is the DataFrame index or None.
+    """
+    import numpy as np
+    index = getattr(data, "index", None)
+    cols = {r.field: np.asarray(data[r.field], dtype="float64") for r in rules if r.field in data}
+    if index is not None:
+        n = len(index)
+    elif cols:
+        n = len(next(iter(cols.values())))
+    else:
+        raise ValueError("Batch input must contain at least one scored MarketInputs column.")
+    for r in rules:
+        if r.field not in cols:
+            cols[r.field] = np.full(n, np.nan)
+        elif cols[r.field].shape != (n,):
+            raise ValueError(f"Column '{r.field}' has shape {cols[r.field].shape}, expected ({n},).")
+    return cols, n, index
 
-    # --- Unemployment Δ 6m (pp) ---
-    if m.unemp_6m_change_pp is not None:
-        du = float(m.unemp_6m_change_pp)
-        if du <= -0.2:     c = +0.25
-        elif du >=  0.2:   c = -0.25
-        else:              c =  0.0
-        parts["unemp_6m_change_pp"] = {"value": round(du, 2), "contrib": c}
-        total += c
+def _batch_contribs(cols: dict, rules: tuple) -> dict:
+    """
+    Per-signal contributions (NaN where the signal is missing): one
+    searchsorted per signal, O(log k) per value.
+    """
+    import numpy as np
+    out = {}
+    for r in rules:
+        x = cols[r.field]
+        idx = np.searchsorted(np.asarray(r.breaks), x, side="right")
+        c = np.asarray(r.contribs)[np.minimum(idx, len(r.contribs) - 1)]
+        out[r.field] = np.where(np.isnan(x), np.nan, c)
+    return out
 
-    parts["total_score"] = total
-    return parts
+def score_breakdown_batch(data, rules: tuple | None = None) -> "pd.DataFrame":
+    """
+    Vectorized score_breakdown. Returns one row per input row with a
+    contribution column per signal (NaN where the signal was skipped)
+    plus 'total_score'.
+    """
+    import numpy as np
+    import pandas as pd
+    rules = rules or active_rules()
+    cols, n, index = _batch_columns(data, rules)
+    parts = _batch_contribs(cols, rules)
+
+    # same summation order as the scalar path so totals match bit-for-bit
+    total = np.zeros(n)
+    for r in rules:
+        total += np.nan_to_num(parts[r.field], nan=0.0)
+
+    out = pd.DataFrame(parts, index=index)
+    out["total_score"] = total
+    return out
+
+def score_market_batch(data, rules: tuple | None = None) -> "np.ndarray":
+    """
+    Vectorized score_market: one total score per row.
+    """
+    return score_breakdown_batch(data, rules)["total_score"].to_numpy()
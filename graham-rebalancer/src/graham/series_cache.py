@@ -0,0 +1,200 @@
+import datetime as dt
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from . import instrument
+
+# fetch(series_id, start, end) -> pd.Series of floats indexed by date
+Fetcher = Callable[[str, dt.date, dt.date], pd.Series]
+# fetch_many(series_ids, start, end) -> {series_id: pd.Series}, one upstream call;
+# ids it could not fetch are left out, an empty Series means "no new data"
+BatchFetcher = Callable[[list, dt.date, dt.date], dict]
+
+DEFAULT_TTL = 6 * 3600  # seconds
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    source    TEXT NOT NULL,
+    series_id TEXT NOT NULL,
+    date      TEXT NOT NULL,
+    value     REAL NOT NULL,
+    PRIMARY KEY (source, series_id, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series_meta (
+    source     TEXT NOT NULL,
+    series_id  TEXT NOT NULL,
+    covered_from TEXT,
+    last_date    TEXT,
+    fetched_at REAL,
+    PRIMARY KEY (source, series_id)
+);
+"""
+
+
+class SeriesCache:
+    """
+    Local SQLite cache of time series keyed by (source, series_id).
+
+    - get() only asks the upstream for observations newer than the last
+      cached date (or older than any start fetched so far, if a longer
+      lookback is asked for).
+    - A series is not re-fetched at all while it is younger than its TTL.
+      `ttls` maps series_id or (source, series_id) to seconds.
+    - offline=True never calls a fetcher and serves whatever is cached.
+    - `sources` maps a source name to a fetcher that overrides the one the
+      caller passes in (e.g. a local stand-in for FRED/Yahoo).
+    """
+
+    def __init__(self, path, ttl: float = DEFAULT_TTL, ttls: dict | None = None,
+                 offline: bool = False, sources: dict[str, Fetcher] | None = None,
+                 clock: Callable[[], float] = time.time):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.offline = offline
+        self.sources = dict(sources or {})
+        self.clock = clock
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as con, con:
+            con.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _ttl_for(self, source: str, series_id: str) -> float:
+        return self.ttls.get((source, series_id), self.ttls.get(series_id, self.ttl))
+
+    def meta(self, source: str, series_id: str) -> tuple[dt.date | None, dt.date | None, float | None]:
+        """(covered_from, last_date, fetched_at) for a series, Nones if never cached."""
+        with closing(self._connect()) as con:
+            row = con.execute(
+                "SELECT covered_from, last_date, fetched_at FROM series_meta WHERE source=? AND series_id=?",
+                (source, series_id),
+            ).fetchone()
+        if row is None:
+            return None, None, None
+        first, last, fetched_at = row
+        to_date = lambda s: dt.date.fromisoformat(s) if s else None
+        return to_date(first), to_date(last), fetched_at
+
+    def read(self, source: str, series_id: str, start: dt.date | None = None,
+             end: dt.date | None = None) -> pd.Series:
+        """Cached observations in [start, end] as a float Series indexed by Timestamp."""
+        q = "SELECT date, value FROM observations WHERE source=? AND series_id=?"
+        args: list = [source, series_id]
+        if start is not None:
+            q += " AND date >= ?"
+            args.append(start.isoformat())
+        if end is not None:
+            q += " AND date <= ?"
+            args.append(end.isoformat())
+        with closing(self._connect()) as con:
+            rows = con.execute(q + " ORDER BY date", args).fetchall()
+        idx = pd.DatetimeIndex([r[0] for r in rows])
+        return pd.Series([r[1] for r in rows], index=idx, dtype="float64", name=series_id)
+
+    def store(self, source: str, series_id: str, s: pd.Series | None,
+              fetched_at: float | None = None, covered_from: dt.date | None = None):
+        """Upsert observations and refresh the series' coverage / fetch time."""
+        s = pd.Series(dtype="float64") if s is None else s.dropna()
+        rows = [(source, series_id, pd.Timestamp(d).date().isoformat(), float(v)) for d, v in s.items()]
+        with closing(self._connect()) as con, con:
+            con.executemany("INSERT OR REPLACE INTO observations VALUES (?, ?, ?, ?)", rows)
+            con.execute(
+                """
+                INSERT INTO series_meta (source, series_id, covered_from, last_date, fetched_at)
+                SELECT ?, ?, COALESCE(?, MIN(date)), MAX(date), ?
+                FROM observations WHERE source=? AND series_id=?
+                ON CONFLICT (source, series_id) DO UPDATE SET
+                    covered_from=MIN(COALESCE(excluded.covered_from, series_meta.covered_from),
+                                     COALESCE(series_meta.covered_from, excluded.covered_from)),
+                    last_date=excluded.last_date,
+                    fetched_at=COALESCE(excluded.fetched_at, series_meta.fetched_at)
+                """,
+                (source, series_id, covered_from.isoformat() if covered_from else None,
+                 fetched_at, source, series_id),
+            )
+
+    def get(self, source: str, series_id: str, start: dt.date, end: dt.date | None = None,
+            fetch: Fetcher | None = None) -> pd.Series:
+        """
+        Series for [start, end], topping up the cache from `fetch` first
+        unless offline or still within TTL.
+        """
+        end = end or dt.date.today()
+        fetch = self.sources.get(source, fetch)
+        if not self.offline and fetch is not None:
+            covered, last, fetched_at = self.meta(source, series_id)
+            now = self.clock()
+            stale = fetched_at is None or now - fetched_at >= self._ttl_for(source, series_id)
+            missing_head = covered is not None and start < covered
+            if stale or missing_head:
+                instrument.incr("series_cache.miss")
+                parts = []
+                if covered is None or last is None:
+                    parts.append(fetch(series_id, start, end))
+                else:
+                    if missing_head:
+                        parts.append(fetch(series_id, start, covered - dt.timedelta(days=1)))
+                    if stale and last < end:
+                        parts.append(fetch(series_id, last + dt.timedelta(days=1), end))
+                parts = [p for p in parts if p is not None and len(p)]
+                instrument.incr("series_cache.rows_fetched", sum(len(p) for p in parts))
+                self.store(source, series_id, pd.concat(parts) if parts else None,
+                           fetched_at=now if stale else None, covered_from=start)
+            else:
+                instrument.incr("series_cache.hit")
+        else:
+            instrument.incr("series_cache.offline" if self.offline else "series_cache.hit")
+        return self.read(source, series_id, start, end)
+
+    def get_many(self, source: str, series_ids, start: dt.date, end: dt.date | None = None,
+                 fetch_many: BatchFetcher | None = None) -> dict:
+        """
+        get() for several series of one source with one upstream call: every
+        series that needs data is fetched together, from the earliest date
+        any of them is missing through `end`. Falls back to per-series get()
+        when `sources` overrides this source.
+        """
+        end = end or dt.date.today()
+        if source in self.sources or fetch_many is None or self.offline:
+            return {i: self.get(source, i, start, end) for i in series_ids}
+
+        now = self.clock()
+        need, stale_ids, uncached, fetch_from = [], set(), set(), None
+        for i in series_ids:
+            covered, last, fetched_at = self.meta(source, i)
+            stale = fetched_at is None or now - fetched_at >= self._ttl_for(source, i)
+            missing_head = covered is not None and start < covered
+            if not (stale or missing_head):
+                instrument.incr("series_cache.hit")
+                continue
+            instrument.incr("series_cache.miss")
+            lo = start if last is None or missing_head else last + dt.timedelta(days=1)
+            fetch_from = lo if fetch_from is None else min(fetch_from, lo)
+            need.append(i)
+            if last is None:
+                uncached.add(i)
+            if stale:
+                stale_ids.add(i)
+
+        if need:
+            if fetch_from <= end:
+                got = fetch_many(need, fetch_from, end)
+            else:  # already cached through `end`: nothing new to ask for
+                got = {i: pd.Series(dtype="float64") for i in need}
+            for i in need:
+                part = got.get(i)
+                # not in the batch response (or nothing at all for a series with no rows cached yet):
+                # leave it stale so the next call retries; no new rows for a cached series is fresh
+                if part is None or (i in uncached and not len(part)):
+                    instrument.incr("series_cache.fetch_missing")
+                    continue
+                instrument.incr("series_cache.rows_fetched", len(part))
+                self.store(source, i, part, fetched_at=now if i in stale_ids else None, covered_from=start)
+        return {i: self.read(source, i, start, end) for i in series_ids}
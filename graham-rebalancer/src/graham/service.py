@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import fields
+from pathlib import Path
+from typing import Callable
+
+from . import instrument
+from .data_models import MarketInputs, UserPrefs
+from .rebalance import rebalance_plan
+from .scoring import score_breakdown
+from .target_policy import next_equity_target, recommend_equity
+
+# HTTP/JSON front end for the rebalancer, stdlib asyncio only.
+#
+#   GET  /health, /inputs, /stats
+#   POST /score      {"inputs": {...}}                               -> score_breakdown
+#   POST /recommend  {"inputs", "prefs", "prev_target", "band"}      -> recommend_equity, then
+#                                                                       next_equity_target with prev_target
+#   POST /plan       same + "holdings": [rows] or "holdings_path"    -> recommendation + rebalance_plan
+#
+# "inputs" overrides fields of the shared MarketInputs snapshot, which a
+# background task refreshes every `refresh_s`. Responses are cached as
+# encoded bytes in an LRU keyed by a hash of the effective inputs, prefs,
+# hysteresis settings and holdings; identical requests in flight share
+# one computation.
+
+_INPUT_FIELDS = {f.name for f in fields(MarketInputs)}
+_PREF_FIELDS = {f.name for f in fields(UserPrefs)}
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+MAX_BODY = 64 * 1024 * 1024
+
+
+class RecommendationService:
+    def __init__(self, fetch_inputs: Callable[[], MarketInputs], refresh_s: float = 900.0,
+                 cache_size: int = 4096, holdings_dir=None):
+        self.fetch_inputs = fetch_inputs
+        self.refresh_s = refresh_s
+        self.cache_size = cache_size
+        self.holdings_dir = Path(holdings_dir).resolve() if holdings_dir else None
+        self.snapshot: MarketInputs | None = None
+        self.snapshot_at: float | None = None
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "coalesced": 0, "errors": 0, "refresh_errors": 0}
+
+    # ---- Snapshot ----
+    async def refresh(self):
+        """Re-fetch the shared MarketInputs (off the event loop); keep the last good one on failure."""
+        try:
+            with instrument.span("service.refresh"):
+                m = await asyncio.to_thread(self.fetch_inputs)
+        except Exception as e:
+            self.stats["refresh_errors"] += 1
+            print(f"[graham-service] snapshot refresh failed: {e}", file=sys.stderr)
+            return
+        self.snapshot, self.snapshot_at = m, time.time()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_s)
+            await self.refresh()
+
+    # ---- Request handling ----
+    def _inputs(self, req: dict) -> MarketInputs:
+        over = req.get("inputs") or {}
+        unknown = set(over) - _INPUT_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown inputs: {sorted(unknown)}")
+        base = vars(self.snapshot) if self.snapshot is not None else {}
+        return MarketInputs(**{**base, **over})
+
+    def _prefs(self, req: dict) -> UserPrefs:
+        p = req.get("prefs") or {}
+        unknown = set(p) - _PREF_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown prefs: {sorted(unknown)}")
+        return UserPrefs(**p)
+
+    def _holdings_source(self, req: dict):
+        if "holdings" in req:
+            rows = req["holdings"]
+            if not isinstance(rows, list):
+                raise ValueError("'holdings' must be a list of row objects.")
+            return rows, None
+        if "holdings_path" not in req:
+            raise ValueError("/plan needs 'holdings' or 'holdings_path'.")
+        if self.holdings_dir is None:
+            raise ValueError("holdings_path is disabled (start the service with --holdings-dir).")
+        path = (self.holdings_dir / req["holdings_path"]).resolve()
+        if not path.is_relative_to(self.holdings_dir) or not path.is_file():
+            raise ValueError(f"No holdings file '{req['holdings_path']}' under the holdings dir.")
+        st = path.stat()
+        return None, (str(path), st.st_mtime_ns, st.st_size)
+
+    def _key(self, route: str, m: MarketInputs, prefs: UserPrefs, req: dict, holdings_key) -> str:
+        doc = {"route": route, "inputs": vars(m), "prefs": vars(prefs),
+               "prev_target": req.get("prev_target"), "band": req.get("band", 5)}
+        if route == "/plan":
+            doc["holdings"] = holdings_key if holdings_key is not None else req["holdings"]
+        raw = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str).encode()
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    @staticmethod
+    def _recommend(m: MarketInputs, prefs: UserPrefs, req: dict) -> dict:
+        rec = recommend_equity(m, prefs)
+        out = {"score": rec["score"], "proposed_pct": rec["equity_pct"], "equity_pct": rec["equity_pct"]}
+        if req.get("prev_target") is not None:
+            out["equity_pct"] = next_equity_target(int(req["prev_target"]), rec["score"], prefs,
+                                                   band=int(req.get("band", 5)))
+        return out
+
+    def _compute(self, route: str, m: MarketInputs, prefs: UserPrefs, req: dict, holdings_path) -> bytes:
+        if route == "/score":
+            out = score_breakdown(m)
+        else:
+            out = self._recommend(m, prefs, req)
+            if route == "/plan":
+                if holdings_path is None:
+                    from .portfolio import holdings_rows
+                    holdings = holdings_rows(req["holdings"])
+                else:
+                    from .portfolio import load_holdings
+                    holdings = load_holdings(holdings_path[0], engine="auto")
+                out["plan"] = rebalance_plan(holdings, out["equity_pct"], include_cash=prefs.include_cash)
+        return json.dumps(out, default=float).encode()
+
+    async def handle(self, method: str, route: str, body: bytes) -> tuple[int, bytes]:
+        """One request -> (status, JSON body). Socket-free, so tools and tests can call it directly."""
+        self.stats["requests"] += 1
+        try:
+            if method == "GET":
+                if route == "/health":
+                    return 200, b'{"ok":true}'
+                if route == "/inputs":
+                    return 200, json.dumps({"inputs": vars(self.snapshot) if self.snapshot else None,
+                                            "fetched_at": self.snapshot_at}).encode()
+                if route == "/stats":
+                    return 200, json.dumps({**self.stats, "cached": len(self._cache),
+                                            "inflight": len(self._inflight)}).encode()
+                return (405 if route in ("/score", "/recommend", "/plan") else 404), b'{"error":"not found"}'
+            if method != "POST" or route not in ("/score", "/recommend", "/plan"):
+                return (404 if method == "POST" else 405), b'{"error":"not found"}'
+
+            req = json.loads(body or b"{}")
+            if not isinstance(req, dict):
+                raise ValueError("Request body must be a JSON object.")
+            m, prefs = self._inputs(req), self._prefs(req)
+            holdings_key = None
+            if route == "/plan":
+                _, holdings_key = self._holdings_source(req)
+            key = self._key(route, m, prefs, req, holdings_key)
+
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return 200, hit
+            fut = self._inflight.get(key)
+            if fut is not None:  # same computation already running: share its result
+                self.stats["coalesced"] += 1
+                return 200, await asyncio.shield(fut)
+
+            self.stats["misses"] += 1
+            fut = asyncio.get_running_loop().create_future()
+            self._inflight[key] = fut
+            try:
+                if route == "/plan":  # pandas-sized work stays off the event loop
+                    out = await asyncio.to_thread(self._compute, route, m, prefs, req, holdings_key)
+                else:
+                    out = self._compute(route, m, prefs, req, holdings_key)
+            except BaseException as e:
+                fut.set_exception(e)
+                fut.exception()  # mark retrieved when no one else was waiting
+                raise
+            finally:
+                self._inflight.pop(key, None)
+            fut.set_result(out)
+            self._cache[key] = out
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return 200, out
+        except (ValueError, TypeError, KeyError) as e:
+            self.stats["errors"] += 1
+            return 400, json.dumps({"error": str(e)}).encode()
+        except Exception as e:
+            self.stats["errors"] += 1
+            return 500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode()
+
+    # ---- HTTP/1.1 over asyncio streams ----
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, version = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                n = int(headers.get("content-length", 0))
+                if n > MAX_BODY:
+                    status, out = 413, b'{"error":"body too large"}'
+                    keep = False
+                else:
+                    body = await reader.readexactly(n) if n else b""
+                    status, out = await self.handle(method, target.split("?", 1)[0], body)
+                    conn = headers.get("connection", "").lower()
+                    keep = conn != "close" and (version != "HTTP/1.0" or conn == "keep-alive")
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(out)}\r\n"
+                    f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n".encode() + out
+                )
+                await writer.drain()
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8750):
+        if self.snapshot is None:
+            await self.refresh()
+        server = await asyncio.start_server(self._client, host, port, limit=1 << 20, backlog=1024)
+        refresher = asyncio.create_task(self._refresh_loop())
+        print(f"[graham-service] listening on http://{host}:{port}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            refresher.cancel()
+
+
+def _fixed_inputs(path) -> Callable[[], MarketInputs]:
+    """Serve MarketInputs from a JSON file (re-read on each refresh): a local stand-in for live data."""
+    def fetch():
+        return MarketInputs(**json.loads(Path(path).read_text()))
+    return fetch
+
+def _live_inputs(cache_path=None, offline: bool = False, trend_tickers=()) -> Callable[[], MarketInputs]:
+    from .market_signals import DEFAULT_TTLS, fetch_market_inputs_concurrent
+    from .series_cache import SeriesCache
+    cache = SeriesCache(cache_path, ttls=DEFAULT_TTLS, offline=offline) if cache_path else None
+
+    def fetch():
+        m, _ = fetch_market_inputs_concurrent(cache=cache, trend_tickers=trend_tickers)
+        return m
+    return fetch
+
+def main():
+    ap = argparse.ArgumentParser(prog="graham-service")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8750)
+    ap.add_argument("--refresh", type=float, default=900.0, help="Seconds between MarketInputs refreshes")
+    ap.add_argument("--cache-size", type=int, default=4096, help="Responses kept in the LRU")
+    ap.add_argument("--inputs-json", help="Serve MarketInputs from this JSON file instead of live sources")
+    ap.add_argument("--series-cache", help="SeriesCache path for live fetches")
+    ap.add_argument("--offline", action="store_true", help="Serve live inputs from the series cache only")
+    ap.add_argument("--trend-tickers", nargs="*", default=[], help="Extra indexes for trend_signals, e.g. ^NDX")
+    ap.add_argument("--holdings-dir", help="Allow /plan 'holdings_path' files under this directory")
+    args = ap.parse_args()
+
+    if args.inputs_json:
+        fetch = _fixed_inputs(args.inputs_json)
+    else:
+        fetch = _live_inputs(args.series_cache, args.offline, args.trend_tickers)
+    svc = RecommendationService(fetch, refresh_s=args.refresh, cache_size=args.cache_size,
+                                holdings_dir=args.holdings_dir or os.getenv("GRAHAM_HOLDINGS_DIR"))
+    try:
+        asyncio.run(svc.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
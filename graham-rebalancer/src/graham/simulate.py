@@ -0,0 +1,248 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .data_models import UserPrefs
+from .scoring import active_rules, score_market_batch
+from .target_policy import map_score_to_equity_batch
+
+SIM_COLUMNS = ["final_target_pct", "mean_target_pct", "target_changes", "turnover", "max_drawdown"]
+
+# Worker-side simulation state (set by _init)
+_STATE: dict = {}
+
+
+# ---- Path generators ----
+def block_bootstrap_index(n_rows: int, n_paths: int, horizon: int, block: int,
+                          rng: np.random.Generator) -> np.ndarray:
+    """
+    (n_paths, horizon) row indices made of contiguous `block`-row runs of
+    history at random starts (moving-block bootstrap), so each path keeps
+    the serial and cross-signal dependence within a block.
+    """
+    block = min(block, n_rows)
+    n_blocks = -(-horizon // block)
+    starts = rng.integers(0, n_rows - block + 1, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n_paths, n_blocks * block)
+    return idx[:, :horizon]
+
+
+@dataclass
+class AR1Model:
+    """
+    x_t = mu + phi * (x_{t-1} - mu) + e_t per signal, with innovations
+    jointly normal (covariance of the fitted residuals).
+    """
+    fields: tuple
+    mu: np.ndarray
+    phi: np.ndarray
+    chol: np.ndarray         # Cholesky factor of the residual covariance
+    start: np.ndarray        # last observed values; paths begin from here
+
+    def simulate(self, n_paths: int, horizon: int, rng: np.random.Generator) -> dict:
+        """{field: (n_paths, horizon) array} of simulated signal values."""
+        k = len(self.fields)
+        # signal-major (k, horizon, n_paths) so each field's block is contiguous
+        eps = self.chol @ rng.standard_normal((horizon, k, n_paths))
+        x = np.empty((k, horizon, n_paths))
+        mu, phi = self.mu[:, None], self.phi[:, None]
+        prev = np.broadcast_to(self.start[:, None], (k, n_paths))
+        for t in range(horizon):
+            prev = mu + phi * (prev - mu) + eps[t]
+            x[:, t] = prev
+        return {f: x[j].T for j, f in enumerate(self.fields)}
+
+
+def fit_ar1(data: pd.DataFrame, fields=None, min_obs: int = 30) -> AR1Model:
+    """
+    Fit an AR1Model to the scored signal columns of `data` (one row per
+    date, NaN = missing). Signals with fewer than `min_obs` consecutive
+    pairs are left out and stay missing in simulated paths.
+    """
+    data = data.sort_index()
+    fields = [f for f in (fields or [r.field for r in active_rules()]) if f in data.columns]
+    mu, phi, resid, start, kept = [], [], [], [], []
+    for f in fields:
+        x = data[f].to_numpy(dtype="float64")
+        ok = ~np.isnan(x[1:]) & ~np.isnan(x[:-1])
+        if ok.sum() < min_obs:
+            continue
+        x0, x1 = x[:-1][ok], x[1:][ok]
+        m = float(np.nanmean(x))
+        d0, d1 = x0 - m, x1 - m
+        p = float(np.clip(d0 @ d1 / (d0 @ d0), -0.999, 0.999)) if d0 @ d0 > 0 else 0.0
+        e = np.full(len(x) - 1, np.nan)
+        e[ok] = d1 - p * d0
+        kept.append(f)
+        mu.append(m)
+        phi.append(p)
+        resid.append(e)
+        start.append(x[~np.isnan(x)][-1])
+    if not kept:
+        raise ValueError(f"No signal column has {min_obs}+ consecutive observations to fit.")
+
+    r = np.column_stack(resid)
+    both = ~np.isnan(r).any(axis=1)
+    if both.sum() > len(kept):
+        cov = np.cov(r[both], rowvar=False).reshape(len(kept), len(kept))
+    else:  # too few joint rows: independent innovations
+        cov = np.diag([np.nanvar(c) for c in r.T])
+    chol = np.linalg.cholesky(cov + 1e-12 * np.eye(len(kept)))
+    return AR1Model(tuple(kept), np.array(mu), np.array(phi), chol, np.array(start))
+
+
+# ---- Policy over paths ----
+def hysteresis_paths(proposed: np.ndarray, band: int = 5, prev_target: int | None = None) -> np.ndarray:
+    """
+    hysteresis_scan for many paths at once: (n_paths, horizon) proposed ->
+    final targets. Sequential in time, vectorized across paths.
+    """
+    proposed = np.asarray(proposed, dtype="int64")
+    out = np.empty_like(proposed)
+    if proposed.size == 0:
+        return out
+    prev = proposed[:, 0].copy() if prev_target is None else np.full(len(proposed), int(prev_target))
+    for t in range(proposed.shape[1]):
+        p = proposed[:, t]
+        move = np.abs(p - prev) >= band
+        prev = np.where(move, p, prev)
+        out[:, t] = prev
+    return out
+
+
+def _path_stats(final: np.ndarray, rs: np.ndarray | None, rb: np.ndarray | None,
+                initial_equity_pct: int | None) -> np.ndarray:
+    """
+    Per-path (final, mean, changes, turnover, drawdown). With returns this is
+    backtest.replay across paths (turnover includes drift back to target);
+    without them turnover counts target moves only and drawdown is NaN.
+    """
+    w = final / 100.0
+    w0 = w[:, :1] if initial_equity_pct is None else np.full((len(w), 1), initial_equity_pct / 100.0)
+    w_prev = np.concatenate((w0, w[:, :-1]), axis=1)
+    if rs is None:
+        turnover = np.abs(w - w_prev).sum(axis=1)
+        drawdown = np.full(len(w), np.nan)
+    else:
+        growth = 1.0 + w_prev * rs + (1.0 - w_prev) * rb
+        turnover = np.abs(w - w_prev * (1.0 + rs) / growth).sum(axis=1)
+        value = np.cumprod(growth, axis=1)
+        drawdown = (1.0 - value / np.maximum.accumulate(value, axis=1)).max(axis=1)
+    return np.column_stack((
+        final[:, -1],
+        final.mean(axis=1),
+        np.count_nonzero(np.diff(final, axis=1), axis=1),
+        turnover,
+        drawdown,
+    ))
+
+
+def _init(state: dict):
+    _STATE.clear()
+    _STATE.update(state)
+
+
+def _run_chunk(task) -> tuple[np.ndarray, np.ndarray]:
+    """Simulate one chunk of paths; returns (stats rows, target counts 0..100)."""
+    n_paths, seed = task
+    s = _STATE
+    rng = np.random.default_rng(seed)
+    horizon = s["horizon"]
+    rs = rb = None
+    if s["method"] == "bootstrap":
+        idx = block_bootstrap_index(len(s["scores"]), n_paths, horizon, s["block"], rng)
+        scores = s["scores"][idx]
+        if s["rs"] is not None:
+            rs, rb = s["rs"][idx], s["rb"][idx]
+    else:
+        cols = s["model"].simulate(n_paths, horizon, rng)
+        # score in the arrays' native time-major order (no copies), then flip back
+        scores = score_market_batch({f: c.T.ravel() for f, c in cols.items()}).reshape(horizon, n_paths).T
+
+    proposed = map_score_to_equity_batch(scores.ravel(), s["prefs"]).reshape(n_paths, horizon)
+    final = hysteresis_paths(proposed, band=s["band"], prev_target=s["prev_target"])
+    counts = np.bincount(final.ravel(), minlength=101)[:101]
+    return _path_stats(final, rs, rb, s["prev_target"]), counts
+
+
+def run_simulation(data: pd.DataFrame, n_paths: int = 10_000, horizon: int = 252,
+                   method: str = "bootstrap", prefs: UserPrefs | None = None, band: int = 5,
+                   prev_target: int | None = None, block: int = 20, seed: int | None = None,
+                   returns_cols: tuple[str, str] | None = ("Stock", "Bond"),
+                   workers: int | None = None, chunk_paths: int | None = None) -> pd.DataFrame:
+    """
+    Monte Carlo of the policy over `n_paths` futures of `horizon` rows.
+
+    `data` is a dated history in the backtest layout (MarketInputs columns,
+    NaN = missing, optionally return columns). method="bootstrap" resamples
+    blocks of historical rows (scores and returns together); method="ar1"
+    simulates signals from fit_ar1(data) and scores them.
+
+    Returns one row per path (SIM_COLUMNS); attrs["target_counts"] holds how
+    often each equity % was the target across all path-steps. Paths run in
+    chunks with per-chunk seeds, so results depend on `seed` and
+    `chunk_paths`, not on the number of workers. workers=1 runs inline.
+    """
+    prefs = prefs or UserPrefs()
+    data = data.sort_index()
+    state = {"method": method, "horizon": horizon, "block": block, "prefs": prefs,
+             "band": band, "prev_target": prev_target, "rs": None, "rb": None}
+    if method == "bootstrap":
+        if data.empty:
+            raise ValueError("Bootstrap needs at least one historical row.")
+        state["scores"] = score_market_batch(data)
+        if returns_cols and all(c in data.columns for c in returns_cols):
+            state["rs"] = data[returns_cols[0]].fillna(0.0).to_numpy(dtype="float64")
+            state["rb"] = data[returns_cols[1]].fillna(0.0).to_numpy(dtype="float64")
+    elif method == "ar1":
+        state["model"] = fit_ar1(data)
+    else:
+        raise ValueError(f"Unknown method '{method}' (expected 'bootstrap' or 'ar1').")
+
+    # ~2M path-steps per chunk keeps each worker's arrays in the tens of MB
+    chunk_paths = chunk_paths or max(1, 2_000_000 // max(horizon, 1))
+    sizes = [min(chunk_paths, n_paths - i) for i in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = list(zip(sizes, seeds))
+
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers == 1:
+        _init(state)
+        parts = [_run_chunk(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(state,)) as ex:
+            parts = list(ex.map(_run_chunk, tasks))
+
+    stats = np.concatenate([p[0] for p in parts]) if parts else np.empty((0, len(SIM_COLUMNS)))
+    counts = sum((p[1] for p in parts), np.zeros(101, dtype="int64"))
+    out = pd.DataFrame(stats, columns=SIM_COLUMNS)
+    out["final_target_pct"] = out["final_target_pct"].astype("int64")
+    out["target_changes"] = out["target_changes"].astype("int64")
+    out.attrs["target_counts"] = {pct: int(c) for pct, c in enumerate(counts) if c}
+    return out
+
+
+def summarize_simulation(result: pd.DataFrame, quantiles=(0.05, 0.5, 0.95)) -> dict:
+    """
+    Distribution summary of a run_simulation result: quantiles of final
+    target, target changes and turnover, the share of paths that ever
+    change target, and the target distribution across all path-steps.
+    """
+    counts = result.attrs.get("target_counts", {})
+    steps = sum(counts.values())
+
+    def q(col):
+        return {f"p{round(p * 100)}": float(v) for p, v in zip(quantiles, result[col].quantile(list(quantiles)))}
+
+    return {
+        "paths": len(result),
+        "final_target_pct": q("final_target_pct"),
+        "target_changes": {"mean": float(result["target_changes"].mean()), **q("target_changes")},
+        "turnover": {"mean": float(result["turnover"].mean()), **q("turnover")},
+        "max_drawdown": q("max_drawdown"),
+        "p_any_change": float((result["target_changes"] > 0).mean()) if len(result) else float("nan"),
+        "target_share": {pct: c / steps for pct, c in sorted(counts.items())} if steps else {},
+    }
@@ -0,0 +1,101 @@
+import argparse
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .portfolio import load_holdings, load_holdings_stream
+
+# Binary holdings snapshots: uncompressed Arrow IPC files, so they can be
+# memory-mapped and handed to pandas without parsing or copying numerics.
+SNAPSHOT_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+if TYPE_CHECKING:  # is_snapshot() sits on the CSV path, which must not import pandas
+    import pandas as pd
+
+# Lazy import to keep pyarrow optional
+def _import_pa():
+    import pyarrow as pa
+    return pa
+
+def snapshot_schema(with_account: bool = False):
+    pa = _import_pa()
+    fields = [
+        pa.field("asset_class", pa.dictionary(pa.int32(), pa.string()), nullable=False),
+        pa.field("ticker", pa.string()),
+        pa.field("quantity", pa.float64()),
+        pa.field("price", pa.float64()),
+        pa.field("market_value", pa.float64(), nullable=False),
+    ]
+    if with_account:
+        fields.insert(0, pa.field("account_id", pa.dictionary(pa.int32(), pa.string()), nullable=False))
+    return pa.schema(fields)
+
+def is_snapshot(path) -> bool:
+    return Path(path).suffix.lower() in SNAPSHOT_SUFFIXES
+
+def _sorted_categorical(col: "pd.Series") -> "pd.Categorical":
+    import pandas as pd
+    vals = col.astype(str).str.strip()
+    return pd.Categorical(vals, categories=sorted(vals.unique()))
+
+def to_table(df: "pd.DataFrame"):
+    """Holdings DataFrame -> pyarrow Table in the fixed snapshot schema."""
+    pa = _import_pa()
+    schema = snapshot_schema(with_account="account_id" in df.columns)
+    df = df.copy()
+    if "market_value" not in df.columns:
+        df["market_value"] = df["quantity"] * df["price"]
+    for c in ("ticker", "quantity", "price"):
+        if c not in df.columns:
+            df[c] = None
+    # sorted dictionaries so categorical groupbys order classes like plain strings do
+    df["asset_class"] = _sorted_categorical(df["asset_class"])
+    df["ticker"] = df["ticker"].astype("string").str.strip()
+    if "account_id" in df.columns:
+        df["account_id"] = _sorted_categorical(df["account_id"])
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+def write_snapshot(df: "pd.DataFrame", path) -> Path:
+    pa = _import_pa()
+    table = to_table(df)
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    tmp.replace(path)  # readers never see a half-written snapshot
+    return path
+
+def read_snapshot_table(path):
+    """Memory-mapped, zero-copy Arrow Table (valid as long as it is referenced)."""
+    pa = _import_pa()
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+def table_to_frame(table) -> "pd.DataFrame":
+    """
+    Arrow Table -> DataFrame. Dictionary columns become categoricals and
+    null-free float columns are wrapped without copying (split_blocks).
+    """
+    return table.to_pandas(split_blocks=True)
+
+def read_snapshot(path) -> "pd.DataFrame":
+    return table_to_frame(read_snapshot_table(path))
+
+def convert_csv(csv_path, out_path, aggregate: bool = False) -> Path:
+    """
+    Convert a holdings CSV (existing layout) to a snapshot.
+    aggregate=True uses the streaming loader, for exports too big for memory.
+    """
+    df = load_holdings_stream(csv_path) if aggregate else load_holdings(csv_path)
+    return write_snapshot(df, out_path)
+
+def main():
+    ap = argparse.ArgumentParser(prog="graham-snapshot", description="Convert a holdings CSV to an Arrow snapshot")
+    ap.add_argument("csv", help="Path to holdings CSV")
+    ap.add_argument("out", help="Output snapshot path (.arrow)")
+    ap.add_argument("--aggregate", action="store_true", help="Stream and aggregate lots per position")
+    args = ap.parse_args()
+    path = convert_csv(args.csv, args.out, aggregate=args.aggregate)
+    print(f"Wrote {path}")
+
+if __name__ == "__main__":
+    main()
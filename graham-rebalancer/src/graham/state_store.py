@@ -0,0 +1,196 @@
+import datetime as dt
+import json
+import sqlite3
+from contextlib import closing, contextmanager
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+
+# Run history, one row per rebalancer run, with its inputs, score breakdown
+# and plan in child tables. WAL mode lets readers run alongside a writer and
+# BEGIN IMMEDIATE serializes concurrent writers instead of failing mid-run.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id       INTEGER PRIMARY KEY,
+    portfolio    TEXT NOT NULL,
+    ts           TEXT NOT NULL,
+    score        REAL,
+    proposed_pct INTEGER,
+    final_pct    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_portfolio_ts ON runs (portfolio, ts);
+CREATE TABLE IF NOT EXISTS run_inputs (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    field  TEXT NOT NULL,
+    value  REAL,
+    PRIMARY KEY (run_id, field)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS run_breakdown (
+    run_id  INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    signal  TEXT NOT NULL,
+    value   REAL,
+    contrib REAL NOT NULL,
+    PRIMARY KEY (run_id, signal)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS run_plan (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    key    TEXT NOT NULL,
+    value  REAL,
+    PRIMARY KEY (run_id, key)
+) WITHOUT ROWID;
+"""
+_LATEST_TARGET = "SELECT final_pct FROM runs WHERE portfolio=? ORDER BY ts DESC, run_id DESC LIMIT 1"
+
+
+def _ts(when) -> str:
+    if when is None:
+        when = dt.datetime.now(dt.timezone.utc)
+    if isinstance(when, dt.datetime) and when.tzinfo is None:
+        when = when.replace(tzinfo=dt.timezone.utc)
+    if isinstance(when, dt.datetime):
+        return when.astimezone(dt.timezone.utc).isoformat(timespec="microseconds")
+    return dt.datetime.combine(when, dt.time(), dt.timezone.utc).isoformat(timespec="microseconds")
+
+
+class StateStore:
+    """
+    Transactional replacement for data/state.json.
+
+    record_run() writes a run and all its detail rows in one transaction;
+    latest_target() is an indexed lookup per portfolio; history() returns
+    runs in a time range without re-deriving anything from logs.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.execute("PRAGMA foreign_keys=ON")
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    @contextmanager
+    def _write(self):
+        with closing(self._connect()) as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                yield con
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+            con.execute("COMMIT")
+
+    def record_run(self, portfolio: str, final_pct: int, score: float | None = None,
+                   proposed_pct: int | None = None, inputs=None, breakdown: dict | None = None,
+                   plan: dict | None = None, ts=None) -> int:
+        """
+        Store one run atomically. `inputs` is a MarketInputs (or dict),
+        `breakdown` a score_breakdown() dict, `plan` a rebalance_plan() dict.
+        Returns the new run_id.
+        """
+        if is_dataclass(inputs):
+            inputs = asdict(inputs)
+        with self._write() as con:
+            cur = con.execute(
+                "INSERT INTO runs (portfolio, ts, score, proposed_pct, final_pct) VALUES (?, ?, ?, ?, ?)",
+                (portfolio, _ts(ts), score, proposed_pct, int(final_pct)),
+            )
+            run_id = cur.lastrowid
+            if inputs:
+                con.executemany(
+                    "INSERT INTO run_inputs VALUES (?, ?, ?)",
+                    [(run_id, k, _num(v)) for k, v in _flat_inputs(inputs)],
+                )
+            if breakdown:
+                con.executemany(
+                    "INSERT INTO run_breakdown VALUES (?, ?, ?, ?)",
+                    [(run_id, k, _num(v.get("value")), float(v["contrib"]))
+                     for k, v in breakdown.items() if isinstance(v, dict)],
+                )
+            if plan:
+                con.executemany(
+                    "INSERT INTO run_plan VALUES (?, ?, ?)",
+                    [(run_id, k, _num(v)) for k, v in plan.items() if _is_num(v)],
+                )
+        return run_id
+
+    def latest_target(self, portfolio: str) -> int | None:
+        with closing(self._connect()) as con:
+            row = con.execute(_LATEST_TARGET, (portfolio,)).fetchone()
+        return int(row[0]) if row else None
+
+    def history(self, portfolio: str | None = None, start=None, end=None) -> list[dict]:
+        """
+        Runs (oldest first) for a portfolio and/or [start, end] time range;
+        a date `end` includes every run on that day.
+        """
+        if isinstance(end, dt.date) and not isinstance(end, dt.datetime):
+            end = dt.datetime.combine(end, dt.time.max, dt.timezone.utc)
+        q, args = "SELECT run_id, portfolio, ts, score, proposed_pct, final_pct FROM runs WHERE 1=1", []
+        if portfolio is not None:
+            q += " AND portfolio=?"
+            args.append(portfolio)
+        if start is not None:
+            q += " AND ts >= ?"
+            args.append(_ts(start))
+        if end is not None:
+            q += " AND ts <= ?"
+            args.append(_ts(end))
+        with closing(self._connect()) as con:
+            con.row_factory = sqlite3.Row
+            return [dict(r) for r in con.execute(q + " ORDER BY ts, run_id", args)]
+
+    def run_detail(self, run_id: int) -> dict:
+        """One run with its inputs, breakdown and plan reassembled as dicts."""
+        with closing(self._connect()) as con:
+            con.row_factory = sqlite3.Row
+            row = con.execute("SELECT * FROM runs WHERE run_id=?", (run_id,)).fetchone()
+            if row is None:
+                raise KeyError(run_id)
+            out = dict(row)
+            out["inputs"] = {r["field"]: r["value"] for r in
+                             con.execute("SELECT field, value FROM run_inputs WHERE run_id=?", (run_id,))}
+            out["breakdown"] = {r["signal"]: {"value": r["value"], "contrib": r["contrib"]} for r in
+                                con.execute("SELECT signal, value, contrib FROM run_breakdown WHERE run_id=?", (run_id,))}
+            out["plan"] = {r["key"]: r["value"] for r in
+                           con.execute("SELECT key, value FROM run_plan WHERE run_id=?", (run_id,))}
+        return out
+
+    def import_legacy_state(self, json_path, portfolio: str) -> int | None:
+        """
+        Seed a portfolio from an old state.json ({"prev_target": N}) if the
+        store has nothing for it yet. Returns the target now on record.
+        The check and the insert share one transaction, so concurrent
+        migrations seed the portfolio once.
+        """
+        path = Path(json_path)
+        v = json.loads(path.read_text()).get("prev_target") if path.exists() else None
+        with self._write() as con:
+            row = con.execute(_LATEST_TARGET, (portfolio,)).fetchone()
+            if row is not None:
+                return int(row[0])
+            if v is None:
+                return None
+            ts = dt.datetime.fromtimestamp(path.stat().st_mtime, dt.timezone.utc)
+            con.execute("INSERT INTO runs (portfolio, ts, final_pct) VALUES (?, ?, ?)",
+                        (portfolio, _ts(ts), int(v)))
+        return int(v)
+
+
+def _flat_inputs(inputs: dict):
+    # nested dicts (MarketInputs.trend_signals) are stored as their own fields
+    for k, v in inputs.items():
+        if isinstance(v, dict):
+            yield from v.items()
+        else:
+            yield k, v
+
+def _is_num(v) -> bool:
+    return v is None or hasattr(v, "__float__")  # ints, floats, numpy scalars
+
+def _num(v):
+    return None if v is None else float(v)
@@ -0,0 +1,142 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .backtest import hysteresis_scan, replay
+from .data_models import UserPrefs
+from .scoring import score_market_batch
+from .target_policy import map_score_to_equity_batch
+
+SWEEP_KEYS = ("min_equity", "max_equity", "step", "risk_tilt_pct", "band")
+SWEEP_COLUMNS = [*SWEEP_KEYS, "total_turnover", "target_changes", "trades", "max_drawdown", "final_value"]
+# a date whose one-way turnover is below this is not counted as a trade (float noise)
+TRADE_EPS = 1e-9
+
+# Worker-side views into the shared signal block (set by _attach)
+_SHARED: dict = {}
+
+
+def build_grid(grid: dict) -> list[tuple]:
+    """
+    Expand {key: values} into a list of (min_equity, max_equity, step,
+    risk_tilt_pct, band) tuples. Missing keys use the UserPrefs / CLI
+    defaults; configurations with min_equity > max_equity are dropped.
+    """
+    unknown = set(grid) - set(SWEEP_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown sweep keys: {sorted(unknown)}")
+    d = UserPrefs()
+    defaults = {"min_equity": [d.min_equity], "max_equity": [d.max_equity],
+                "step": [d.step], "risk_tilt_pct": [d.risk_tilt_pct], "band": [5]}
+    axes = [list(grid.get(k, defaults[k])) for k in SWEEP_KEYS]
+    return [c for c in itertools.product(*axes) if c[0] <= c[1]]
+
+
+def _evaluate(configs, uniq, inverse, rs, rb, prev_target, initial_value) -> list[tuple]:
+    """
+    Score -> target -> hysteresis -> replay for each config.
+    Scores are piecewise constant, so the mapping runs on the handful of
+    distinct scores and is broadcast back through `inverse`.
+    """
+    rows = []
+    for lo, hi, step, tilt, band in configs:
+        prefs = UserPrefs(risk_tilt_pct=tilt, min_equity=lo, max_equity=hi, step=step)
+        proposed = map_score_to_equity_batch(uniq, prefs)[inverse]
+        final = hysteresis_scan(proposed, band=band, prev_target=prev_target)
+        r = replay(final, rs, rb, initial_value=initial_value, initial_equity_pct=prev_target)
+        value = r["value"]
+        peak = np.maximum.accumulate(value)
+        rows.append((
+            lo, hi, step, tilt, band,
+            float(r["turnover"].sum()),
+            int(np.count_nonzero(np.diff(final))),
+            int(np.count_nonzero(r["turnover"] > TRADE_EPS)),
+            float((1.0 - value / peak).max()),
+            float(value[-1]),
+        ))
+    return rows
+
+
+def _attach(name: str, n: int, n_uniq: int, prev_target, initial_value):
+    """
+    Pool initializer: map the parent's shared block into this worker.
+    Layout (float64): rs[n] | rb[n] | inverse[n] | uniq[n_uniq].
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    buf = np.ndarray((3 * n + n_uniq,), dtype="float64", buffer=shm.buf)
+    _SHARED.update(
+        shm=shm,
+        rs=buf[:n],
+        rb=buf[n:2 * n],
+        inverse=buf[2 * n:3 * n].astype("int64"),
+        uniq=buf[3 * n:],
+        prev_target=prev_target,
+        initial_value=initial_value,
+    )
+
+
+def _run_chunk(configs) -> list[tuple]:
+    s = _SHARED
+    return _evaluate(configs, s["uniq"], s["inverse"], s["rs"], s["rb"],
+                     s["prev_target"], s["initial_value"])
+
+
+def run_sweep(data: pd.DataFrame, grid: dict, prev_target: int | None = None,
+              initial_value: float = 100_000.0, returns_cols: tuple[str, str] = ("Stock", "Bond"),
+              workers: int | None = None, chunksize: int | None = None) -> pd.DataFrame:
+    """
+    Evaluate every UserPrefs x band combination in `grid` against one
+    historical dataset (same layout as backtest.run_backtest) and return a
+    table ranked by turnover, then drawdown, then target changes.
+
+    `target_changes` counts moves of the post-hysteresis target (policy
+    churn); `trades` counts the dates replay actually trades on, which also
+    includes rebalancing drift back to an unchanged target.
+
+    Signals are scored once in the parent and placed in shared memory; each
+    task only carries a small list of config tuples. workers=1 runs inline.
+    """
+    missing = [c for c in returns_cols if c not in data.columns]
+    if missing:
+        raise ValueError(f"Sweep data is missing return columns: {missing}")
+    configs = build_grid(grid)
+    data = data.sort_index()
+    scores = score_market_batch(data)
+    uniq, inverse = np.unique(scores, return_inverse=True)
+    rs = data[returns_cols[0]].fillna(0.0).to_numpy(dtype="float64")
+    rb = data[returns_cols[1]].fillna(0.0).to_numpy(dtype="float64")
+    n = len(scores)
+
+    workers = workers or os.cpu_count() or 1
+    if n == 0 or not configs:
+        rows = []
+    elif workers == 1:
+        rows = _evaluate(configs, uniq, inverse, rs, rb, prev_target, initial_value)
+    else:
+        chunksize = chunksize or max(1, len(configs) // (workers * 4))
+        chunks = [configs[i:i + chunksize] for i in range(0, len(configs), chunksize)]
+        shm = shared_memory.SharedMemory(create=True, size=(3 * n + len(uniq)) * 8)
+        try:
+            buf = np.ndarray((3 * n + len(uniq),), dtype="float64", buffer=shm.buf)
+            buf[:n] = rs
+            buf[n:2 * n] = rb
+            buf[2 * n:3 * n] = inverse
+            buf[3 * n:] = uniq
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_attach,
+                initargs=(shm.name, n, len(uniq), prev_target, initial_value),
+            ) as ex:
+                rows = [r for part in ex.map(_run_chunk, chunks) for r in part]
+            del buf
+        finally:
+            shm.close()
+            shm.unlink()
+
+    out = pd.DataFrame(rows, columns=SWEEP_COLUMNS)
+    out = out.sort_values(["total_turnover", "max_drawdown", "target_changes"], kind="stable")
+    return out.reset_index(drop=True)
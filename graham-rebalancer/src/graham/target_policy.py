@@ -1,6 +1,11 @@
+from typing import TYPE_CHECKING
+
 from .data_models import UserPrefs, MarketInputs
 from .scoring import score_market
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 def map_score_to_equity(score: float, prefs: UserPrefs) -> int:
     """
@@ -26,6 +31,17 @@ def map_score_to_equity(score: float, prefs: UserPrefs) -> int:
     # Round to nearest step
     return int(round(equity / prefs.step) * prefs.step)
 
+def map_score_to_equity_batch(scores, prefs: UserPrefs) -> "np.ndarray":
+    """
+    Vectorized map_score_to_equity over an array of scores (same clipping,
+    tilt and round-half-even step rounding). Returns an int64 array.
+    """
+    import numpy as np
+    lo, hi = prefs.min_equity, prefs.max_equity
+    norm = np.clip((np.asarray(scores, dtype="float64") + 3.0) / 6.0, 0.0, 1.0)
+    equity = np.clip(lo + norm * (hi - lo) + prefs.risk_tilt_pct, lo, hi)
+    return (np.round(equity / prefs.step) * prefs.step).astype("int64")
+
 def recommend_equity(m: MarketInputs, prefs: UserPrefs) -> dict:
     """
     End-to-end helper: market inputs -> score -> equity target (%).
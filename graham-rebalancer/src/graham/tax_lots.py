@@ -0,0 +1,177 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from .orders import PLAN_DELTAS
+from .rebalance import rebalance_plan
+
+LONG_TERM_DAYS = 365
+WASH_SALE_DAYS = 30
+
+SALE_COLUMNS = ["lot", "asset_class", "ticker", "shares", "proceeds$", "realized_gain$", "est_tax$"]
+
+# Lazy import to keep scipy optional (only the whole-share solver needs it)
+def _import_milp():
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    return milp, LinearConstraint, Bounds
+
+
+def lot_tax_rates(lots: pd.DataFrame, as_of: dt.date, st_rate: float = 0.37, lt_rate: float = 0.20,
+                  wash_sale_buys=(), wash_window_days: int = WASH_SALE_DAYS) -> pd.DataFrame:
+    """
+    Per-lot sale economics: price, held quantity, gain per share, tax per
+    dollar sold (negative = harvested loss) and whether selling it now would
+    be a wash sale (a loss with a purchase of the same ticker within the window,
+    either another lot or a ticker in `wash_sale_buys`).
+    """
+    as_of = pd.Timestamp(as_of)
+    acquired = pd.to_datetime(lots["acquired"])
+    qty = lots["quantity"].to_numpy(dtype="float64")
+    price = lots["price"].to_numpy(dtype="float64")
+    basis_ps = lots["cost_basis"].to_numpy(dtype="float64") / np.where(qty != 0, qty, np.nan)
+    gain_ps = price - basis_ps
+
+    held_days = (as_of - acquired).dt.days.to_numpy()
+    rate = np.where(held_days > LONG_TERM_DAYS, lt_rate, st_rate)
+
+    tickers = lots["ticker"].astype(str).str.strip()
+    recent = (acquired > as_of - pd.Timedelta(days=wash_window_days)).to_numpy()
+    # purchases of the same ticker in the window, not counting the lot itself
+    recent_same = pd.Series(recent, index=lots.index).groupby(tickers.to_numpy()).transform("sum").to_numpy() - recent
+    buys = {str(t).strip() for t in wash_sale_buys}
+    other_recent = (recent_same > 0) | tickers.isin(buys).to_numpy()
+    washed = (gain_ps < 0) & other_recent
+
+    return pd.DataFrame({
+        "asset_class": lots["asset_class"].to_numpy(),
+        "ticker": tickers.to_numpy(),
+        "quantity": qty,
+        "price": price,
+        "gain_ps": gain_ps,
+        "tax_per_$": rate * gain_ps / price,
+        "wash_sale": washed,
+    }, index=lots.index)
+
+
+def _solve_fractional(tax_per_dollar: np.ndarray, capacity: np.ndarray, amount: float) -> np.ndarray:
+    """
+    min sum(t_i x_i)  s.t. sum(x_i) = amount, 0 <= x_i <= cap_i.
+    With a single budget row this LP is a fractional knapsack: its optimum
+    fills lots in increasing tax-per-dollar order, so sort + cumsum solves
+    it exactly in O(n log n) with no iterative solver.
+    """
+    order = np.argsort(tax_per_dollar, kind="stable")
+    cap = capacity[order]
+    before = np.concatenate(([0.0], np.cumsum(cap)[:-1]))
+    take = np.clip(amount - before, 0.0, cap)
+    x = np.empty_like(take)
+    x[order] = take
+    return x
+
+
+def _solve_whole_shares(tax_ps: np.ndarray, price: np.ndarray, max_shares: np.ndarray,
+                        amount: float, time_limit: float, window: int = 50) -> np.ndarray:
+    """
+    MILP: whole shares per lot, proceeds in [amount, amount + max price),
+    minimizing tax. The fractional optimum has at most one partial lot, so
+    lots well before the boundary are fixed at their full size and only a
+    window of lots around it goes to the solver; 10k-lot books stay fast.
+    """
+    milp, LinearConstraint, Bounds = _import_milp()
+    order = np.argsort(tax_ps / price, kind="stable")
+    frac = _solve_fractional(tax_ps / price, max_shares * price, amount)
+    touched = np.flatnonzero(frac[order] > 0)
+    last = touched[-1] + 1 if len(touched) else 0
+    fixed, cand = order[:max(0, last - window)], order[max(0, last - window):last + window]
+
+    shares = np.zeros(len(price))
+    shares[fixed] = max_shares[fixed]
+    rest = amount - float((shares[fixed] * price[fixed]).sum())
+    res = milp(
+        c=tax_ps[cand],
+        constraints=LinearConstraint(price[cand][None, :], rest, rest + price[cand].max()),
+        integrality=np.ones(len(cand)),
+        bounds=Bounds(0, max_shares[cand]),
+        options={"time_limit": time_limit},
+    )
+    if res.x is None:
+        raise ValueError(f"Whole-share lot selection failed: {res.message}")
+    shares[cand] = np.round(res.x)
+    return shares
+
+
+def select_lots(lots: pd.DataFrame, asset_class: str, amount: float, as_of: dt.date | None = None,
+                st_rate: float = 0.37, lt_rate: float = 0.20, wash_sale_buys=(),
+                whole_shares: bool = False, time_limit: float = 2.0) -> pd.DataFrame:
+    """
+    Choose which `asset_class` lots to sell for `amount` dollars of proceeds
+    at minimum estimated tax. Losses are harvested first, then long-term
+    gains, then short-term gains; lots whose loss would be a wash sale are
+    not sold. whole_shares=True solves the integer version with a MILP.
+
+    If the sellable lots are worth less than `amount`, all of them are sold
+    and the proceeds fall short; callers compare against "proceeds$".
+    """
+    as_of = as_of or dt.date.today()
+    econ = lot_tax_rates(lots, as_of, st_rate, lt_rate, wash_sale_buys)
+    sellable = (econ["asset_class"] == asset_class) & ~econ["wash_sale"] & (econ["quantity"] > 0)
+    e = econ.loc[sellable]
+    if e.empty or amount <= 0:
+        return pd.DataFrame(columns=SALE_COLUMNS)
+
+    price = e["price"].to_numpy()
+    qty = e["quantity"].to_numpy()
+    tax_per_dollar = e["tax_per_$"].to_numpy()
+    max_shares = np.floor(qty) if whole_shares else qty
+    if amount >= float((max_shares * price).sum()):  # not enough sellable: take everything
+        shares = max_shares
+    elif whole_shares:
+        shares = _solve_whole_shares(tax_per_dollar * price, price, max_shares, amount, time_limit)
+    else:
+        shares = _solve_fractional(tax_per_dollar, qty * price, amount) / price
+
+    sold = shares > 0
+    shares, e = shares[sold], e.loc[sold]
+    gain = shares * e["gain_ps"].to_numpy()
+    return pd.DataFrame({
+        "lot": e.index.to_numpy(),
+        "asset_class": asset_class,
+        "ticker": e["ticker"].to_numpy(),
+        "shares": shares,
+        "proceeds$": shares * e["price"].to_numpy(),
+        "realized_gain$": gain,
+        "est_tax$": shares * (e["tax_per_$"] * e["price"]).to_numpy(),
+    })
+
+
+def tax_aware_plan(lots: pd.DataFrame, equity_pct: int, include_cash: bool = True,
+                   as_of: dt.date | None = None, **select_kwargs) -> dict:
+    """
+    rebalance_plan for a lot-level book, plus which lots to sell for the
+    class that is over target. Lots need asset_class, ticker, quantity,
+    price, cost_basis (total $) and acquired (date).
+
+    Adds 'lot_sales' (DataFrame), 'est_tax$', 'realized_gain$' and
+    'unfilled$' (sales the sellable lots could not cover, e.g. because of
+    wash-sale exclusions) to the plan.
+    """
+    df = lots.copy()
+    if "market_value" not in df.columns:
+        df["market_value"] = df["quantity"] * df["price"]
+    plan = rebalance_plan(df, equity_pct, include_cash=include_cash)
+
+    sales, unfilled = [], 0.0
+    for cls, key in PLAN_DELTAS.items():
+        if plan[key] < 0:
+            s = select_lots(df, cls, -plan[key], as_of=as_of, **select_kwargs)
+            unfilled += max(0.0, -plan[key] - float(s["proceeds$"].sum()))
+            sales.append(s)
+    sales = [s for s in sales if not s.empty]
+    lot_sales = pd.concat(sales, ignore_index=True) if sales else pd.DataFrame(columns=SALE_COLUMNS)
+
+    plan["lot_sales"] = lot_sales
+    plan["est_tax$"] = float(lot_sales["est_tax$"].sum())
+    plan["realized_gain$"] = float(lot_sales["realized_gain$"].sum())
+    plan["unfilled$"] = unfilled
+    return plan
@@ -0,0 +1,194 @@
+import datetime as dt
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from . import instrument
+from .series_cache import SeriesCache
+
+DEFAULT_WINDOWS = (50, 200)
+
+# yf.download shares module-level state; one batched call at a time
+_DOWNLOAD_LOCK = threading.Lock()
+
+
+def trend_key(ticker: str, window: int) -> str:
+    """Name of a trend signal, e.g. '^NDX_vs_200d_pct' (usable as a rules field)."""
+    return f"{ticker}_vs_{window}d_pct"
+
+def lookback_days(windows) -> int:
+    """Calendar days that cover max(windows) trading sessions, with holiday slack."""
+    return int(max(windows) * 7 / 5 * 1.05) + 15
+
+
+# ---- Batched closes ----
+def _yf_fetch_many(tickers: list, start: dt.date, end: dt.date) -> dict:
+    """
+    One yf.download for every ticker -> {ticker: Close series}. An empty
+    series means no new sessions in the range; a ticker that failed is left
+    out (yfinance fills it with NaN next to tickers that did get rows).
+    """
+    if start >= end:  # yfinance treats `end` as exclusive
+        return {t: pd.Series(dtype="float64") for t in tickers}
+    from .market_signals import _import_yf
+    with _DOWNLOAD_LOCK:
+        df = _import_yf().download(list(tickers), start=start, end=end, auto_adjust=False,
+                                   progress=False, threads=False)
+    if df is None:
+        return {}
+    if df.empty:
+        return {t: pd.Series(dtype="float64") for t in tickers}
+    close = df["Close"]
+    if isinstance(close, pd.Series):  # single ticker, flat columns
+        close = close.to_frame(tickers[0])
+    got = {t: close[t].dropna() if t in close.columns else pd.Series(dtype="float64") for t in tickers}
+    if not any(len(s) for s in got.values()):
+        return got
+    return {t: s for t, s in got.items() if len(s)}
+
+def fetch_closes(tickers, start: dt.date, end: dt.date | None = None,
+                 cache: SeriesCache | None = None) -> pd.DataFrame:
+    """
+    Daily closes (date x ticker) for all `tickers` from a single batched
+    download; through `cache` only tickers that are stale are downloaded.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    end = end or dt.date.today()
+    with instrument.span("fetch", source="yahoo", series=",".join(tickers)) as sp:
+        if cache is not None:
+            got = cache.get_many("yahoo", tickers, start, end, fetch_many=_yf_fetch_many)
+        else:
+            got = _yf_fetch_many(tickers, start, end)
+        closes = pd.DataFrame({t: got.get(t, pd.Series(dtype="float64")) for t in tickers}).sort_index()
+        if instrument.enabled():
+            sp.set(rows=len(closes), bytes=int(closes.memory_usage(index=True).sum()))
+    return closes
+
+
+# ---- Vectorized SMA distance ----
+def sma_distance(closes: pd.DataFrame, windows=DEFAULT_WINDOWS) -> pd.DataFrame:
+    """
+    Percent distance of each ticker's last close from its trailing
+    `window`-session SMA: one row per ticker, one column per window, NaN
+    where there is not enough history. Each column skips its own missing
+    days, so tickers on different exchange calendars use their own sessions.
+    """
+    x = closes.to_numpy(dtype="float64")
+    valid = ~np.isnan(x)
+    # a stable sort on the validity mask moves NaNs to the top of each column
+    # and keeps the valid closes in date order at the bottom
+    packed = np.take_along_axis(x, np.argsort(valid, axis=0, kind="stable"), axis=0)
+    n_valid = valid.sum(axis=0)
+    last = packed[-1] if len(packed) else np.full(x.shape[1], np.nan)
+    out = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for w in windows:
+            sma = packed[-w:].mean(axis=0) if len(packed) else last
+            sma = np.where((n_valid >= w) & (sma != 0), sma, np.nan)
+            out[w] = 100.0 * (last / sma - 1.0)
+    return pd.DataFrame(out, index=closes.columns)
+
+
+# ---- Incremental state ----
+class RollingTrend:
+    """
+    SMA distances for one ticker over several windows, updated in O(1) per
+    bar: the last max(windows) closes in a fixed-size ring buffer plus one
+    running sum per window. Sums are recomputed exactly (math.fsum) every
+    `resync` bars so floating-point drift stays bounded; amortized that is
+    still O(1) per bar.
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS, resync: int | None = None):
+        self.windows = tuple(sorted(set(int(w) for w in windows)))
+        self.size = self.windows[-1]
+        self.buf = [0.0] * self.size  # ring: the next close goes to buf[head]
+        self.head = 0
+        self.count = 0
+        self.sums = dict.fromkeys(self.windows, 0.0)
+        self.resync = resync or self.size
+        self._since = 0
+
+    def last(self, k: int) -> list:
+        """The last k closes held (k <= max(windows)), oldest first."""
+        k = min(k, self.count)
+        start = (self.head - k) % self.size
+        return (self.buf[start:start + k] if start + k <= self.size
+                else self.buf[start:] + self.buf[:start + k - self.size])
+
+    def update(self, close: float) -> dict:
+        """Add one bar (NaN/None is skipped); returns distances()."""
+        if close is None or close != close:
+            return self.distances()
+        close = float(close)
+        buf, n, head, size = self.buf, self.count, self.head, self.size
+        for w in self.windows:
+            self.sums[w] += close
+            if n >= w:
+                self.sums[w] -= buf[head - w]  # the close leaving this window (negative index wraps)
+        buf[head] = close
+        self.head = (head + 1) % size
+        self.count = min(n + 1, size)
+        self._since += 1
+        if self._since >= self.resync:
+            self._since = 0
+            for w in self.windows:
+                self.sums[w] = math.fsum(self.last(w))
+        return self.distances()
+
+    def distances(self) -> dict:
+        """{window: % distance of the last close from its SMA, None until the window fills}."""
+        out = {}
+        latest = self.buf[self.head - 1]
+        for w in self.windows:
+            sma = self.sums[w] / w
+            out[w] = 100.0 * (latest / sma - 1.0) if self.count >= w and sma != 0 else None
+        return out
+
+
+class TrendState:
+    """
+    RollingTrend per ticker: seed once from history (from_closes), then
+    feed each new daily bar with update() instead of re-fetching the window.
+    """
+
+    def __init__(self, tickers, windows=DEFAULT_WINDOWS):
+        self.windows = tuple(windows)
+        self.trends = {t: RollingTrend(windows) for t in tickers}
+
+    @classmethod
+    def from_closes(cls, closes: pd.DataFrame, windows=DEFAULT_WINDOWS) -> "TrendState":
+        state = cls(closes.columns, windows)
+        for t in closes.columns:
+            tr = state.trends[t]
+            for v in closes[t].dropna().to_numpy()[-tr.windows[-1]:]:
+                tr.update(v)
+        return state
+
+    def update(self, bars: dict) -> dict:
+        """Apply {ticker: close} for one session; returns signals()."""
+        for t, close in bars.items():
+            if t not in self.trends:
+                self.trends[t] = RollingTrend(self.windows)
+            self.trends[t].update(close)
+        return self.signals()
+
+    def signals(self) -> dict:
+        """{trend_key(ticker, window): pct or None} for every ticker and window."""
+        return {trend_key(t, w): d for t, tr in self.trends.items() for w, d in tr.distances().items()}
+
+
+def trend_signals(closes: pd.DataFrame, windows=DEFAULT_WINDOWS) -> dict:
+    """sma_distance flattened to {trend_key: pct or None} for MarketInputs.trend_signals."""
+    d = sma_distance(closes, windows)
+    return {trend_key(t, w): (None if math.isnan(v) else float(v))
+            for t, row in d.iterrows() for w, v in row.items()}
+
+def fetch_trend_signals(tickers, windows=DEFAULT_WINDOWS, cache: SeriesCache | None = None,
+                        end: dt.date | None = None) -> dict:
+    """Batched download + sma_distance for every ticker and window."""
+    end = end or dt.date.today()
+    closes = fetch_closes(tickers, end - dt.timedelta(days=lookback_days(windows)), end, cache)
+    return trend_signals(closes, windows)
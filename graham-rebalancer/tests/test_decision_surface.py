@@ -0,0 +1,33 @@
+import math
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from graham.data_models import MarketInputs, UserPrefs  # noqa: E402
+from graham.decision_surface import DecisionSurface  # noqa: E402
+from graham.scoring import compile_rules, score_market  # noqa: E402
+
+RULES = compile_rules({
+    "vix_level": {"breaks": [15, 25], "right_closed": [False, True], "contribs": [0.25, 0.0, -0.5]},
+    "^NDX_vs_200d_pct": {"breaks": [0], "contribs": [-0.5, 0.5]},
+})
+
+
+def test_lookup_reads_trend_signals_like_scoring():
+    surface = DecisionSurface.build(UserPrefs(), RULES)
+    for trend in (-3.0, 4.0, None):
+        m = MarketInputs(vix_level=25.0, trend_signals={"^NDX_vs_200d_pct": trend})
+        assert surface.lookup(m)["score"] == score_market(m, RULES)
+    m = MarketInputs(vix_level=12.0, trend_signals={"^NDX_vs_200d_pct": 4.0})
+    assert surface.what_if(m, **{"^NDX_vs_200d_pct": -1.0})["score"] == 0.25 - 0.5
+
+
+def test_bounds_are_table_breaks(tmp_path):
+    surface = DecisionSurface.build(UserPrefs(), RULES)
+    for s in (surface, DecisionSurface.load(surface.save(tmp_path / "surface.npz"))):
+        assert s.bounds("vix_level", 0) == (-math.inf, 15.0)
+        assert s.bounds("vix_level", 1) == (15.0, 25.0)
+        assert s.bounds("vix_level", 2) == (25.0, math.inf)
+        assert s.bounds("vix_level", 3) == (None, None)
+        assert s.state("vix_level", 25.0) == 1  # right_closed: 25 stays in the middle bucket
@@ -0,0 +1,74 @@
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from graham.history import (  # noqa: E402
+    last_date, read_alfred_vintages, read_history, unrate_change_by_vintage, update_dataset,
+)
+
+# Dec 3.5 and Jan 3.6 first published 2020-02-07; Dec revised to 3.6 with Feb's
+# first print on 2020-03-06; Mar first published 2020-04-03 (nothing else listed)
+LONG = """realtime_start,realtime_end,date,value
+2020-02-07,2020-03-05,2019-12-01,3.5
+2020-02-07,9999-12-31,2020-01-01,3.6
+2020-03-06,9999-12-31,2019-12-01,3.6
+2020-03-06,9999-12-31,2020-02-01,3.5
+2020-04-03,9999-12-31,2020-03-01,4.4
+"""
+
+
+@pytest.mark.parametrize("with_end", [True, False])
+def test_long_vintages_carry_earlier_values_forward(tmp_path, with_end):
+    path = tmp_path / "UNRATE_vintages.csv"
+    df = pd.read_csv(io.StringIO(LONG))
+    (df if with_end else df.drop(columns="realtime_end")).to_csv(path, index=False)
+
+    wide = read_alfred_vintages(path)
+    latest = wide[pd.Timestamp("2020-04-03")]
+    assert latest.tolist() == [3.6, 3.6, 3.5, 4.4]           # revised Dec, carried Jan/Feb, new Mar
+    assert wide[pd.Timestamp("2020-02-07")].tolist()[:2] == [3.5, 3.6]
+
+    change = unrate_change_by_vintage(wide, lag_months=2)
+    assert change[pd.Timestamp("2020-04-03")] == pytest.approx(4.4 - 3.6)
+    assert change[pd.Timestamp("2020-03-06")] == pytest.approx(3.5 - 3.6)
+
+
+def test_long_vintages_drop_expired_values(tmp_path):
+    path = tmp_path / "UNRATE_vintages.csv"
+    path.write_text("realtime_start,realtime_end,date,value\n"
+                    "2020-02-07,2020-03-05,2019-12-01,3.5\n"
+                    "2020-02-07,9999-12-31,2020-01-01,3.6\n"
+                    "2020-03-06,9999-12-31,2020-02-01,3.5\n")
+    wide = read_alfred_vintages(path)
+    assert pd.isna(wide.loc["2019-12-01", pd.Timestamp("2020-03-06")])
+    assert wide.loc["2020-01-01", pd.Timestamp("2020-03-06")] == 3.6
+
+
+def _write_daily(raw, start, end):
+    days = pd.bdate_range(start, end)
+    for sid, v in (("DGS10", 4.0), ("DGS3MO", 5.0), ("BAMLH0A0HYM2", 3.5)):
+        pd.DataFrame({"observation_date": days.strftime("%Y-%m-%d"), sid: v}).to_csv(raw / f"{sid}.csv", index=False)
+    for t, v in (("^GSPC", 5000.0), ("^VIX", 13.0)):
+        pd.DataFrame({"Date": days.strftime("%Y-%m-%d"), "Close": v}).to_csv(raw / f"{t}.csv", index=False)
+
+
+def test_update_dataset_stops_at_last_raw_date(tmp_path):
+    pytest.importorskip("pyarrow")
+    raw, out = tmp_path / "raw", tmp_path / "out"
+    raw.mkdir()
+    _write_daily(raw, "2024-01-02", "2024-06-28")
+
+    first = update_dataset(raw, out, end="2026-10-16")
+    assert first.name == "part-20240102-20240628.parquet"
+    assert last_date(out) == pd.Timestamp("2024-06-28")
+    assert update_dataset(raw, out, end="2026-10-16") is None  # nothing new: no forward-filled rows
+
+    _write_daily(raw, "2024-01-02", "2024-07-05")
+    second = update_dataset(raw, out, end="2026-10-16")
+    assert second.name == "part-20240701-20240705.parquet"
+    assert read_history(out).index[-1] == pd.Timestamp("2024-07-05")
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from graham.portfolio import load_holdings, load_holdings_stream, weights_by_class  # noqa: E402
+
+CSV = """﻿"account_id", asset_class ,"ticker",quantity,price,market_value
+A,Stock,VTI,1,100,100
+A, Bond,BND,1,100,100
+A,Bond ,BND,1,100,100
+A,Cash,,,,500
+,Stock,VTI,1,50,50
+"""
+
+
+@pytest.mark.parametrize("chunksize", [2, 1000])
+def test_stream_matches_load_holdings(tmp_path, chunksize):
+    path = tmp_path / "holdings.csv"
+    path.write_text(CSV, encoding="utf-8")
+    df = load_holdings_stream(path, chunksize=chunksize)
+
+    assert isinstance(df["asset_class"].dtype, pd.CategoricalDtype)
+    assert sorted(df["asset_class"].cat.categories) == ["Bond", "Cash", "Stock"]
+    assert len(df) == 4  # padded " Bond" / "Bond " merge; blank ticker and account rows are kept
+    assert df["market_value"].sum() == load_holdings(path)["market_value"].sum() == 850.0
+    w = weights_by_class(df)
+    assert w["TOTAL"] == 850.0 and w["Stock"] == pytest.approx(150 / 850 * 100)
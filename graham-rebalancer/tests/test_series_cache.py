@@ -0,0 +1,91 @@
+import datetime as dt
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from graham import market_signals, trends  # noqa: E402
+from graham.series_cache import SeriesCache  # noqa: E402
+
+START, FRI = dt.date(2026, 10, 12), dt.date(2026, 10, 16)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def bars(start, end):
+    days = pd.bdate_range(start, end - dt.timedelta(days=1))
+    return pd.Series(np.arange(len(days), dtype="float64") + 100.0, index=days)
+
+
+def make_cache(tmp_path, ttl=60):
+    clock = Clock()
+    return SeriesCache(tmp_path / "cache.db", ttl=ttl, clock=clock), clock
+
+
+def test_no_new_bars_after_ttl_is_fresh(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path)
+    calls = []
+
+    class FakeYF:
+        @staticmethod
+        def download(tickers, start, end, **kwargs):
+            calls.append((start, end))
+            days = pd.bdate_range(start, min(end, FRI + dt.timedelta(days=1)) - dt.timedelta(days=1))
+            cols = pd.MultiIndex.from_product([["Close"], tickers])
+            return pd.DataFrame(100.0, index=days, columns=cols) if len(days) else pd.DataFrame()
+
+    monkeypatch.setattr(market_signals, "_import_yf", lambda: FakeYF)
+    closes = trends.fetch_closes(["AAA", "BBB"], START, FRI + dt.timedelta(days=1), cache=cache)
+    assert closes.shape == (5, 2) and len(calls) == 1
+
+    clock.now += 120  # past the TTL, Sunday: the upstream has no new sessions
+    for _ in range(3):
+        closes = trends.fetch_closes(["AAA", "BBB"], START, dt.date(2026, 10, 18), cache=cache)
+        clock.now += 10
+    assert len(calls) == 2  # one top-up, then served from cache within the TTL
+    assert closes.shape == (5, 2)
+
+
+def test_partial_failure_is_retried(tmp_path):
+    cache, clock = make_cache(tmp_path)
+    calls = []
+
+    def fetch_many(ids, start, end):
+        calls.append(list(ids))
+        return {i: bars(start, end) for i in ids if i != "BAD" or len(calls) > 1}
+
+    first = cache.get_many("yahoo", ["AAA", "BAD"], START, FRI, fetch_many=fetch_many)
+    assert len(first["AAA"]) == 4 and first["BAD"].empty
+    second = cache.get_many("yahoo", ["AAA", "BAD"], START, FRI, fetch_many=fetch_many)
+    assert calls == [["AAA", "BAD"], ["BAD"]]
+    assert len(second["BAD"]) == 4
+
+
+def test_yf_fetch_many_separates_failures_from_no_data(monkeypatch):
+    frames = []
+
+    class FakeYF:
+        @staticmethod
+        def download(tickers, **kwargs):
+            return frames.pop(0)
+
+    monkeypatch.setattr(market_signals, "_import_yf", lambda: FakeYF)
+    idx = pd.bdate_range("2026-10-12", periods=3)
+    cols = pd.MultiIndex.from_product([["Close"], ["AAA", "BAD"]])
+    frames.append(pd.DataFrame([[1.0, np.nan]] * 3, index=idx, columns=cols))
+    frames.append(pd.DataFrame())
+
+    partial = trends._yf_fetch_many(["AAA", "BAD"], START, FRI)
+    assert list(partial) == ["AAA"] and len(partial["AAA"]) == 3
+
+    none_new = trends._yf_fetch_many(["AAA", "BAD"], START, FRI)
+    assert set(none_new) == {"AAA", "BAD"} and all(s.empty for s in none_new.values())
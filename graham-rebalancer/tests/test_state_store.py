@@ -0,0 +1,59 @@
+import datetime as dt
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from graham.state_store import StateStore  # noqa: E402
+
+
+def test_record_run_round_trip(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    run_id = store.record_run("p", 60, score=1.5, proposed_pct=65,
+                              inputs={"vix_level": 14.0, "trend_signals": {"VTI_sma200": 2.5}},
+                              breakdown={"vix_level": {"value": 14.0, "contrib": 0.5}},
+                              plan={"investable_total": 1000.0, "note": "skipped"})
+    store.record_run("p", 55, ts=dt.datetime(2020, 1, 1))  # older run does not win
+    assert store.latest_target("p") == 60
+    assert store.latest_target("other") is None
+
+    detail = store.run_detail(run_id)
+    assert detail["inputs"] == {"vix_level": 14.0, "VTI_sma200": 2.5}
+    assert detail["breakdown"] == {"vix_level": {"value": 14.0, "contrib": 0.5}}
+    assert detail["plan"] == {"investable_total": 1000.0}
+
+
+def test_history_date_end_includes_that_day(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    store.record_run("p", 60, ts=dt.datetime(2026, 10, 16, 23, 59))
+    store.record_run("p", 62, ts=dt.datetime(2026, 10, 17, 15, 30))
+    assert [r["final_pct"] for r in store.history("p", end=dt.date(2026, 10, 17))] == [60, 62]
+    assert [r["final_pct"] for r in store.history("p", end=dt.date(2026, 10, 16))] == [60]
+    assert [r["final_pct"] for r in store.history("p", start=dt.date(2026, 10, 17))] == [62]
+
+
+def _migrate(args):
+    db, legacy = args
+    return StateStore(db).import_legacy_state(legacy, "p")
+
+
+def test_import_legacy_state_seeds_once(tmp_path):
+    db, legacy = tmp_path / "state.db", tmp_path / "state.json"
+    legacy.write_text(json.dumps({"prev_target": 0}))
+    StateStore(db)
+    with ProcessPoolExecutor(4) as ex:
+        results = list(ex.map(_migrate, [(db, legacy)] * 8))
+    assert results == [0] * 8  # a stored 0% target counts as on record
+    assert len(StateStore(db).history("p")) == 1
+
+
+def test_import_legacy_state_keeps_existing(tmp_path):
+    store = StateStore(tmp_path / "state.db")
+    store.record_run("p", 70)
+    legacy = tmp_path / "state.json"
+    legacy.write_text(json.dumps({"prev_target": 40}))
+    assert store.import_legacy_state(legacy, "p") == 70
+    assert store.import_legacy_state(tmp_path / "missing.json", "q") is None
+    assert len(store.history()) == 1
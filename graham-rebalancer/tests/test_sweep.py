@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from graham.sweep import run_sweep  # noqa: E402
+
+
+def _data(n=60):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "vix_level": np.where(np.arange(n) < n // 2, 12.0, 30.0),
+        "Stock": rng.normal(0.0005, 0.01, n),
+        "Bond": rng.normal(0.0001, 0.002, n),
+    }, index=pd.bdate_range("2024-01-01", periods=n))
+
+
+def test_missing_return_columns_raise():
+    with pytest.raises(ValueError, match="'Bond'"):
+        run_sweep(_data().drop(columns="Bond"), {"band": [5]}, workers=1)
+
+
+def test_trades_and_target_changes():
+    grid = {"band": [0, 50], "step": [5]}
+    out = run_sweep(_data(), grid, workers=1).set_index("band")
+    assert out.loc[0, "target_changes"] == 1                   # vix regime flips once
+    assert out.loc[50, "target_changes"] == 0                  # held by the band
+    assert out.loc[0, "trades"] == out.loc[50, "trades"] == 60  # drift is traded back every date
+    pd.testing.assert_frame_equal(run_sweep(_data(), grid, workers=2).set_index("band"), out)
@@ -0,0 +1,64 @@
+import datetime as dt
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from graham.tax_lots import select_lots, tax_aware_plan  # noqa: E402
+
+AS_OF = dt.date(2026, 10, 17)
+
+# tax per $ sold: lot 0 -0.04 (long-term loss), lot 2 +0.037 (short-term gain),
+# lot 1 +0.10 (long-term gain), so the optimum fills them in that order
+LOTS = pd.DataFrame({
+    "asset_class": ["Stock", "Stock", "Stock", "Bond"],
+    "ticker": ["VTI", "VXUS", "VOO", "BND"],
+    "quantity": [5.0, 10.0, 10.0, 5.0],
+    "price": [100.0, 100.0, 100.0, 100.0],
+    "cost_basis": [600.0, 500.0, 900.0, 500.0],
+    "acquired": ["2020-01-02", "2020-01-02", "2026-06-01", "2020-01-02"],
+})
+
+
+def _shares(sales):
+    return dict(zip(sales["lot"], sales["shares"]))
+
+
+def test_fractional_fills_cheapest_lots_first():
+    sales = select_lots(LOTS, "Stock", 1250.0, as_of=AS_OF)
+    assert _shares(sales) == pytest.approx({0: 5.0, 2: 7.5})
+    assert sales["proceeds$"].sum() == pytest.approx(1250.0)
+    assert sales["est_tax$"].sum() == pytest.approx(-20.0 + 7.5 * 3.7)
+
+
+def test_whole_shares_matches_known_optimum():
+    pytest.importorskip("scipy")
+    frac = select_lots(LOTS, "Stock", 1250.0, as_of=AS_OF)
+    whole = select_lots(LOTS, "Stock", 1250.0, as_of=AS_OF, whole_shares=True)
+    assert _shares(whole) == {0: 5.0, 2: 8.0}  # rounding the partial lot up beats adding lot 1
+    assert whole["proceeds$"].sum() >= 1250.0
+    assert whole["est_tax$"].sum() == pytest.approx(-20.0 + 8 * 3.7)
+    assert whole["est_tax$"].sum() >= frac["est_tax$"].sum()
+
+
+@pytest.mark.parametrize("whole_shares", [False, True])
+def test_shortfall_when_sellable_lots_fall_short(whole_shares):
+    if whole_shares:
+        pytest.importorskip("scipy")
+    # VTI is excluded as a wash sale, leaving $2,000 of Stock to sell against $2,200 needed
+    sales = select_lots(LOTS, "Stock", 2200.0, as_of=AS_OF, wash_sale_buys=["VTI"], whole_shares=whole_shares)
+    assert _shares(sales) == {1: 10.0, 2: 10.0}
+
+    plan = tax_aware_plan(LOTS, 10, as_of=AS_OF, wash_sale_buys=["VTI"], whole_shares=whole_shares)
+    assert plan["stock_to_buy(+)sell(-)$"] == pytest.approx(-2200.0)
+    assert plan["lot_sales"]["proceeds$"].sum() == pytest.approx(2000.0)
+    assert plan["unfilled$"] == pytest.approx(200.0)
+
+
+def test_no_shortfall_when_covered():
+    plan = tax_aware_plan(LOTS, 60, as_of=AS_OF)
+    assert plan["unfilled$"] == 0.0
+    assert plan["lot_sales"]["proceeds$"].sum() == pytest.approx(-plan["stock_to_buy(+)sell(-)$"])